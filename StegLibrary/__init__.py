@@ -1,5 +1,23 @@
 # Import expose API functions
-from .core import write_steg, extract_steg
+# Modules are only imported on first access, so that the CLI and scripts
+# importing a single submodule do not load every dependency
+from StegLibrary.helper.lazy_op import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), {
+    "write_steg": ".core.steg",
+    "extract_steg": ".core.steg",
+    "iter_steg": ".core.steg",
+    "peek_header": ".core.steg",
+    "is_steganograph": ".core.steg",
+    "write_steg_batch": ".core.batch",
+    "extract_steg_batch": ".core.batch",
+    "plan_capacity": ".core.capacity",
+    "open_carrier": ".core.mapped",
+    "embed_bytes": ".core.memory",
+    "extract_bytes": ".core.memory",
+    "async_write_steg": ".core.aio",
+    "async_extract_steg": ".core.aio",
+})
 
 # Define import * functionality
 # Import all only imports main API
@@ -7,4 +25,15 @@
 __all__ = [
     "write_steg",
     "extract_steg",
+    "iter_steg",
+    "peek_header",
+    "is_steganograph",
+    "write_steg_batch",
+    "extract_steg_batch",
+    "plan_capacity",
+    "open_carrier",
+    "embed_bytes",
+    "extract_bytes",
+    "async_write_steg",
+    "async_extract_steg",
 ]
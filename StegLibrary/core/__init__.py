@@ -1,11 +1,33 @@
 # Import expose API functions
+# The configuration is light and used everywhere, so it is imported now.
+# Other modules are only imported on first access, as they need numpy,
+# Pillow or cryptography.
+from StegLibrary.helper.lazy_op import lazy_exports
 from .config import SteganographyConfig
-from .header import (
-    build_header,
-    validate_header,
-    parse_header,
-)
-from .steg import write_steg, extract_steg
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), {
+    "build_header": ".header",
+    "validate_header": ".header",
+    "parse_header": ".header",
+    "write_steg": ".steg",
+    "extract_steg": ".steg",
+    "iter_steg": ".steg",
+    "peek_header": ".steg",
+    "is_steganograph": ".steg",
+    "write_steg_batch": ".batch",
+    "extract_steg_batch": ".batch",
+    "BatchResult": ".batch",
+    "plan_capacity": ".capacity",
+    "CapacityPlan": ".capacity",
+    "open_carrier": ".mapped",
+    "MappedCarrier": ".mapped",
+    "embed_bytes": ".memory",
+    "extract_bytes": ".memory",
+    "async_write_steg": ".aio",
+    "async_extract_steg": ".aio",
+    "StegServer": ".server",
+    "Timings": ".timing",
+})
 
 # Define import * functionality
 # Import all only imports main API
@@ -17,4 +39,20 @@
     "parse_header",
     "write_steg",
     "extract_steg",
+    "iter_steg",
+    "peek_header",
+    "is_steganograph",
+    "write_steg_batch",
+    "extract_steg_batch",
+    "BatchResult",
+    "plan_capacity",
+    "CapacityPlan",
+    "open_carrier",
+    "MappedCarrier",
+    "embed_bytes",
+    "extract_bytes",
+    "async_write_steg",
+    "async_extract_steg",
+    "StegServer",
+    "Timings",
 ]
@@ -0,0 +1,238 @@
+# This script implements the asyncio API. Embedding and extraction are
+# CPU-bound, so they run on an executor (a thread pool by default, or any
+# process pool), while files are read and written on the default executor
+# of the event loop. A semaphore caps the number of jobs in flight, so that
+# callers are held back once the executor is busy.
+
+# Builtin modules
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, \
+    ThreadPoolExecutor
+from functools import partial
+from os import PathLike
+from typing import Any, Callable, Optional, Union
+from weakref import WeakKeyDictionary
+
+# Internal modules
+from StegLibrary.core import SteganographyConfig as cfg
+from StegLibrary.core.memory import embed_bytes, extract_bytes
+
+# Executor used when none is given, made on first use
+_default_executor: Optional[Executor] = None
+
+# Semaphore used when none is given, for each event loop
+_default_semaphores: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def _get_executor(executor: Optional[Executor]) -> Executor:
+    """Returns the given executor, or the default thread pool."""
+    global _default_executor
+    if executor is not None:
+        return executor
+    if _default_executor is None:
+        _default_executor = ThreadPoolExecutor(
+            cfg.default_concurrency, thread_name_prefix="steg")
+    return _default_executor
+
+
+def _get_semaphore(semaphore: Optional[asyncio.Semaphore]
+                   ) -> asyncio.Semaphore:
+    """Returns the given semaphore, or that of the running event loop."""
+    if semaphore is not None:
+        return semaphore
+    loop = asyncio.get_running_loop()
+    if loop not in _default_semaphores:
+        _default_semaphores[loop] = asyncio.Semaphore(cfg.default_concurrency)
+    return _default_semaphores[loop]
+
+
+async def offload(executor: Optional[Executor],
+                  semaphore: Optional[asyncio.Semaphore],
+                  fn: Callable[..., Any], *args: Any) -> Any:
+    """Runs a function on the executor, once the semaphore allows it.
+
+    If the caller is cancelled, so is the job, unless it has started: a
+    running job cannot be interrupted, so its slot is only released once
+    it is done, keeping the number of jobs in flight bounded.
+
+    ### Positional arguments
+
+    - executor (concurrent.futures.Executor | None)
+        - Runs the function, a shared thread pool if None
+
+    - semaphore (asyncio.Semaphore | None)
+        - Caps the number of jobs in flight, a semaphore of
+        cfg.default_concurrency for the running event loop if None
+
+    - fn (Callable)
+        - The function to run, picklable for a process pool
+
+    - args
+        - The positional arguments of the function
+
+    ### Returns
+
+    The value returned by the function
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _get_semaphore(semaphore)
+
+    await semaphore.acquire()
+    try:
+        future = _get_executor(executor).submit(fn, *args)
+    except BaseException:
+        semaphore.release()
+        raise
+
+    def release(_) -> None:
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            # The event loop is closed, and so is the semaphore
+            pass
+    future.add_done_callback(release)
+
+    # Cancelling the wrapper cancels the job, if it has not started yet
+    return await asyncio.wrap_future(future)
+
+
+def _is_path(obj: Any) -> bool:
+    return isinstance(obj, (str, PathLike))
+
+
+def _read_file(path: Union[str, PathLike]) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def _write_file(path: Union[str, PathLike], data: bytes) -> None:
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def _portable(data: Any, executor: Optional[Executor]) -> Any:
+    """Copies a memoryview into bytes if it has to be sent to another
+    process, since it cannot be pickled."""
+    if isinstance(executor, ProcessPoolExecutor) and \
+            isinstance(data, memoryview):
+        return data.tobytes()
+    return data
+
+
+async def async_write_steg(
+    payload: Any,
+    carrier: Any,
+    output: Optional[Union[str, PathLike]] = None,
+    *,
+    executor: Optional[Executor] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    **options: Any,
+) -> bytes:
+    """Embeds a payload into a carrier, without blocking the event loop.
+
+    ### Positional arguments
+
+    - payload (str | PathLike | bytes-like)
+        - Path of the data to embed, or the data itself
+
+    - carrier (str | PathLike | bytes-like | PIL.Image.Image |
+    numpy.ndarray)
+        - Path of the carrier image, or the carrier itself (see
+        embed_bytes)
+
+    - output (str | PathLike) (default = None)
+        - Path of the file to write the steganograph to, if any
+
+    ### Keyword arguments
+
+    - executor (concurrent.futures.Executor) (default = None)
+        - The thread or process pool to embed on, a shared thread pool of
+        cfg.default_concurrency threads if None
+
+    - semaphore (asyncio.Semaphore) (default = None)
+        - Caps the number of jobs in flight, a semaphore of
+        cfg.default_concurrency shared by the event loop if None
+
+    - Any other keyword argument of embed_bytes
+
+    ### Returns
+
+    The steganograph, encoded as PNG
+
+    ### Raises
+
+    Same as embed_bytes, and OSError when a file cannot be read or written
+    """
+    loop = asyncio.get_running_loop()
+
+    # Files are read on the default executor, outside of the semaphore
+    if _is_path(payload):
+        payload = await loop.run_in_executor(None, _read_file, payload)
+    if _is_path(carrier):
+        carrier = await loop.run_in_executor(None, _read_file, carrier)
+
+    steganograph = await offload(
+        executor, semaphore,
+        partial(embed_bytes, **options),
+        _portable(payload, executor), _portable(carrier, executor),
+    )
+
+    if output is not None:
+        await loop.run_in_executor(None, _write_file, output, steganograph)
+    return steganograph
+
+
+async def async_extract_steg(
+    image: Any,
+    output: Optional[Union[str, PathLike]] = None,
+    *,
+    executor: Optional[Executor] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    **options: Any,
+) -> bytes:
+    """Extracts the payload of a steganograph, without blocking the event
+    loop.
+
+    ### Positional arguments
+
+    - image (str | PathLike | bytes-like | PIL.Image.Image)
+        - Path of the steganograph, or the steganograph itself (see
+        extract_bytes)
+
+    - output (str | PathLike) (default = None)
+        - Path of the file to write the extracted data to, if any
+
+    ### Keyword arguments
+
+    - executor (concurrent.futures.Executor) (default = None)
+        - The thread or process pool to extract on, a shared thread pool
+        of cfg.default_concurrency threads if None
+
+    - semaphore (asyncio.Semaphore) (default = None)
+        - Caps the number of jobs in flight, a semaphore of
+        cfg.default_concurrency shared by the event loop if None
+
+    - Any other keyword argument of extract_bytes
+
+    ### Returns
+
+    The extracted data
+
+    ### Raises
+
+    Same as extract_bytes, and OSError when a file cannot be read or
+    written
+    """
+    loop = asyncio.get_running_loop()
+
+    # Files are read on the default executor, outside of the semaphore
+    if _is_path(image):
+        image = await loop.run_in_executor(None, _read_file, image)
+
+    data = await offload(executor, semaphore,
+                         partial(extract_bytes, **options),
+                         _portable(image, executor))
+
+    if output is not None:
+        await loop.run_in_executor(None, _write_file, output, data)
+    return data
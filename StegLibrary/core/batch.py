@@ -0,0 +1,445 @@
+# This script implements the batch API, which runs many operations through
+# a shared pool of worker processes. Each worker keeps its imports and a
+# small cache of decoded carriers alive between jobs, and the errors of each
+# job are reported in its own result instead of aborting the batch.
+
+# Builtin modules
+from collections import OrderedDict, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from io import BytesIO
+from glob import escape, glob
+from os import path, remove, stat
+from threading import Lock
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+# Internal modules
+from StegLibrary.core import SteganographyConfig as cfg
+from StegLibrary.core.errors import OutputFileError, SteganographyError
+from StegLibrary.core.steg import write_steg, extract_steg
+from StegLibrary.helper import err_imp
+
+# Non-builtin modules
+try:
+    from PIL import Image
+except ImportError:
+    err_imp("Pillow")
+    exit(1)
+
+
+# A job of write_steg_batch: (payload, carrier, output, options)
+# - payload: path to the input file, or its content
+# - carrier: path to the image file, or its content
+# - output: path to the output file, or None to return the PNG bytes
+# - options: keyword arguments of write_steg (or None)
+WriteJob = Tuple[
+    Union[str, bytes],
+    Union[str, bytes],
+    Optional[str],
+    Optional[Dict[str, Any]],
+]
+
+# A job of extract_steg_batch: (steganograph, output, options, rejection)
+# - steganograph: path to the steganograph
+# - output: path to the output file
+# - options: keyword arguments of extract_steg (or None)
+# - rejection: why the job must fail without running (or None)
+ExtractJob = Tuple[str, str, Optional[Dict[str, Any]], Optional[str]]
+
+# Number of decoded carriers kept by each worker
+carrier_cache_size: int = 8
+
+# Total number of pixels of the decoded carriers kept by each worker, so
+# that large carriers do not fill the memory (about 256 MiB of RGBA pixels)
+carrier_cache_pixels: int = 1 << 26
+
+# Number of jobs submitted ahead, per worker, so that large batches are
+# not queued in memory all at once
+jobs_per_worker: int = 4
+
+
+class BatchResult(NamedTuple):
+    """The outcome of one job of a batch."""
+
+    # Position of the job in the batch
+    index: int
+    # Whether the job succeeded
+    success: bool
+    # The value returned by the job, if any
+    value: Any
+    # The error raised by the job, if any
+    error: Optional[BaseException]
+    # Time spent running the job, in seconds
+    elapsed: float
+
+
+# Decoded carriers of this worker, least recently used first
+_carriers: OrderedDict = OrderedDict()
+_carriers_lock: Lock = Lock()
+
+
+def _load_carrier(path: str, mtime: int, size: int) -> Image.Image:
+    """Decodes a carrier, keyed by its modification time and size so that
+    modified files are decoded again."""
+    key = (path, mtime, size)
+    with _carriers_lock:
+        if key in _carriers:
+            _carriers.move_to_end(key)
+            return _carriers[key]
+
+    with open(path, "rb") as file:
+        image = Image.open(file)
+        image.load()
+
+    with _carriers_lock:
+        _carriers[key] = image
+        # Evict the least recently used carriers beyond either bound. A
+        # carrier larger than the whole cache is not kept.
+        pixels = sum(x * y for x, y in (
+            carrier.size for carrier in _carriers.values()))
+        while _carriers and (len(_carriers) > carrier_cache_size or
+                             pixels > carrier_cache_pixels):
+            x_dim, y_dim = _carriers.popitem(last=False)[1].size
+            pixels -= x_dim * y_dim
+    return image
+
+
+def _open_carrier(carrier: Union[str, bytes]) -> Image.Image:
+    """Opens a fresh, decoded copy of the carrier."""
+    if isinstance(carrier, str):
+        info = stat(carrier)
+        # The cached image must not be modified, hence the copy
+        return _load_carrier(carrier, info.st_mtime_ns, info.st_size).copy()
+    image = Image.open(BytesIO(carrier))
+    image.load()
+    return image
+
+
+def _run_write_job(job: WriteJob) -> Optional[bytes]:
+    """Runs one job of write_steg_batch."""
+    payload, carrier, output, options = job
+
+    image = _open_carrier(carrier)
+    if isinstance(payload, str):
+        input_file = open(payload, "rb")
+    else:
+        input_file = BytesIO(payload)
+
+    # The steganograph is encoded in memory, so that a failed job leaves
+    # the output file untouched
+    steganograph = BytesIO()
+    try:
+        write_steg(input_file, image, steganograph, **dict(
+            options or {}, close_on_exit=False,
+            show_image_on_completion=False))
+    finally:
+        input_file.close()
+    if output is None:
+        return steganograph.getvalue()
+
+    # Only an output file made by this job is removed on failure
+    try:
+        output_file = open(output, "xb")
+        created = True
+    except FileExistsError:
+        output_file = open(output, "wb")
+        created = False
+    try:
+        with output_file:
+            output_file.write(steganograph.getbuffer())
+    except BaseException:
+        # Do not leave partial output behind
+        if created:
+            remove(output)
+        raise
+    return None
+
+
+def _run_extract_job(job: ExtractJob) -> int:
+    """Runs one job of extract_steg_batch, returning the bytes written."""
+    steganograph, output, options, rejection = job
+    if rejection is not None:
+        raise OutputFileError(rejection)
+    # Also catches links, which paths alone do not tell
+    if path.exists(output) and path.samefile(steganograph, output):
+        raise OutputFileError(
+            f"Output file would overwrite the steganograph: {output}")
+
+    with open(steganograph, "rb") as input_file:
+        # Only an output file made by this job is removed on failure
+        try:
+            output_file = open(output, "xb")
+            created = True
+        except FileExistsError:
+            output_file = open(output, "wb")
+            created = False
+        try:
+            with output_file:
+                extract_steg(input_file, [output_file], **dict(
+                    options or {}, close_on_exit=False))
+                return output_file.tell()
+        except BaseException:
+            # Do not leave partial output behind
+            if created:
+                remove(output)
+            raise
+
+
+def _run_job(function: Callable[[Any], Any], index: int,
+             job: Any) -> BatchResult:
+    """Runs a job, turning any error into a failed result."""
+    start = perf_counter()
+    try:
+        value = function(job)
+    except (Exception, SteganographyError) as e:
+        return BatchResult(index, False, None, e, perf_counter() - start)
+    return BatchResult(index, True, value, None, perf_counter() - start)
+
+
+def run_batch(
+    function: Callable[[Any], Any],
+    jobs: Iterable[Any],
+    *,
+    workers: int = cfg.default_workers,
+    ordered: bool = True,
+    executor: Optional[Executor] = None,
+) -> Iterator[BatchResult]:
+    """Runs a function over many jobs, through a pool of workers.
+
+    ### Positional arguments
+
+    - function (Callable)
+        - A picklable function, called with each job
+
+    - jobs (Iterable)
+        - The jobs, consumed lazily
+
+    ### Keyword arguments
+
+    - workers (int) (default = cfg.default_workers)
+        - Number of worker processes (1 runs the jobs in this process)
+
+    - ordered (bool) (default = True)
+        - Whether to yield results in the order of the jobs, otherwise
+        as they complete
+
+    - executor (concurrent.futures.Executor) (default = None)
+        - A pool to reuse across batches, a new one is made if None
+
+    ### Yields
+
+    A BatchResult for each job
+
+    ### Raises
+
+    - ValueError
+        - Raised when the number of workers is invalid
+    """
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError("Number of workers must be a positive integer!")
+
+    # Run in this process, when there is nothing to share the work with
+    if executor is None and workers == 1:
+        for index, job in enumerate(jobs):
+            yield _run_job(function, index, job)
+        return
+
+    pool = executor or ProcessPoolExecutor(workers)
+    try:
+        yield from _submit(pool, function, jobs, workers, ordered)
+    finally:
+        # Only shut down the pool made here
+        if executor is None:
+            pool.shutdown()
+
+
+def _submit(pool: Executor, function: Callable[[Any], Any],
+            jobs: Iterable[Any], workers: int,
+            ordered: bool) -> Iterator[BatchResult]:
+    """Submits jobs to the pool, keeping a bounded number in flight."""
+    pending: Deque[Future] = deque()
+    limit = workers * jobs_per_worker
+
+    for index, job in enumerate(jobs):
+        pending.append(pool.submit(_run_job, function, index, job))
+        if len(pending) >= limit:
+            yield _next_result(pending, ordered)
+    while pending:
+        yield _next_result(pending, ordered)
+
+
+def _next_result(pending: Deque[Future], ordered: bool) -> BatchResult:
+    """Waits for the next result, either the oldest or the first done."""
+    if not ordered:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        future = next(iter(done))
+        pending.remove(future)
+        return future.result()
+    return pending.popleft().result()
+
+
+def write_steg_batch(
+    jobs: Iterable[WriteJob],
+    *,
+    workers: int = cfg.default_workers,
+    ordered: bool = True,
+    executor: Optional[Executor] = None,
+) -> Iterator[BatchResult]:
+    """Performs steganography on many payloads, through a pool of workers.
+
+    ### Positional arguments
+
+    - jobs (Iterable[(payload, carrier, output, options)])
+        - payload (str | bytes): path to the input file, or its content
+        - carrier (str | bytes): path to the image file, or its content
+        - output (str | None): path to the output file, or None to
+        return the PNG bytes in the result. It is only written once the
+        steganograph is complete, so a failed job leaves it untouched.
+        - options (dict | None): keyword arguments of write_steg
+
+    ### Keyword arguments
+
+    - workers (int) (default = cfg.default_workers)
+        - Number of worker processes (1 runs the jobs in this process)
+
+    - ordered (bool) (default = True)
+        - Whether to yield results in the order of the jobs, otherwise
+        as they complete
+
+    - executor (concurrent.futures.Executor) (default = None)
+        - A pool to reuse across batches, a new one is made if None
+
+    ### Yields
+
+    A BatchResult for each job, whose value is the PNG bytes if no
+    output path was given
+
+    ### Raises
+
+    - ValueError
+        - Raised when the number of workers is invalid
+    """
+    return run_batch(_run_write_job, jobs, workers=workers, ordered=ordered,
+                     executor=executor)
+
+
+def collect_steganographs(
+    *,
+    directory: Optional[str] = None,
+    pattern: Optional[str] = None,
+    manifest: Optional[str] = None,
+) -> Iterator[str]:
+    """Lists steganographs from a directory, a glob pattern or a manifest.
+
+    ### Keyword arguments
+
+    - directory (str) (default = None)
+        - A directory, whose PNG files are listed (not recursively)
+
+    - pattern (str) (default = None)
+        - A glob pattern, "**" matching any number of directories
+
+    - manifest (str) (default = None)
+        - A text file listing one path per line
+
+    ### Yields
+
+    The path of each steganograph, in a stable order
+    """
+    if directory is not None:
+        yield from sorted(glob(path.join(escape(directory), "*.png")))
+    if pattern is not None:
+        yield from sorted(glob(pattern, recursive=True))
+    if manifest is not None:
+        with open(manifest, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+def extract_steg_batch(
+    steganographs: Iterable[str],
+    *,
+    output_dir: Optional[str] = None,
+    workers: int = cfg.default_workers,
+    ordered: bool = True,
+    executor: Optional[Executor] = None,
+    **options: Any,
+) -> Iterator[Tuple[str, str, BatchResult]]:
+    """Extracts many steganographs, through a pool of workers.
+
+    ### Positional arguments
+
+    - steganographs (Iterable[str])
+        - Paths to the steganographs, consumed lazily
+
+    ### Keyword arguments
+
+    - output_dir (str) (default = None)
+        - Directory of the output files, otherwise each one is written
+        next to its steganograph. Output files are named after the
+        steganograph, extension-stripped. A steganograph whose output
+        file would be itself (having no extension), or that of an earlier
+        steganograph (having the same name), fails with OutputFileError.
+
+    - workers (int) (default = cfg.default_workers)
+        - Number of worker processes (1 runs the jobs in this process)
+
+    - ordered (bool) (default = True)
+        - Whether to yield results in the order of the steganographs,
+        otherwise as they complete
+
+    - executor (concurrent.futures.Executor) (default = None)
+        - A pool to reuse across batches, a new one is made if None
+
+    - Any other keyword argument is passed on to extract_steg
+
+    ### Yields
+
+    A tuple (steganograph, output, result) for each steganograph, the
+    value of the result being the number of bytes extracted
+    """
+    sources = {}
+    # Output files of the jobs so far, so that no two jobs write the same
+    outputs = set()
+
+    def make_jobs() -> Iterator[ExtractJob]:
+        for index, steganograph in enumerate(steganographs):
+            name = path.splitext(steganograph)[0]
+            if output_dir is not None:
+                name = path.join(output_dir, path.basename(name))
+            sources[index] = (steganograph, name)
+
+            output = path.normcase(path.abspath(name))
+            if output == path.normcase(path.abspath(steganograph)):
+                rejection = "Output file would overwrite the " + \
+                    f"steganograph: {name}"
+            elif output in outputs:
+                rejection = "Output file is that of another " + \
+                    f"steganograph: {name}"
+            else:
+                rejection = None
+                outputs.add(output)
+            yield steganograph, name, options, rejection
+
+    for result in run_batch(_run_extract_job, make_jobs(), workers=workers,
+                            ordered=ordered, executor=executor):
+        yield sources.pop(result.index) + (result,)
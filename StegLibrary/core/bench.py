@@ -0,0 +1,735 @@
+# This script implements the benchmark suite (steg bench), which measures
+# create and extract on deterministic synthetic carriers and payloads,
+# across carrier sizes, densities, codecs, compression levels and payload
+# entropies. Results are JSON, so that runs can be compared, and changes
+# beyond the noise of the measurements reported as regressions.
+
+# Builtin modules
+import platform
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from hashlib import pbkdf2_hmac
+from io import BytesIO
+from math import exp, log, sqrt
+from multiprocessing import get_context
+from os import cpu_count
+from random import Random
+from statistics import mean, median, stdev
+from sys import platform as sys_platform
+from time import perf_counter
+from typing import Any, Callable, Dict, List, NamedTuple, \
+    Optional, Sequence, Tuple
+from zlib import compress
+
+# Internal modules
+from StegLibrary.core import SteganographyConfig as cfg
+from StegLibrary.core.capacity import storable_bits
+from StegLibrary.core.engine import channels_per_pixel
+from StegLibrary.core.memory import embed_bytes, extract_bytes
+from StegLibrary.core.timing import Timings
+from StegLibrary.helper import err_imp
+
+# Non-builtin modules
+try:
+    import numpy as np
+except ImportError:
+    err_imp("numpy")
+    exit(1)
+
+try:
+    import PIL
+    from PIL import Image
+except ImportError:
+    err_imp("Pillow")
+    exit(1)
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where peak RSS is not reported
+    resource = None
+
+# Format of the results, increased on incompatible changes
+result_version = 1
+
+# Approximate entropy of each kind of payload, in bits per byte
+payload_entropies: Dict[str, float] = {
+    # Mostly one repeated byte (as sparse or padded data)
+    "low": 0.7,
+    # 16 symbols, evenly spread (as text)
+    "medium": 4.0,
+    # Random bytes (as encrypted or already compressed data)
+    "high": 8.0,
+}
+
+
+class Profile(NamedTuple):
+    """The scenarios of a benchmark run, as the axes they are made of."""
+
+    # Sizes of the carriers, in megapixels
+    sizes: Tuple[float, ...]
+    densities: Tuple[int, ...]
+    codecs: Tuple[str, ...]
+    compressions: Tuple[int, ...]
+    # Kinds of payloads (see payload_entropies)
+    entropies: Tuple[str, ...]
+    # Number of times each operation is run
+    repeat: int
+
+
+bench_profiles: Dict[str, Profile] = {
+    # A few minutes at most, to run before and after a change
+    "quick": Profile(
+        sizes=(0.3,),
+        densities=tuple(cfg.available_density),
+        codecs=tuple(cfg.available_codec),
+        compressions=(0, 1, 9),
+        entropies=("low", "high"),
+        repeat=5,
+    ),
+    # Every combination, up to 50 megapixels (takes hours)
+    "full": Profile(
+        sizes=(0.3, 2.0, 12.0, 50.0),
+        densities=tuple(cfg.available_density),
+        codecs=tuple(cfg.available_codec),
+        compressions=tuple(cfg.available_compression),
+        entropies=tuple(payload_entropies),
+        repeat=3,
+    ),
+}
+
+# Share of the capacity of the carrier taken by the payload, leaving room
+# for the encryption of incompressible payloads
+default_fill: float = 0.25
+
+
+class Scenario(NamedTuple):
+    """A carrier and payload, and the settings they are embedded with."""
+
+    megapixels: float
+    density: int
+    codec: str
+    compression: int
+    entropy: str
+
+    @property
+    def name(self) -> str:
+        """Identifies the scenario across runs."""
+        # Without compression, the codec makes no difference
+        compression = f"{self.codec}-{self.compression}" \
+            if self.compression else "raw"
+        return f"{self.megapixels:g}MP/d{self.density}/{compression}/" + \
+            self.entropy
+
+
+def plan_scenarios(profile: Profile) -> List[Scenario]:
+    """Lists the scenarios of a profile, without duplicates."""
+    scenarios = []
+    for megapixels in profile.sizes:
+        for density in profile.densities:
+            for compression in profile.compressions:
+                # Only the first codec is kept, when not compressing
+                codecs = profile.codecs if compression else \
+                    profile.codecs[:1]
+                for codec in codecs:
+                    for entropy in profile.entropies:
+                        scenarios.append(Scenario(megapixels, density, codec,
+                                                  compression, entropy))
+    return scenarios
+
+
+def carrier_size(megapixels: float) -> Tuple[int, int]:
+    """Finds the dimensions of a 4:3 carrier of the given size."""
+    x_dim = max(1, round(sqrt(megapixels * 1e6 * 4 / 3)))
+    y_dim = max(1, round(x_dim * 3 / 4))
+    return x_dim, y_dim
+
+
+def make_carrier(megapixels: float, seed: int = 0) -> np.ndarray:
+    """Makes a photo-like carrier (smooth gradients, with sensor noise),
+    the same for a given seed.
+
+    ### Returns
+
+    The pixels of the carrier, as an RGB array
+    """
+    x_dim, y_dim = carrier_size(megapixels)
+    rng = np.random.default_rng(seed)
+    ramp_x = np.linspace(0, 255, x_dim).astype(np.uint16)
+    ramp_y = np.linspace(0, 255, y_dim).astype(np.uint16)
+
+    pixels = np.empty((y_dim, x_dim, channels_per_pixel), np.uint8)
+    # Each channel has its gradient running another way
+    for channel, (row, column) in enumerate(((ramp_y, ramp_x),
+                                             (ramp_y, ramp_x[::-1]),
+                                             (ramp_y[::-1], ramp_x))):
+        plane = np.add.outer(row, column) // 2
+        plane += rng.integers(0, 16, plane.shape, np.uint16)
+        np.minimum(plane, 255, out=plane)
+        pixels[..., channel] = plane
+    return pixels
+
+
+def make_payload(size: int, entropy: str, seed: int = 0) -> bytes:
+    """Makes a payload of the given kind (see payload_entropies), the same
+    for a given seed.
+
+    ### Raises
+
+    - ValueError
+        - Raised when the kind of payload is not known
+    """
+    rng = np.random.default_rng(seed)
+    if entropy == "high":
+        return rng.bytes(size)
+    if entropy == "medium":
+        symbols = np.frombuffer(b"etaoinshrdlucmfw", np.uint8)
+        return symbols[rng.integers(0, 16, size, np.uint8)].tobytes()
+    if entropy == "low":
+        # One byte in 20 is random
+        payload = np.full(size, ord("a"), np.uint8)
+        noisy = rng.integers(0, 20, size, np.uint8) == 0
+        payload[noisy] = rng.integers(0, 256, int(noisy.sum()), np.uint8)
+        return payload.tobytes()
+    raise ValueError(f"Entropy not supported! (given {entropy})")
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """Finds the q-th percentile of samples, interpolating between the
+    closest ones."""
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def peak_rss() -> Optional[int]:
+    """Finds the largest resident set size of this process so far, in
+    bytes, or None if it is not known."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Given in bytes on macOS, and in kilobytes elsewhere
+    return peak if sys_platform == "darwin" else peak * 1024
+
+
+class Measurement(NamedTuple):
+    """The times of a run of create then extract of a scenario."""
+
+    # Elapsed time of each operation, in seconds
+    create: float
+    extract: float
+    # Elapsed time of each stage of each operation, in seconds
+    create_stages: Dict[str, float]
+    extract_stages: Dict[str, float]
+    payload_bytes: int
+    steganograph_bytes: int
+    # Of the process, when the run ended
+    peak_rss_bytes: Optional[int]
+
+
+def _round_trip(scenario: Scenario, seed: int, fill: float,
+                create_timings: Optional[Timings] = None,
+                extract_timings: Optional[Timings] = None
+                ) -> Tuple[float, float, int, int]:
+    """Runs create then extract of a scenario, and returns the time of
+    each, then the size of the payload and of the steganograph."""
+    size = carrier_size(scenario.megapixels)
+    carrier = make_carrier(scenario.megapixels, seed)
+    payload_size = int(storable_bits(size, scenario.density) // 8 * fill)
+    payload = make_payload(payload_size, scenario.entropy, seed)
+
+    # The carrier is an array, which embed_bytes never modifies
+    start = perf_counter()
+    steganograph = embed_bytes(
+        payload,
+        carrier,
+        compression=scenario.compression,
+        codec=scenario.codec,
+        density=scenario.density,
+        timings=create_timings,
+    )
+    create = perf_counter() - start
+
+    start = perf_counter()
+    data = extract_bytes(steganograph, timings=extract_timings)
+    extract = perf_counter() - start
+    if data != payload:
+        raise RuntimeError(f"Payload of {scenario.name} is corrupted")
+    return create, extract, payload_size, len(steganograph)
+
+
+def measure_scenario(scenario: Scenario, seed: int = 0,
+                     fill: float = default_fill) -> Measurement:
+    """Runs create (embed_bytes) then extract (extract_bytes) of a
+    scenario once.
+
+    ### Raises
+
+    - RuntimeError
+        - Raised when the payload extracted differs from the one embedded
+    """
+    # First calls load codecs and image plugins, which is left out by
+    # running both operations on a small carrier first
+    _round_trip(scenario._replace(megapixels=0.01), seed, fill)
+
+    create_timings, extract_timings = Timings(), Timings()
+    create, extract, payload_size, steganograph_size = _round_trip(
+        scenario, seed, fill, create_timings, extract_timings)
+    return Measurement(
+        create,
+        extract,
+        {stage: timing.wall
+         for stage, timing in create_timings.stages.items()},
+        {stage: timing.wall
+         for stage, timing in extract_timings.stages.items()},
+        payload_size,
+        steganograph_size,
+        peak_rss(),
+    )
+
+
+def _measure_isolated(scenario: Scenario, seed: int,
+                      fill: float) -> Measurement:
+    """Measures a scenario in a new process, so that its peak RSS is its
+    own, and it does not inherit the memory of the previous ones."""
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) \
+            as executor:
+        return executor.submit(measure_scenario, scenario, seed,
+                               fill).result()
+
+
+def _summarise(samples: List[float], stages: List[Dict[str, float]],
+               payload_size: int, pixels: int) -> Dict[str, Any]:
+    """Sums up the times of an operation."""
+    centre = percentile(samples, 50)
+    return {
+        "samples": [round(sample, 6) for sample in samples],
+        "min": round(min(samples), 6),
+        "mean": round(mean(samples), 6),
+        "stdev": round(stdev(samples), 6) if len(samples) > 1 else 0.0,
+        "p50": round(centre, 6),
+        "p90": round(percentile(samples, 90), 6),
+        "p99": round(percentile(samples, 99), 6),
+        # Of the payload, in decimal megabytes
+        "mb_per_s": round(payload_size / centre / 1e6, 3),
+        "pixels_per_s": round(pixels / centre),
+        # Mean time of each stage, in seconds
+        "stages": {stage: round(mean(run.get(stage, 0.0) for run in stages),
+                                6)
+                   for stage in stages[0]},
+    }
+
+
+def _describe(scenario: Scenario,
+              measurements: List[Measurement]) -> Dict[str, Any]:
+    """Describes a scenario, and sums up its measurements."""
+    size = carrier_size(scenario.megapixels)
+    pixels = size[0] * size[1]
+    payload_size = measurements[0].payload_bytes
+    peaks = [measurement.peak_rss_bytes for measurement in measurements]
+    return {
+        "name": scenario.name,
+        **scenario._asdict(),
+        "size": list(size),
+        "payload_bytes": payload_size,
+        "steganograph_bytes": measurements[0].steganograph_bytes,
+        "peak_rss_bytes": None if None in peaks else max(peaks),
+        "create": _summarise(
+            [measurement.create for measurement in measurements],
+            [measurement.create_stages for measurement in measurements],
+            payload_size, pixels),
+        "extract": _summarise(
+            [measurement.extract for measurement in measurements],
+            [measurement.extract_stages for measurement in measurements],
+            payload_size, pixels),
+    }
+
+
+@lru_cache(maxsize=None)
+def _calibration_inputs() -> Tuple[Image.Image, bytes, np.ndarray]:
+    """Makes the inputs of the calibration workload, once."""
+    return (Image.fromarray(make_carrier(0.3, 1)),
+            make_payload(1 << 20, "medium"),
+            np.frombuffer(make_payload(1 << 21, "high"), np.uint8))
+
+
+def calibrate(rounds: int = 5) -> List[float]:
+    """Times a fixed workload running no code of the library, but the
+    same kinds of work (PNG encoding, key derivation, compression and
+    array arithmetic), so that the speed of the machine can be told apart
+    from that of the library.
+
+    ### Returns
+
+    The time of each round, in seconds
+    """
+    image, data, array = _calibration_inputs()
+    samples = []
+    for _ in range(rounds):
+        start = perf_counter()
+        image.save(BytesIO(), "PNG")
+        pbkdf2_hmac("sha256", data[:16], data[16:32], 10000)
+        compress(data, 6)
+        int(((array & 0xFE) | (array >> 7)).sum())
+        samples.append(perf_counter() - start)
+    return samples
+
+
+def environment() -> Dict[str, Any]:
+    """Describes the machine and versions the benchmarks run on."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": cpu_count(),
+        "numpy": np.__version__,
+        "pillow": PIL.__version__,
+    }
+
+
+def run_bench(
+    scenarios: Sequence[Scenario],
+    repeat: int,
+    *,
+    seed: int = 0,
+    fill: float = default_fill,
+    isolate: bool = True,
+    on_progress: Optional[Callable[[int, int, Scenario], None]] = None,
+) -> Dict[str, Any]:
+    """Runs scenarios, and returns the results of the run.
+
+    Scenarios are run in rounds, each running every scenario once in
+    another order, so that the samples of a scenario are spread over the
+    run, as is any drift of the speed of the machine.
+
+    ### Positional arguments
+
+    - scenarios (Sequence[Scenario])
+        - The scenarios to run (see plan_scenarios)
+
+    - repeat (int)
+        - Number of rounds, i.e. of times each operation is run
+
+    ### Keyword arguments
+
+    - seed (int) (default = 0)
+        - Seed of the carriers and payloads, and of the order of each round
+
+    - fill (float) (default = default_fill)
+        - Share of the capacity of each carrier taken by its payload
+
+    - isolate (bool) (default = True)
+        - Whether to run each scenario in a new process (else peak RSS is
+        that of this process, over all scenarios so far)
+
+    - on_progress (Callable) (default = None)
+        - Called with the number of runs done, the total number of runs and
+        the scenario, once each run completes
+
+    ### Returns
+
+    The results, in a JSON serialisable form: the environment, the settings,
+    the speed of the machine (see calibrate) and the results of each
+    scenario
+
+    ### Raises
+
+    - ValueError
+        - Raised when repeat is below 1, or fill not in (0, 1]
+
+    - RuntimeError
+        - Raised when the payload extracted differs from the one embedded
+    """
+    if repeat < 1:
+        raise ValueError(f"Repeat must be at least 1! (given {repeat})")
+    if not 0 < fill <= 1:
+        raise ValueError(f"Fill must be in (0, 1]! (given {fill})")
+
+    measure = _measure_isolated if isolate else measure_scenario
+    measurements: List[List[Measurement]] = [[] for _ in scenarios]
+    calibration = calibrate(3)
+    for round_number in range(repeat):
+        order = list(range(len(scenarios)))
+        Random(seed + round_number).shuffle(order)
+        for index in order:
+            measurements[index].append(
+                measure(scenarios[index], seed, fill))
+            # The machine is timed along the run, as its speed may drift
+            calibration += calibrate(1)
+            if on_progress is not None:
+                on_progress(sum(map(len, measurements)),
+                            repeat * len(scenarios), scenarios[index])
+
+    return {
+        "version": result_version,
+        "environment": environment(),
+        "settings": {
+            "repeat": repeat,
+            "seed": seed,
+            "fill": fill,
+            "isolate": isolate,
+        },
+        "calibration": {
+            "samples": [round(sample, 6) for sample in calibration],
+            "p50": round(percentile(calibration, 50), 6),
+        },
+        "scenarios": [_describe(scenario, runs)
+                      for scenario, runs in zip(scenarios, measurements)],
+    }
+
+
+class Comparison(NamedTuple):
+    """The change of an operation of a scenario, between two runs."""
+
+    name: str
+    # create or extract (median time, in seconds), or memory (peak RSS, in
+    # bytes)
+    operation: str
+    baseline: float
+    current: float
+    # Relative change, positive when slower or larger
+    change: float
+    # Smallest relative change that is not noise
+    threshold: float
+    # Probability of samples shifted this much, were both runs alike (None
+    # for memory, measured once, and overall changes)
+    p_value: Optional[float]
+    # regression, improvement or unchanged
+    verdict: str
+
+
+class BenchComparison(NamedTuple):
+    """The changes between two runs."""
+
+    comparisons: List[Comparison]
+    # Names of the scenarios only in the baseline, and only in the current
+    # run
+    missing: List[str]
+    added: List[str]
+    # Time of the calibration workload in the current run, relative to the
+    # baseline (times of the current run are divided by it), or None if
+    # times are compared as measured
+    speed: Optional[float]
+
+
+def relative_noise(samples: Sequence[float]) -> float:
+    """Estimates the standard deviation of samples relative to their
+    median, from their median absolute deviation (robust to outliers)."""
+    centre = median(samples)
+    if len(samples) < 2 or centre <= 0:
+        return 0.0
+    deviation = median([abs(sample - centre) for sample in samples])
+    # Scaled to the standard deviation, were the noise normal
+    return deviation * 1.4826 / centre
+
+
+@lru_cache(maxsize=None)
+def _rank_counts(m: int, n: int) -> Tuple[int, ...]:
+    """Counts the orderings of m and n samples by the number of pairs in
+    which the sample of the first group is the larger (the U statistic)."""
+    if m == 0 or n == 0:
+        return (1,)
+    counts = [0] * (m * n + 1)
+    # The largest sample is either of the first group, larger than all n
+    # samples of the second, or of the second group
+    for pairs, count in enumerate(_rank_counts(m - 1, n)):
+        counts[pairs + n] += count
+    for pairs, count in enumerate(_rank_counts(m, n - 1)):
+        counts[pairs] += count
+    return tuple(counts)
+
+
+def slower_p_value(baseline: Sequence[float],
+                   current: Sequence[float]) -> float:
+    """Finds the probability that current samples would be at least this
+    much slower than the baseline ones, were both alike (exact one-sided
+    Mann-Whitney U test). Only the order of samples matters, so that
+    outliers weigh no more than other samples."""
+    # Pairs in which the current sample is slower, ties counting half
+    pairs = sum((after > before) + (after == before) / 2
+                for after in current for before in baseline)
+    counts = _rank_counts(len(current), len(baseline))
+    return sum(counts[int(pairs):]) / sum(counts)
+
+
+def _judge(name: str, operation: str, baseline: float, current: float,
+           threshold: float, p_values: Optional[Tuple[float, float]],
+           alpha: float) -> Comparison:
+    """Compares two measurements, given the smallest significant change
+    and, for times, the p-values of them being slower and faster."""
+    ratio = current / baseline
+    slower, faster = p_values if p_values is not None else (0.0, 0.0)
+    # Symmetric in ratio, so that halving and doubling are alike
+    if ratio > 1 + threshold and slower <= alpha:
+        verdict, p_value = "regression", slower
+    elif ratio < 1 / (1 + threshold) and faster <= alpha:
+        verdict, p_value = "improvement", faster
+    else:
+        verdict, p_value = "unchanged", min(slower, faster)
+    return Comparison(name, operation, baseline, current, ratio - 1,
+                      threshold, p_value if p_values is not None else None,
+                      verdict)
+
+
+def compare_bench(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    *,
+    tolerance: float = cfg.default_bench_tolerance,
+    sigmas: float = cfg.default_bench_sigmas,
+    alpha: float = cfg.default_bench_alpha,
+    memory_tolerance: float = cfg.default_bench_memory_tolerance,
+    normalise: bool = True,
+) -> BenchComparison:
+    """Compares the results of two runs (see run_bench), scenario by
+    scenario.
+
+    The median time of an operation changes significantly when:
+
+    - it changes by more than the tolerance, and by more than sigmas times
+    the noise of both runs (see relative_noise), so that noisy scenarios
+    need larger changes to be reported
+
+    - the samples of the current run are shifted from those of the
+    baseline, at the significance level alpha (see slower_p_value), unless
+    there are too few samples for any shift to be
+
+    The overall change of each operation, the geometric mean of its changes
+    over all scenarios, is also compared (as the scenario "overall"), to
+    catch changes too small to tell in any one scenario.
+
+    ### Positional arguments
+
+    - baseline (Dict[str, Any])
+        - The results of the reference run
+
+    - current (Dict[str, Any])
+        - The results of the run to check
+
+    ### Keyword arguments
+
+    - tolerance (float) (default = cfg.default_bench_tolerance)
+        - Smallest relative change of a median time that is reported
+
+    - sigmas (float) (default = cfg.default_bench_sigmas)
+        - Number of standard deviations of the noise a change must exceed
+
+    - alpha (float) (default = cfg.default_bench_alpha)
+        - Largest probability of a change being noise, for it to be reported
+
+    - memory_tolerance (float)
+    (default = cfg.default_bench_memory_tolerance)
+        - Smallest relative change of a peak RSS that is reported (only
+        compared when both runs isolate their scenarios)
+
+    - normalise (bool) (default = True)
+        - Whether to scale times by the speed of each machine (see
+        calibrate), so that runs on different or busier machines compare
+
+    ### Returns
+
+    The comparisons of the scenarios of both runs, in the order of the
+    current one (see BenchComparison)
+
+    ### Raises
+
+    - ValueError
+        - Raised when the results are not in a supported format
+    """
+    for results in (baseline, current):
+        if results.get("version") != result_version:
+            raise ValueError("Results must be of version " +
+                             f"{result_version}! (given " +
+                             f"{results.get('version')})")
+
+    speed = None
+    if normalise and "calibration" in baseline and "calibration" in current:
+        speed = current["calibration"]["p50"] / \
+            baseline["calibration"]["p50"]
+    scale = 1 / speed if speed else 1
+
+    baseline_scenarios = {scenario["name"]: scenario
+                          for scenario in baseline["scenarios"]}
+    current_names = {scenario["name"] for scenario in current["scenarios"]}
+    # Peak RSS includes previous scenarios, unless each has its process
+    compare_memory = baseline["settings"].get("isolate") and \
+        current["settings"].get("isolate")
+
+    comparisons, added = [], []
+    noises: Dict[str, List[float]] = {"create": [], "extract": []}
+    for scenario in current["scenarios"]:
+        name = scenario["name"]
+        if name not in baseline_scenarios:
+            added.append(name)
+            continue
+        reference = baseline_scenarios[name]
+
+        for operation in ("create", "extract"):
+            before = reference[operation]["samples"]
+            after = [sample * scale
+                     for sample in scenario[operation]["samples"]]
+            noise = (relative_noise(before) ** 2 +
+                     relative_noise(after) ** 2) ** 0.5
+            noises[operation].append(noise)
+            p_values = (slower_p_value(before, after),
+                        slower_p_value(after, before))
+            # With few samples, no order is unlikely enough to tell
+            counts = _rank_counts(len(after), len(before))
+            if counts[-1] / sum(counts) > alpha:
+                p_values = (0.0, 0.0)
+            comparisons.append(_judge(
+                name, operation, reference[operation]["p50"],
+                scenario[operation]["p50"] * scale,
+                max(tolerance, sigmas * noise),
+                p_values, alpha))
+
+        if compare_memory and reference["peak_rss_bytes"] and \
+                scenario["peak_rss_bytes"]:
+            comparisons.append(_judge(
+                name, "memory", reference["peak_rss_bytes"],
+                scenario["peak_rss_bytes"], memory_tolerance, None, alpha))
+
+    # A change slowing every scenario a little is told from noise by
+    # their mean change, whose error shrinks with the number of scenarios
+    overall = []
+    for operation in ("create", "extract"):
+        changes = [comparison for comparison in comparisons
+                   if comparison.operation == operation]
+        if len(changes) < 2:
+            continue
+        shifts = [log(change.current / change.baseline)
+                  for change in changes]
+        # Spread of the changes, or noise of the scenarios if larger
+        spread = max(stdev(shifts),
+                     mean(noise ** 2 for noise in noises[operation]) ** 0.5)
+        error = spread / sqrt(len(shifts))
+        overall.append(_judge(
+            "overall", operation,
+            exp(mean(log(change.baseline) for change in changes)),
+            exp(mean(log(change.current) for change in changes)),
+            max(tolerance, exp(sigmas * error) - 1), None, alpha))
+
+    missing = [name for name in baseline_scenarios
+               if name not in current_names]
+    return BenchComparison(overall + comparisons, missing, added, speed)
+
+
+def format_comparisons(comparisons: Sequence[Comparison]) -> str:
+    """Returns comparisons as a table, times in milliseconds and memory in
+    mebibytes."""
+    lines = [f"{'scenario':<24}{'operation':<11}{'baseline':>10}"
+             f"{'current':>10}{'change':>9}{'limit':>8}{'p':>7}  verdict"]
+    for comparison in comparisons:
+        scale = 1 / (1 << 20) if comparison.operation == "memory" else 1000
+        p_value = "-" if comparison.p_value is None else \
+            f"{comparison.p_value:.3f}"
+        lines.append(
+            f"{comparison.name:<24}{comparison.operation:<11}"
+            f"{comparison.baseline * scale:>10.2f}"
+            f"{comparison.current * scale:>10.2f}"
+            f"{comparison.change:>+9.1%}{comparison.threshold:>8.1%}"
+            f"{p_value:>7}  {comparison.verdict}")
+    return "\n".join(lines)
@@ -0,0 +1,245 @@
+# This script implements the capacity planner, which finds whether a payload
+# fits in a carrier from the dimensions of the carrier alone. Pixel data is
+# never decoded, and the header and cipher overhead is computed exactly, so
+# that only the effect of compression has to be estimated.
+
+# Builtin modules
+from io import RawIOBase, BufferedIOBase
+from typing import Callable, NamedTuple, Tuple, Union
+
+# Internal modules
+from StegLibrary.core import SteganographyConfig as cfg
+from StegLibrary.core.codec import codecs, find_codec
+from StegLibrary.core.engine import channels_per_pixel, mode_channels
+from StegLibrary.core.header import Header
+from StegLibrary.core.mapped import MappedCarrier
+from StegLibrary.crypto.stream import (
+    frame_header_length,
+    nonce_prefix_length,
+    tag_length,
+)
+from StegLibrary.helper import err_imp
+
+# Non-builtin modules
+try:
+    from PIL import Image
+except ImportError:
+    err_imp("Pillow")
+    exit(1)
+
+
+class CapacityPlan(NamedTuple):
+    """Whether a payload fits in a carrier, at a given density."""
+
+    # Dimensions of the carrier, in pixels
+    size: Tuple[int, int]
+    # The data density
+    density: int
+    # Number of bytes the carrier can hold, including all overhead
+    storable_bytes: int
+    # Largest data that fits, once compressed (if enabled)
+    usable_bytes: int
+    # Size of the payload
+    payload_size: int
+    # Number of bytes stored for the payload, including all overhead, if
+    # compression goes as well (best) or as badly (worst) as it can
+    best_case_bytes: int
+    worst_case_bytes: int
+    # Whether the payload fits, in the best and worst cases
+    fits_best_case: bool
+    fits_worst_case: bool
+
+
+def storable_bits(size: Tuple[int, int], density: int,
+                  channels: int = channels_per_pixel) -> int:
+    """Finds the number of bits a carrier of the given size can hold."""
+    x_dim, y_dim = size
+    # Each pixel holds density bits in each of its colour integers
+    return x_dim * y_dim * channels * density
+
+
+def carrier_channels(mode: str, header_version: int) -> int:
+    """Finds the number of colour integers of each pixel used to store
+    data, given the image mode and the header format.
+
+    ### Raises
+
+    - ValueError
+        - Raised when the image mode is not supported
+    """
+    if mode not in mode_channels:
+        raise ValueError(f"Image mode not supported! (given {mode})")
+    # A text header implies 3 channels, so only RGB and RGBA (with its
+    # alpha channel left alone) can carry one
+    if header_version == 1:
+        if mode_channels[mode] < Header.legacy_channels:
+            raise ValueError(
+                f"Image mode requires a version 2 header! (given {mode})")
+        return Header.legacy_channels
+    return mode_channels[mode]
+
+
+def token_length(length: int) -> int:
+    """Finds the length of the Fernet token of data of the given length.
+
+    A token holds a version byte, a timestamp, an IV, the data padded to
+    whole AES blocks and an HMAC, all encoded in base64.
+    """
+    raw_length = 1 + 8 + 16 + (length // 16 + 1) * 16 + 32
+    return -(-raw_length // 3) * 4
+
+
+def stream_length(length: int, buffer_size: int) -> int:
+    """Finds the length of data of the given length, in stream format.
+
+    Data is sealed in frames of buffer_size bytes, followed by a last
+    frame holding the rest (which may be empty).
+    """
+    frames = length // buffer_size + 1
+    return nonce_prefix_length + length + \
+        frames * (frame_header_length + tag_length)
+
+
+def compressed_length_bounds(length: int, compression: int,
+                             codec: str = cfg.default_codec
+                             ) -> Tuple[int, int]:
+    """Estimates the smallest and largest sizes of compressed data."""
+    if compression == 0:
+        return length, length
+    return codecs[find_codec(codec)].bounds(length)
+
+
+def header_length(header_version: int) -> int:
+    """Finds the (maximum) length of a header of the given version."""
+    if header_version == 1:
+        return Header.header_length
+    return Header.binary_header_length
+
+
+def stored_length(length: int, *, stream: bool, buffer_size: int,
+                  header_version: int) -> int:
+    """Finds the number of bytes stored for (compressed) data, including
+    the header and the cipher overhead."""
+    if stream:
+        data_length = stream_length(length, buffer_size)
+    else:
+        data_length = token_length(length)
+    return header_length(header_version) + data_length
+
+
+def _largest(fits: Callable[[int], bool], upper: int) -> int:
+    """Finds the largest length in [0, upper] which fits, or -1."""
+    low, high = -1, upper
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def plan_capacity(
+    image: Union[str, Image.Image, MappedCarrier, RawIOBase, BufferedIOBase],
+    payload_size: int,
+    *,
+    density: int = cfg.default_density,
+    compression: int = cfg.default_compression,
+    codec: str = cfg.default_codec,
+    stream: bool = cfg.flag_stream,
+    buffer_size: int = cfg.default_buffer_size,
+    header_version: int = cfg.default_header_version,
+) -> CapacityPlan:
+    """Finds whether a payload fits in a carrier, without decoding pixels.
+
+    Only the dimensions of the carrier are read. The header and cipher
+    overhead is exact, but the size of compressed data is estimated,
+    hence the best and worst cases.
+
+    ### Positional arguments
+
+    - image (str | PIL.Image.Image | MappedCarrier | RawIOBase |
+    BufferedIOBase)
+        - The carrier image, its path or a readable file-like object of it
+
+    - payload_size (int)
+        - Size of the payload, in bytes
+
+    ### Keyword arguments
+
+    - density (int) (default = cfg.default_density)
+        - The data density
+
+    - compression (int) (default = cfg.default_compression)
+        - The compression level
+
+    - codec (str) (default = cfg.default_codec)
+        - The compression codec
+
+    - stream (bool) (default = cfg.flag_stream)
+        - Whether the data is written in stream format
+
+    - buffer_size (int) (default = cfg.default_buffer_size)
+        - Size of each chunk, in bytes, in stream format
+
+    - header_version (int) (default = cfg.default_header_version)
+        - The header format
+
+    ### Returns
+
+    A CapacityPlan of the carrier and the payload
+
+    ### Raises
+
+    - ValueError
+        - Raised when the parametres given are not valid, or the image
+        mode is not supported
+    """
+    # Validate parametres by compare with configuration
+    if density not in cfg.available_density:
+        raise ValueError("Density not defined!")
+    if compression not in cfg.available_compression:
+        raise ValueError("Compression level not defined!")
+    if codec not in cfg.available_codec:
+        raise ValueError("Codec not defined!")
+    if header_version not in cfg.available_header_version:
+        raise ValueError("Header version not defined!")
+    if not isinstance(payload_size, int) or payload_size < 0:
+        raise ValueError("Payload size must be a non-negative integer!")
+    if not isinstance(buffer_size, int) or buffer_size < 1:
+        raise ValueError("Buffer size must be a positive integer!")
+
+    # Opening an image only reads its header, not its pixel data
+    if isinstance(image, (Image.Image, MappedCarrier)):
+        size, mode = image.size, image.mode
+    else:
+        with Image.open(image) as opened:
+            size, mode = opened.size, opened.mode
+
+    channels = carrier_channels(mode, header_version)
+    storable_bytes = storable_bits(size, density, channels) // 8
+
+    def stored(length: int) -> int:
+        return stored_length(length, stream=stream, buffer_size=buffer_size,
+                             header_version=header_version)
+
+    # The stored length grows with the data length, so search for the
+    # largest data length that fits
+    usable_bytes = max(0, _largest(
+        lambda length: stored(length) <= storable_bytes, storable_bytes))
+
+    best, worst = compressed_length_bounds(payload_size, compression, codec)
+    best_case_bytes = stored(best)
+    worst_case_bytes = stored(worst)
+
+    return CapacityPlan(
+        size=size,
+        density=density,
+        storable_bytes=storable_bytes,
+        usable_bytes=usable_bytes,
+        payload_size=payload_size,
+        best_case_bytes=best_case_bytes,
+        worst_case_bytes=worst_case_bytes,
+        fits_best_case=best_case_bytes <= storable_bytes,
+        fits_worst_case=worst_case_bytes <= storable_bytes,
+    )
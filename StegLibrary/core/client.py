@@ -0,0 +1,355 @@
+# This script implements the client of the daemon (steg daemon), which
+# serves the library on a Unix socket from a warm pool of workers. The
+# client only needs the standard library, so that commands forwarded to the
+# daemon skip loading numpy, Pillow and cryptography, as well as deriving
+# keys and encoding images in a cold process.
+
+# Builtin modules
+import os
+import socket
+from getpass import getuser
+from io import RawIOBase, BufferedIOBase, TextIOBase
+from json import loads
+from os import environ, path
+from stat import S_ISSOCK
+from struct import calcsize, unpack
+from tempfile import gettempdir
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+# Internal modules
+from StegLibrary.core import SteganographyConfig as cfg
+from StegLibrary.core import errors
+from StegLibrary.core.protocol import (
+    create_parameters,
+    encode_form,
+    encode_query,
+    extract_parameters,
+)
+from StegLibrary.helper import check_output_files, write_chunks
+
+
+class DaemonError(Exception):
+    """Raised when the daemon fails, or does not answer as expected."""
+
+
+def daemon_socket_path() -> str:
+    """Finds the path of the Unix socket of the daemon: $STEG_SOCKET if set,
+    else a socket in the runtime directory of the user."""
+    if "STEG_SOCKET" in environ:
+        return environ["STEG_SOCKET"]
+    if "XDG_RUNTIME_DIR" in environ:
+        return path.join(environ["XDG_RUNTIME_DIR"], "steg.sock")
+    # The temporary directory is shared, so the socket is kept in a
+    # directory of the user, which the daemon makes private (see
+    # check_private)
+    return path.join(gettempdir(), f"steg-{getuser()}", "steg.sock")
+
+
+def check_private(file_path: str, socket_file: bool = False) -> None:
+    """Checks that a file (or directory) belongs to this user, and that no
+    one else can use it, so that payloads and keys are never sent to
+    another user binding the socket first.
+
+    ### Raises
+
+    - DaemonError
+        - Raised when the file belongs to another user, or others may use it
+
+    - OSError
+        - Raised when the file does not exist
+    """
+    info = os.stat(file_path)
+    # Users do not exist as such on Windows
+    if not hasattr(os, "getuid"):
+        return
+    if socket_file and not S_ISSOCK(info.st_mode):
+        raise DaemonError(f"Not a socket: {file_path}")
+    if info.st_uid != os.getuid():
+        raise DaemonError(f"Owned by another user: {file_path}")
+    if info.st_mode & 0o077:
+        raise DaemonError(f"Accessible to other users: {file_path}")
+
+
+class _Response:
+    """A response of the daemon, whose body is read from the connection.
+
+    The daemon always gives the length of the body, and nothing else of
+    HTTP is needed, so http.client (which loads ssl and email) is not used.
+    """
+
+    def __init__(self, stream: BufferedIOBase) -> None:
+        self.stream: BufferedIOBase = stream
+        line = stream.readline()
+        if not line:
+            raise ConnectionError("Daemon closed the connection")
+        try:
+            self.status: int = int(line.split()[1])
+        except (IndexError, ValueError):
+            raise DaemonError("Malformed response")
+        self.remaining: int = 0
+        while True:
+            line = stream.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                self.remaining = int(value)
+
+    def read(self, size: int = -1) -> bytes:
+        """Reads at most size bytes of the body, or all of it if negative."""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size)
+        if len(data) < size:
+            raise ConnectionError("Daemon closed the connection")
+        self.remaining -= size
+        return data
+
+
+def _raise_error(response: _Response) -> None:
+    """Raises the error the daemon answered with, as the library would have
+    raised it in process."""
+    try:
+        details = loads(response.read())
+        message, name = details["error"], details.get("type")
+    except (ValueError, KeyError, TypeError):
+        raise DaemonError(f"Daemon answered {response.status}")
+
+    error = getattr(errors, name, None) if name else None
+    if isinstance(error, type) and \
+            issubclass(error, errors.SteganographyError):
+        raise error(message)
+    if name == "ValueError":
+        raise ValueError(message)
+    if name == "TypeError":
+        raise TypeError(message)
+    raise DaemonError(f"Daemon answered {response.status}: {message}")
+
+
+class DaemonClient:
+    """Forwards operations to the daemon, over a keep-alive connection.
+
+    ### Positional arguments
+
+    - socket_path (str) (default = None)
+        - Path of the Unix socket of the daemon (see daemon_socket_path)
+
+    - timeout (float) (default = None)
+        - Timeout of each socket operation, in seconds (none if None)
+
+    The socket must belong to this user and be private to them (see
+    check_private), and so must the daemon answering on it, where the
+    system tells (SO_PEERCRED).
+    """
+
+    def __init__(self, socket_path: Optional[str] = None,
+                 timeout: Optional[float] = None) -> None:
+        self.socket_path: str = socket_path or daemon_socket_path()
+        self.timeout: Optional[float] = timeout
+        self.socket: Optional[socket.socket] = None
+        self.stream: Optional[BufferedIOBase] = None
+        # Largest request body the daemon accepts, known once connected
+        self.max_body_size: int = 0
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.stream is not None:
+            self.stream.close()
+        if self.socket is not None:
+            self.socket.close()
+        self.socket = self.stream = None
+
+    def _request(self, method: str, target: str, body: bytes = b"",
+                 content_type: str = "application/octet-stream"
+                 ) -> _Response:
+        """Sends a request, and returns the response once it succeeds."""
+        if self.socket is None:
+            check_private(self.socket_path, socket_file=True)
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(self.timeout)
+            try:
+                self.socket.connect(self.socket_path)
+                self._check_peer()
+            except (OSError, DaemonError):
+                self.close()
+                raise
+            self.stream = self.socket.makefile("rb")
+
+        self.socket.sendall((
+            f"{method} {target} HTTP/1.1\r\n"
+            "Host: localhost\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode("latin-1"))
+        if body:
+            self.socket.sendall(body)
+
+        response = _Response(self.stream)
+        if response.status != 200:
+            _raise_error(response)
+        return response
+
+    def _check_peer(self) -> None:
+        """Checks that the daemon runs as this user, where the system
+        tells."""
+        if not hasattr(socket, "SO_PEERCRED"):
+            return
+        credentials = self.socket.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, calcsize("3i"))
+        _, uid, _ = unpack("3i", credentials)
+        if uid != os.getuid():
+            raise DaemonError("Daemon runs as another user")
+
+    def health(self) -> Dict[str, Any]:
+        """Returns the status of the daemon."""
+        health = loads(self._request("GET", "/health").read())
+        self.max_body_size = health["max_body_size"]
+        return health
+
+    def accepts(self, size: int) -> bool:
+        """Whether the daemon accepts files of the given total size, allowing
+        for the encoding of the request."""
+        return size + (1 << 10) <= self.max_body_size
+
+    def create(
+        self,
+        payload: bytes,
+        carrier: bytes,
+        **options: Any,
+    ) -> bytes:
+        """Embeds a payload into a carrier, on the daemon.
+
+        ### Positional arguments
+
+        - payload (bytes)
+            - The data to embed
+
+        - carrier (bytes)
+            - The encoded carrier image
+
+        ### Keyword arguments
+
+        Same as embed_bytes, but engine and workers (the daemon has its own
+        pool). Options set to None are left to the defaults.
+
+        ### Returns
+
+        The steganograph, encoded as PNG
+
+        ### Raises
+
+        Same as embed_bytes, and:
+
+        - DaemonError
+            - Raised when the daemon fails unexpectedly
+
+        - OSError
+            - Raised when the daemon cannot be reached
+        """
+        content_type, body = encode_form({
+            "payload": payload,
+            "carrier": carrier,
+        })
+        query = encode_query(options, create_parameters)
+        return self._request("POST", f"/create?{query}", body,
+                             content_type).read()
+
+    def iter_extract(
+        self,
+        image: bytes,
+        *,
+        buffer_size: int = cfg.default_buffer_size,
+        **options: Any,
+    ) -> Iterator[bytes]:
+        """Extracts the payload of a steganograph on the daemon, and yields
+        it chunk by chunk, as it is received.
+
+        ### Positional arguments
+
+        - image (bytes)
+            - The encoded steganograph
+
+        ### Keyword arguments
+
+        - buffer_size (int) (default = cfg.default_buffer_size)
+            - The maximum size of a chunk, in bytes
+
+        - Same as extract_bytes, but engine, workers and key_cache (the
+        daemon has its own)
+
+        ### Raises
+
+        Same as create.
+        """
+        query = encode_query(options, extract_parameters)
+        response = self._request("POST", f"/extract?{query}", image)
+        while True:
+            chunk = response.read(buffer_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def extract(
+        self,
+        image: bytes,
+        output_file: List[Union[RawIOBase, BufferedIOBase, TextIOBase]],
+        *,
+        close_on_exit: bool = cfg.flag_close_on_exit,
+        **options: Any,
+    ) -> None:
+        """Extracts the payload of a steganograph on the daemon, and writes
+        it to the output file objects, as extract_steg does.
+
+        ### Raises
+
+        Same as iter_extract, and those of writing (see extract_steg).
+        """
+        check_output_files(output_file)
+        write_chunks(self.iter_extract(image, **options), output_file,
+                     close_on_exit=close_on_exit)
+
+
+def connect_daemon(
+    socket_path: Optional[str] = None,
+    timeout: Optional[float] = None,
+    connect_timeout: float = cfg.default_connect_timeout,
+) -> Optional[DaemonClient]:
+    """Connects to the daemon, if it is running.
+
+    ### Positional arguments
+
+    Same as DaemonClient, and:
+
+    - connect_timeout (float) (default = cfg.default_connect_timeout)
+        - Time the daemon has to connect and report its status, in seconds,
+        after which it is given up on
+
+    ### Returns
+
+    A DaemonClient connected to the daemon, or None if no daemon answers
+    (in time), or the socket or daemon is not private to this user
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    socket_path = socket_path or daemon_socket_path()
+    if not path.exists(socket_path):
+        return None
+
+    client = DaemonClient(socket_path, connect_timeout)
+    try:
+        client.health()
+    except (OSError, DaemonError, ValueError, KeyError):
+        # Nothing listens (stale socket), something else does, or it does
+        # not answer
+        client.close()
+        return None
+    # Operations take as long as their files need
+    client.timeout = timeout
+    client.socket.settimeout(timeout)
+    return client
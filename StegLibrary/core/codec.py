@@ -0,0 +1,209 @@
+# This script defines the compression codecs, which are identified in the
+# header of each steganograph. bz2 is the original codec, zlib trades ratio
+# for throughput, and lzma trades throughput for ratio.
+
+# Builtin modules
+import bz2
+import lzma
+import zlib
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+# Internal modules
+from StegLibrary.helper import err_imp
+
+# Non-builtin modules
+try:
+    import numpy as np
+except ImportError:
+    err_imp("numpy")
+    exit(1)
+
+
+class _ZlibDecompressor:
+    """Wraps a zlib decompression object into the interface of
+    bz2.BZ2Decompressor and lzma.LZMADecompressor."""
+
+    def __init__(self) -> None:
+        self._decompressor = zlib.decompressobj()
+        self.needs_input: bool = True
+
+    @property
+    def eof(self) -> bool:
+        return self._decompressor.eof
+
+    def decompress(self, data: bytes, max_length: int = -1) -> bytes:
+        # Input left over by the previous call comes first
+        data = self._decompressor.unconsumed_tail + data
+        # zlib uses 0, rather than -1, to mean no limit
+        result = self._decompressor.decompress(data, max(max_length, 0))
+        # Output may still be pending if the limit has been reached
+        self.needs_input = not self._decompressor.unconsumed_tail and \
+            (max_length < 0 or len(result) < max_length)
+        return result
+
+
+class Codec(NamedTuple):
+    """A compression codec."""
+
+    # Name of the codec, as given by the user
+    name: str
+    # Compresses data at once, given the data and the level (1 - 9)
+    compress: Callable[[bytes, int], bytes]
+    # Makes an incremental compressor, with compress() and flush(),
+    # given the level (1 - 9)
+    compressor: Callable[[int], Any]
+    # Makes an incremental decompressor, with decompress(data, max_length),
+    # eof and needs_input
+    decompressor: Callable[[], Any]
+    # Estimates the smallest and largest sizes of compressed data, given
+    # the size of the data
+    bounds: Callable[[int], Tuple[int, int]]
+
+
+def _bz2_bounds(length: int) -> Tuple[int, int]:
+    # A single block of repeated bytes, and the documented worst case
+    if length == 0:
+        return 14, 14
+    return 37, length + length // 100 + 600
+
+
+def _zlib_bounds(length: int) -> Tuple[int, int]:
+    # Deflate compresses by at most about 1032:1, and the worst case is
+    # given by deflateBound()
+    return 8 + length // 1032, length + (length >> 12) + (length >> 14) + \
+        (length >> 25) + 13
+
+
+def _lzma_bounds(length: int) -> Tuple[int, int]:
+    # The xz container has a fixed overhead, and incompressible data is
+    # stored in chunks of at most 64 KiB with a 3-byte header each
+    if length == 0:
+        return 32, 32
+    return 60 + length // 7000, length + 3 * ((length >> 16) + 1) + 96
+
+
+# Identifier of uncompressed data
+codec_none: int = 0
+
+# Identifier of the original codec, the only one a version 1 header records
+codec_bz2: int = 1
+
+# Available codecs, by the identifier recorded in the header.
+# Identifiers are never reused, so that steganographs made with a codec can
+# always be read back.
+codecs: Dict[int, Codec] = {
+    codec_bz2: Codec(
+        "bz2",
+        lambda data, level: bz2.compress(data, level),
+        bz2.BZ2Compressor,
+        bz2.BZ2Decompressor,
+        _bz2_bounds,
+    ),
+    2: Codec(
+        "zlib",
+        lambda data, level: zlib.compress(data, level),
+        zlib.compressobj,
+        _ZlibDecompressor,
+        _zlib_bounds,
+    ),
+    3: Codec(
+        "lzma",
+        lambda data, level: lzma.compress(data, preset=level),
+        lambda level: lzma.LZMACompressor(preset=level),
+        lzma.LZMADecompressor,
+        _lzma_bounds,
+    ),
+}
+
+
+def find_codec(name: str) -> int:
+    """Finds the identifier of a codec by its name.
+
+    ### Positional arguments
+
+    - name (str)
+        - The name of the codec
+
+    ### Returns
+
+    The identifier of the codec
+
+    ### Raises
+
+    - ValueError
+        - Raised when no codec has the given name
+    """
+    for identifier, codec in codecs.items():
+        if codec.name == name:
+            return identifier
+    raise ValueError("Codec not defined!")
+
+
+# Magic bytes of formats whose content is already compressed, by offset
+compressed_signatures: List[Tuple[int, bytes]] = [
+    # Archives and compressed streams
+    (0, b"\x1f\x8b"),  # gzip
+    (0, b"BZh"),  # bzip2
+    (0, b"\xfd7zXZ\x00"),  # xz
+    (0, b"\x28\xb5\x2f\xfd"),  # zstd
+    (0, b"\x04\x22\x4d\x18"),  # lz4
+    (0, b"PK\x03\x04"),  # zip (and docx, jar, ...)
+    (0, b"7z\xbc\xaf\x27\x1c"),  # 7z
+    (0, b"Rar!\x1a\x07"),  # rar
+    # Images, audio and video
+    (0, b"\xff\xd8\xff"),  # jpeg
+    (0, b"\x89PNG"),  # png
+    (0, b"GIF8"),  # gif
+    (8, b"WEBP"),  # webp
+    (4, b"ftyp"),  # mp4, mov, heic
+    (0, b"ID3"),  # mp3
+    (0, b"OggS"),  # ogg
+    (0, b"fLaC"),  # flac
+]
+
+# Entropy of a sample (in bits per byte) from which compression is not
+# worth its cost, and from which a fast level is used instead
+skip_entropy: float = 7.5
+fast_entropy: float = 6.5
+
+
+def estimate_entropy(sample: bytes) -> float:
+    """Finds the entropy of the byte distribution of a sample, in bits per
+    byte (from 0, for a single repeated byte, to 8, for random bytes)."""
+    if not sample:
+        return 0.0
+    counts = np.bincount(np.frombuffer(sample, np.uint8), minlength=256)
+    p = counts[counts > 0] / len(sample)
+    return float(-(p * np.log2(p)).sum())
+
+
+def choose_compression(sample: bytes, level: int) -> int:
+    """Chooses the compression level of a payload from a sample of it.
+
+    ### Positional arguments
+
+    - sample (bytes)
+        - A sample of the payload, starting with its first bytes
+
+    - level (int)
+        - The compression level requested, used when compression pays off
+
+    ### Returns
+
+    0 if the payload is (most likely) incompressible, 1 if it is barely
+    compressible, otherwise the level requested
+    """
+    if level == 0:
+        return 0
+
+    # Data in a compressed format does not compress any further
+    for offset, signature in compressed_signatures:
+        if sample[offset:offset + len(signature)] == signature:
+            return 0
+
+    entropy = estimate_entropy(sample)
+    if entropy >= skip_entropy:
+        return 0
+    if entropy >= fast_entropy:
+        return 1
+    return level
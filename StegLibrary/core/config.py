@@ -2,17 +2,54 @@
 # configure all operations of the Steganography Library.
 
 # Builtin modules
+from os import cpu_count
 from typing import List
 
+# Internal modules
+from StegLibrary.crypto.profiles import kdf_profiles
+
 
 class SteganographyConfig(object):
     available_compression: List[int] = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
     available_density: List[int] = [1, 2, 3]
+    available_codec: List[str] = ["bz2", "zlib", "lzma"]
+    available_engine: List[str] = ["loop", "numpy"]
+    available_header_version: List[int] = [1, 2]
+    # In the order of the identifiers recorded in the header
+    available_kdf: List[str] = [profile.name for profile in kdf_profiles]
+    available_png_preset: List[str] = ["default", "fast"]
+    available_png_strategy: List[str] = [
+        "default",
+        "filtered",
+        "huffman",
+        "rle",
+        "fixed",
+    ]
 
     default_compression: int = 9
+    default_codec: str = "bz2"
     default_density: int = 1
+    default_engine: str = "numpy"
+    default_kdf: str = "pbkdf2-10k"
+    default_header_version: int = 2
+    default_png_preset: str = "default"
+    default_buffer_size: int = 1 << 20
+    default_sample_size: int = 1 << 16
+    default_workers: int = 1
+    default_concurrency: int = cpu_count() or 1
     default_auth_key: str = "bGs21Gt@31"
+    default_host: str = "127.0.0.1"
+    default_port: int = 8750
+    default_max_body_size: int = 64 << 20
+    default_linger_seconds: float = 1.0
+    default_connect_timeout: float = 1.0
+    default_bench_tolerance: float = 0.10
+    default_bench_sigmas: float = 3.0
+    default_bench_alpha: float = 0.05
+    default_bench_memory_tolerance: float = 0.20
 
     flag_close_on_exit: bool = True
     flag_show_image_on_completion: bool = False
+    flag_stream: bool = False
+    flag_auto_compress: bool = False
     flag_fopen_mode: bool = "rb"
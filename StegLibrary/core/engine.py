@@ -0,0 +1,591 @@
+# This script implements the engines used by write_steg and extract_steg.
+# The "loop" engine is the original bit-by-bit implementation working on the
+# PixelAccess object, while the "numpy" engine spreads the payload over the
+# carrier with bulk array operations. Both engines produce exactly the same
+# pixels (and read exactly the same bytes) for the same input.
+
+# Builtin modules
+from typing import Callable, Dict, List, Tuple
+
+# Internal modules
+from StegLibrary.helper import err_imp, is_bit_set, set_bit, unset_bit
+
+# Non-builtin modules
+try:
+    from PIL import Image
+except ImportError:
+    err_imp("Pillow")
+    exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    err_imp("numpy")
+    exit(1)
+
+
+# Number of colour integers of each pixel used to store data, unless
+# stated otherwise (the alpha channel of RGBA images was originally ignored)
+channels_per_pixel: int = 3
+
+# Number of colour integers of each pixel, by supported image mode
+mode_channels: Dict[str, int] = {
+    "L": 1,
+    "LA": 2,
+    "RGB": 3,
+    "RGBA": 4,
+    "I;16": 1,
+    # Pillow opens 16-bit PGM images as 32-bit integers
+    "I": 1,
+}
+
+
+def as_columns(array: np.ndarray) -> np.ndarray:
+    """Views an image array as (height, width, channels), even for
+    single-channel modes whose arrays have two dimensions."""
+    if array.ndim == 2:
+        return array[..., np.newaxis]
+    return array
+
+
+def channel_span(bit_offset: int, bit_count: int,
+                 density: int) -> Tuple[int, int]:
+    """Finds the range of colour integers touched by a run of bits.
+
+    ### Positional arguments
+
+    - bit_offset (int)
+        - Index of the first bit in the steganograph bit stream
+
+    - bit_count (int)
+        - Number of bits in the run
+
+    - density (int)
+        - The data density
+
+    ### Returns
+
+    A tuple (start, stop) of colour integer indices, in the column-major
+    order used to traverse the carrier
+    """
+    # Each colour integer stores (density + 1) bits, from bit
+    # "density" down to bit 0
+    width = density + 1
+    start = bit_offset // width
+    stop = -(-(bit_offset + bit_count) // width)
+    return start, stop
+
+
+def embed_flat(flat: np.ndarray, data: bytes, density: int,
+               bit_offset: int = 0) -> None:
+    """Embeds data into a flat array of colour integers, in place.
+
+    ### Positional arguments
+
+    - flat (numpy.ndarray)
+        - A writable 1-D array of colour integers, in traversal order
+
+    - data (bytes)
+        - The data to embed
+
+    - density (int)
+        - The data density
+
+    - bit_offset (int) (default = 0)
+        - Index (relative to flat) of the first bit to be written
+
+    ### Returns
+
+    None
+    """
+    # Bytes are written from the least significant bit, which is exactly
+    # what "little" bit order unpacks to
+    bits = np.unpackbits(np.frombuffer(data, np.uint8), bitorder="little")
+    embed_bits(flat, bits, density, bit_offset)
+
+
+def embed_bits(flat: np.ndarray, bits: np.ndarray, density: int,
+               bit_offset: int = 0) -> None:
+    """Embeds unpacked bits into a flat array of colour integers, in place.
+
+    ### Positional arguments
+
+    - flat (numpy.ndarray)
+        - A writable 1-D array of colour integers, in traversal order
+
+    - bits (numpy.ndarray)
+        - A 1-D array of bits (0 or 1), in the order they are written
+
+    - density (int)
+        - The data density
+
+    - bit_offset (int) (default = 0)
+        - Index (relative to flat) of the first bit to be written
+
+    ### Returns
+
+    None
+    """
+    width = density + 1
+
+    # Align the bits on colour integer boundaries. Padding bits are marked
+    # as invalid so that the bits they cover are left untouched.
+    lead = bit_offset % width
+    total = lead + bits.size
+    count = -(-total // width)
+    padded = np.zeros(count * width, np.uint8)
+    padded[lead:total] = bits
+    valid = np.zeros(count * width, np.uint8)
+    valid[lead:total] = 1
+    padded = padded.reshape(count, width)
+    valid = valid.reshape(count, width)
+
+    # Assemble the value and the mask of each colour integer.
+    # The first bit of a colour integer goes to bit "density".
+    values = np.zeros(count, flat.dtype)
+    mask = np.zeros(count, flat.dtype)
+    for i in range(width):
+        values |= padded[:, i].astype(flat.dtype) << (density - i)
+        mask |= valid[:, i].astype(flat.dtype) << (density - i)
+
+    # Clear the masked bits, then set them from the data
+    start = bit_offset // width
+    segment = flat[start:start + count]
+    segment &= ~mask
+    segment |= values
+
+
+def extract_flat(flat: np.ndarray, density: int, length: int,
+                 bit_offset: int = 0) -> bytes:
+    """Extracts data from a flat array of colour integers.
+
+    ### Positional arguments
+
+    - flat (numpy.ndarray)
+        - A 1-D array of colour integers, in traversal order
+
+    - density (int)
+        - The data density
+
+    - length (int)
+        - Number of bytes to extract
+
+    - bit_offset (int) (default = 0)
+        - Index (relative to flat) of the first bit to be read
+
+    ### Returns
+
+    The extracted bytes string
+    """
+    width = density + 1
+    lead = bit_offset % width
+    total = lead + length * 8
+    start = bit_offset // width
+    values = flat[start:start - (-total // width)]
+
+    # Pull every bit-plane at once, the first bit being bit "density"
+    bits = np.empty((values.size, width), np.uint8)
+    for i in range(width):
+        bits[:, i] = (values >> (density - i)) & 1
+
+    # Bytes are stored from the least significant bit
+    bits = bits.reshape(-1)[lead:total]
+    return np.packbits(bits, bitorder="little").tobytes()
+
+
+def read_channels(image: Image.Image, count: int,
+                  channels: int = channels_per_pixel) -> np.ndarray:
+    """Reads the first colour integers of an image, in traversal order.
+
+    ### Positional arguments
+
+    - image (PIL.Image.Image)
+        - The image to read
+
+    - count (int)
+        - Number of colour integers to read
+
+    - channels (int) (default = channels_per_pixel)
+        - Number of colour integers of each pixel used to store data
+
+    ### Returns
+
+    A 1-D array of at most count colour integers
+    """
+    x_dim, y_dim = image.size
+    per_column = y_dim * channels
+
+    # Only decode the columns which hold the colour integers
+    x_stop = min(-(-count // per_column), x_dim)
+    region = np.asarray(image.crop((0, 0, x_stop, y_dim)))
+    return read_array_channels(region, count, channels)
+
+
+def read_array_channels(array: np.ndarray, count: int,
+                        channels: int = channels_per_pixel) -> np.ndarray:
+    """Reads the first colour integers of an image array, in traversal
+    order (see read_channels)."""
+    array = as_columns(array)
+    per_column = array.shape[0] * channels
+
+    # Only flatten the columns which hold the colour integers
+    x_stop = -(-count // per_column)
+    flat = array[:, :x_stop, :channels].transpose(1, 0, 2).reshape(-1)
+    return flat[:count]
+
+
+def embed_array(array: np.ndarray, data: bytes, density: int,
+                bit_offset: int = 0,
+                channels: int = channels_per_pixel) -> None:
+    """Embeds data into an image array, in place.
+
+    ### Positional arguments
+
+    - array (numpy.ndarray)
+        - A writable array of shape (height, width, channels), or
+        (height, width) for single-channel images
+
+    - data (bytes)
+        - The data to embed
+
+    - density (int)
+        - The data density
+
+    - bit_offset (int) (default = 0)
+        - Index of the first bit to be written
+
+    - channels (int) (default = channels_per_pixel)
+        - Number of colour integers of each pixel used to store data
+
+    ### Returns
+
+    None
+    """
+    array = as_columns(array)
+    y_dim = array.shape[0]
+    per_column = y_dim * channels
+
+    # Only the columns holding the data are flattened
+    start, stop = channel_span(bit_offset, len(data) * 8, density)
+    x_start, x_stop = start // per_column, -(-stop // per_column)
+    view = array[:, x_start:x_stop, :channels]
+
+    # Pixels are traversed column by column, so transpose before flattening
+    flat = view.transpose(1, 0, 2).reshape(-1)
+    embed_flat(flat, data, density,
+               bit_offset - x_start * per_column * (density + 1))
+    view[...] = flat.reshape(x_stop - x_start, y_dim,
+                             channels).transpose(1, 0, 2)
+
+
+def extract_array(array: np.ndarray, density: int, length: int,
+                  bit_offset: int = 0,
+                  channels: int = channels_per_pixel) -> bytes:
+    """Extracts data from an image array.
+
+    ### Positional arguments
+
+    - array (numpy.ndarray)
+        - An array of shape (height, width, channels), or
+        (height, width) for single-channel images
+
+    - density (int)
+        - The data density
+
+    - length (int)
+        - Number of bytes to extract
+
+    - bit_offset (int) (default = 0)
+        - Index of the first bit to be read
+
+    - channels (int) (default = channels_per_pixel)
+        - Number of colour integers of each pixel used to store data
+
+    ### Returns
+
+    The extracted bytes string
+    """
+    array = as_columns(array)
+    y_dim = array.shape[0]
+    per_column = y_dim * channels
+
+    # Only the columns holding the data are flattened
+    start, stop = channel_span(bit_offset, length * 8, density)
+    x_start, x_stop = start // per_column, -(-stop // per_column)
+    view = array[:, x_start:x_stop, :channels]
+
+    # Pixels are traversed column by column, so transpose before flattening
+    flat = view.transpose(1, 0, 2).reshape(-1)
+    return extract_flat(flat, density, length,
+                        bit_offset - x_start * per_column * (density + 1))
+
+
+def embed_numpy(image: Image.Image, data: bytes, density: int,
+                bit_offset: int = 0,
+                channels: int = channels_per_pixel) -> None:
+    """Embeds data into an image using bulk NumPy operations.
+
+    ### Positional arguments
+
+    - image (PIL.Image.Image)
+        - The carrier image, modified in place
+
+    - data (bytes)
+        - The data to embed
+
+    - density (int)
+        - The data density
+
+    - bit_offset (int) (default = 0)
+        - Index of the first bit to be written
+
+    - channels (int) (default = channels_per_pixel)
+        - Number of colour integers of each pixel used to store data
+
+    ### Returns
+
+    None
+    """
+    if not data:
+        return
+    x_dim, y_dim = image.size
+    per_column = y_dim * channels
+
+    # Only decode the columns which will be modified
+    start, stop = channel_span(bit_offset, len(data) * 8, density)
+    x_start, x_stop = start // per_column, -(-stop // per_column)
+    region = np.array(image.crop((x_start, 0, x_stop, y_dim)))
+
+    embed_array(region, data, density,
+                bit_offset - x_start * per_column * (density + 1), channels)
+
+    # Write the modified columns back to the image
+    image.paste(Image.fromarray(region), (x_start, 0))
+
+
+def extract_numpy(image: Image.Image, density: int, length: int,
+                  bit_offset: int = 0,
+                  channels: int = channels_per_pixel) -> bytes:
+    """Extracts data from an image using bulk NumPy operations.
+
+    ### Positional arguments
+
+    - image (PIL.Image.Image)
+        - The steganograph
+
+    - density (int)
+        - The data density
+
+    - length (int)
+        - Number of bytes to extract
+
+    - bit_offset (int) (default = 0)
+        - Index of the first bit to be read
+
+    - channels (int) (default = channels_per_pixel)
+        - Number of colour integers of each pixel used to store data
+
+    ### Returns
+
+    The extracted bytes string
+    """
+    if length == 0:
+        return b""
+    y_dim = image.size[1]
+    per_column = y_dim * channels
+
+    # Only decode the columns which hold the data
+    start, stop = channel_span(bit_offset, length * 8, density)
+    x_start, x_stop = start // per_column, -(-stop // per_column)
+    region = np.asarray(image.crop((x_start, 0, x_stop, y_dim)))
+
+    return extract_array(region, density, length,
+                         bit_offset - x_start * per_column * (density + 1),
+                         channels)
+
+
+def _get_pixel(pix, x: int, y: int) -> List[int]:
+    """Reads the colour integers of a pixel, whatever the image mode."""
+    value = pix[x, y]
+    return [value] if isinstance(value, int) else list(value)
+
+
+def _put_pixel(pix, x: int, y: int, value: List[int]) -> None:
+    """Writes the colour integers of a pixel, whatever the image mode."""
+    pix[x, y] = value[0] if len(value) == 1 else tuple(value)
+
+
+def embed_loop(image: Image.Image, data: bytes, density: int,
+               bit_offset: int = 0,
+               channels: int = channels_per_pixel) -> None:
+    """Embeds data into an image, one bit at a time.
+
+    ### Positional arguments
+
+    - image (PIL.Image.Image)
+        - The carrier image, modified in place
+
+    - data (bytes)
+        - The data to embed
+
+    - density (int)
+        - The data density
+
+    - bit_offset (int) (default = 0)
+        - Index of the first bit to be written
+
+    - channels (int) (default = channels_per_pixel)
+        - Number of colour integers of each pixel used to store data
+
+    ### Returns
+
+    None
+    """
+    if not data:
+        return
+    # Retrieve access to pixel data
+    pix = image.load()
+
+    # Retrieve metadata of image file
+    x_dim, y_dim = image.size
+
+    # Declare usable variables as pointer to bit being written
+    channel, bit = divmod(bit_offset, density + 1)
+    pixel, count = divmod(channel, channels)
+    x, y = divmod(pixel, y_dim)
+    bit_loc = density - bit
+    # Declare a local variable for pixel to reduce look-up time
+    current_pix = _get_pixel(pix, x, y)
+
+    # Firstly, iterate through all the bytes to be written
+    for byte in data:
+        # Secondly, iterate through all the bits of the given byte
+        for i in range(8):
+            # Thirdly, check if the bit is set
+            # If bit is set
+            if is_bit_set(byte, i):
+                # Check if the bit at the current location in the image is set
+                # If unset then set it, otherwise unchange
+                current_pix[count] = set_bit(current_pix[count], bit_loc)
+            # If bit is unset
+            else:
+                # Check if the bit at the current location in the image is set
+                # If set then unset it, otherwise unchange
+                current_pix[count] = unset_bit(current_pix[count], bit_loc)
+
+            # Move to the next bit
+            # by decrementing index
+            bit_loc -= 1
+            # If reached the final bit
+            if bit_loc == -1:
+                # Move to the next integer
+                # by incrementing the count
+                count += 1
+                # Reset density
+                bit_loc = density
+                # If reached the last colour integer
+                if count == channels:
+                    # Save pixel
+                    _put_pixel(pix, x, y, current_pix)
+                    # Reset count
+                    count = 0
+                    y += 1
+                    # If the entire row of pixel is written
+                    if y == y_dim:
+                        # Move on to the next row and reset
+                        y = 0
+                        x += 1
+                    # Request new pixel to be written, unless the data
+                    # filled the image exactly
+                    if x < x_dim:
+                        current_pix = _get_pixel(pix, x, y)
+
+    # Save the last pixel if it has only been partially written
+    if count != 0 or bit_loc != density:
+        _put_pixel(pix, x, y, current_pix)
+
+
+def extract_loop(image: Image.Image, density: int, length: int,
+                 bit_offset: int = 0,
+                 channels: int = channels_per_pixel) -> bytes:
+    """Extracts data from an image, one bit at a time.
+
+    ### Positional arguments
+
+    - image (PIL.Image.Image)
+        - The steganograph
+
+    - density (int)
+        - The data density
+
+    - length (int)
+        - Number of bytes to extract
+
+    - bit_offset (int) (default = 0)
+        - Index of the first bit to be read
+
+    - channels (int) (default = channels_per_pixel)
+        - Number of colour integers of each pixel used to store data
+
+    ### Returns
+
+    The extracted bytes string
+    """
+    # Retrieve access to pixel data
+    pix = image.load()
+
+    # Retrieve metadata of image file
+    y_dim = image.size[1]
+
+    # Declare some local variables as the extraction starts
+    channel, bit = divmod(bit_offset, density + 1)
+    pixel, count = divmod(channel, channels)
+    x, y = divmod(pixel, y_dim)
+    bit_loc = density - bit
+    result_data = bytearray()
+
+    while len(result_data) < length:
+        byte = 0
+        # Read every single bit
+        # Iterate through every single bit of the byte
+        for i in range(8):
+            # If bit is set, set the corressponding bit of 'byte'
+            # Bytes are written from the least significant bit
+            if _get_pixel(pix, x, y)[count] & (1 << bit_loc):
+                byte += (1 << i)
+            # Move to the next bit by decrement bit index
+            bit_loc -= 1
+            # If all readable bits of the colour integer are consumed
+            if bit_loc == -1:
+                # Move to the next RGB and reset the bit index
+                count += 1
+                bit_loc = density
+                # If the entire pixel is read
+                if count == channels:
+                    # Move to the next pixel in the row and reset the count
+                    count = 0
+                    y += 1
+                    # If the entire row of pixels is read
+                    if y == y_dim:
+                        # Move to the next row and reset row index
+                        y = 0
+                        x += 1
+        # By design, the resulting data is strictly stored in 1 byte
+        result_data.append(byte)
+
+    return bytes(result_data)
+
+
+# Engines available to write_steg, by name
+embedders: Dict[str, Callable[[Image.Image, bytes, int, int, int],
+                              None]] = {
+    "loop": embed_loop,
+    "numpy": embed_numpy,
+}
+
+# Engines available to extract_steg, by name
+extractors: Dict[str, Callable[[Image.Image, int, int, int, int],
+                               bytes]] = {
+    "loop": extract_loop,
+    "numpy": extract_numpy,
+}
@@ -2,10 +2,14 @@
 # create and maintain the header of each steganograph.
 
 # Builtin modules
+from base64 import b64decode, b64encode
 from re import compile, Pattern
+from struct import Struct
+from zlib import crc32
 
 # Internal modules
 from StegLibrary.core import SteganographyConfig as Config
+from StegLibrary.core.codec import codec_bz2, codec_none, codecs
 from StegLibrary.core.errors import UnrecognisedHeaderError
 
 
@@ -19,7 +23,7 @@ class Header:
     # Separator is used to make regex easier
     separator: str = "?"
 
-    # Various types of length for the header
+    # Various types of length for the header (version 1)
     maximum_data_length: int = 8
     maximum_flag_length: int = 3
     salt_length: int = 24
@@ -27,27 +31,64 @@ class Header:
     header_length: int = maximum_data_length + \
         maximum_flag_length + salt_length + separator_length
 
-    # Regex pattern of the header
+    # Regex pattern of the header (version 1)
     # data_length?flag?salt
     pattern: str = r"(\d{1,8})\?(\d{1,3})\?"
     hash_pattern: str = r"((?:[A-Za-z0-9+/]{4})+(?:[A-Za-z0-9+/]{2}==" + \
         r"|[A-Za-z0-9+/]{3}=)?)"
     pattern: Pattern = compile(f"^{pattern + hash_pattern}$")
 
+    # Regex pattern of a header at the start of a bytes string
+    # The salt is always 16 bytes, which encodes to 22 characters and "=="
+    prefix_pattern: Pattern = compile(
+        rb"^(\d{1,8})\?(\d{1,3})\?([A-Za-z0-9+/]{22}==)")
+
+    # Binary header (version 2), in network byte order:
+    # magic, version, density, channels, data length, codec, compression
+    # level, cipher, KDF profile, raw salt, then the CRC32 of all the above.
+    # The magic cannot start a version 1 header, which starts with a digit.
+    magic: bytes = b"\x89STG"
+    binary_layout: Struct = Struct(">4sBBBQBBBB16s")
+    binary_crc: Struct = Struct(">I")
+    binary_header_length: int = binary_layout.size + binary_crc.size
+
+    # Identifiers of the ciphers in the binary header
+    cipher_fernet: int = 0
+    cipher_stream: int = 1
+
+    # Numbers of colour integers per pixel a binary header can record.
+    # A text header always implies 3 (the alpha channel is left alone).
+    available_channels: range = range(1, 5)
+    legacy_channels: int = 3
+
+    # Enough bytes to hold a header of any version
+    maximum_header_length: int = max(header_length, binary_header_length)
+
     def __str__(self) -> str:
         """Returns the header."""
-        return self.header
+        if self.version == 1:
+            return str(self.header, "utf-8")
+        return self.header.hex()
 
     def __repr__(self) -> str:
         """Same as __str__, returns the header."""
         return str(self)
 
     def __init__(self, data_length: int, compression: int, density: int,
-                 salt: str) -> None:
+                 salt: str, stream: bool = False, kdf: int = 0,
+                 version: int = Config.default_header_version,
+                 codec: int = codec_bz2,
+                 channels: int = legacy_channels) -> None:
         self.data_length: int = data_length
         self.compression: int = compression
         self.density: int = density
         self.salt: str = salt
+        self.stream: bool = stream
+        self.kdf: int = kdf
+        self.version: int = version
+        self.channels: int = channels
+        # Uncompressed data has no codec
+        self.codec: int = codec if compression > 0 else codec_none
 
         self.generate()
 
@@ -59,18 +100,57 @@ def generate(self) -> None:
         There is no need to call this method, unless any metadata has been
         modified after initialisation.
         """
+        if self.version == 2:
+            self.generate_binary()
+            return
+
+        # The text header has no room for a codec or a number of channels,
+        # so bz2 and 3 channels are implied
+        assert self.codec in (codec_none, codec_bz2)
+        assert self.channels == Header.legacy_channels
+
         # Create a flag from compression level and density level.
-        # Bit 6 - 2: Compression level (0 (no compression) - 9)
+        # Bit 9 - 7: KDF profile (0 - 7, 0 being the original PBKDF2)
+        # Bit 6: Stream format (data is a series of encrypted frames)
+        # Bit 5 - 2: Compression level (0 (no compression) - 9)
         # Bit 1 - 0: Density level (1 - 3)
-        flag = (self.compression << 2) + self.density
+        flag = (self.kdf << 7) + (self.stream << 6) + \
+            (self.compression << 2) + self.density
 
-        result_header = Header.separator.join(
-            (str(self.data_length), str(flag), self.salt))
+        data_length, flag = str(self.data_length), str(flag)
+        # The length of a stream is only known once it is written, so its
+        # header is padded to a fixed length, to be written last
+        if self.stream:
+            data_length = data_length.zfill(Header.maximum_data_length)
+            flag = flag.zfill(Header.maximum_flag_length)
+
+        result_header = Header.separator.join((data_length, flag, self.salt))
 
         assert Header.pattern.match(result_header)
 
         # Assign as a class attribute
-        self.header = result_header
+        self.header = bytes(result_header, "utf-8")
+        # Unless padded, the length of the header depends on the metadata
+        self.length = len(result_header)
+
+    def generate_binary(self) -> None:
+        """Generates a binary (version 2) header, of fixed length."""
+        data = Header.binary_layout.pack(
+            Header.magic,
+            2,
+            self.density,
+            self.channels,
+            self.data_length,
+            self.codec,
+            self.compression,
+            Header.cipher_stream if self.stream else Header.cipher_fernet,
+            self.kdf,
+            b64decode(self.salt),
+        )
+
+        # Assign as a class attribute
+        self.header = data + Header.binary_crc.pack(crc32(data))
+        self.length = Header.binary_header_length
 
 
 def build_header(
@@ -79,7 +159,12 @@ def build_header(
     compression: int = Config.default_compression,
     density: int = Config.default_density,
     salt: str,
-) -> Header:
+    stream: bool = False,
+    kdf: int = 0,
+    version: int = Config.default_header_version,
+    codec: int = codec_bz2,
+    channels: int = Header.legacy_channels,
+) -> bytes:
     """Builds the steganograph header with given data.
 
     ### Positional arguments
@@ -96,9 +181,26 @@ def build_header(
     - salt (str)
         - The 24-character salt string
 
+    - stream (bool) (default = False)
+        - Whether the data is in stream format
+
+    - kdf (int) (default = 0)
+        - The identifier of the KDF profile
+
+    - version (int) (default = Config.default_header_version)
+        - The header format, 1 (text) or 2 (binary)
+
+    - codec (int) (default = codec_bz2)
+        - The identifier of the compression codec (only bz2 can be
+        recorded in a text header)
+
+    - channels (int) (default = Header.legacy_channels)
+        - Number of colour integers of each pixel used to store data (only
+        3 can be recorded in a text header)
+
     ### Returns
 
-    A Header object containing all the data given
+    The serialised header
     """
 
     # Initialise the Header instance
@@ -107,18 +209,23 @@ def build_header(
         compression=compression,
         density=density,
         salt=salt,
+        stream=stream,
+        kdf=kdf,
+        version=version,
+        codec=codec,
+        channels=channels,
     )
 
     return header.header
 
 
 def validate_header(b: bytes) -> bool:
-    """Check if the bytes string contains valid Header.
+    """Check if the bytes string starts with a valid Header.
 
     ### Positional arguments
 
     - b (bytes)
-        - The bytes string to check
+        - The bytes string to check (any data after the header is ignored)
 
     ### Returns
 
@@ -129,25 +236,22 @@ def validate_header(b: bytes) -> bool:
     - TypeError
         - Raised when the parametres given are in incorrect types
     """
-    # Type checking
-    if not isinstance(b, bytes):
-        raise TypeError(f"Must be a bytes string (given {type(b)})")
-
-    # Try to decode into string
     try:
-        s = str(b, "utf-8")
-        return True if Header.pattern.match(s) else False
-    except UnicodeDecodeError:
+        parse_header(b)
+    except UnrecognisedHeaderError:
         return False
+    return True
 
 
 def parse_header(b: bytes) -> Header:
     """Parse a bytes string into a Header object.
 
+    Both the text (version 1) and binary (version 2) headers are read.
+
     ### Postional arguments
 
     - b (bytes)
-        - The bytes string to parse
+        - The bytes string to parse (any data after the header is ignored)
 
     ### Returns
 
@@ -165,13 +269,16 @@ def parse_header(b: bytes) -> Header:
     if not isinstance(b, bytes):
         raise TypeError(f"Must be a bytes string (given {type(b)})")
 
-    # Validate header first
-    if not validate_header(b):
-        raise UnrecognisedHeaderError("Invalid header!")
+    # The binary header is recognised by its magic alone
+    if b[:len(Header.magic)] == Header.magic:
+        return _parse_binary_header(b)
 
     # Generate Match object of the header
-    # Decode bytes string to string first
-    header_match = Header.pattern.match(str(b, "utf-8"))
+    # Match directly on bytes, since the data following the header
+    # is not necessarily decodable
+    header_match = Header.prefix_pattern.match(b)
+    if not header_match:
+        raise UnrecognisedHeaderError("Invalid header!")
 
     # Extract data from capturing groups
     # Ignore first capturing groups
@@ -180,16 +287,62 @@ def parse_header(b: bytes) -> Header:
     # 2. Setting flag
     hdr_flag = int(header_match[2])
     # 3. Salt
-    hdr_salt = header_match[3]
+    hdr_salt = str(header_match[3], "utf-8")
 
     # Process flag
     hdr_density = hdr_flag & 0b11
-    hdr_compression = (hdr_flag - hdr_density) >> 2
+    hdr_compression = (hdr_flag >> 2) & 0b1111
+    hdr_stream = bool(hdr_flag & 0b1000000)
+    hdr_kdf = hdr_flag >> 7
+
+    # A header from the future, or a false match
+    if hdr_kdf >= len(Config.available_kdf):
+        raise UnrecognisedHeaderError("Invalid header!")
 
     # Build and return a Header object
-    return build_header(
+    return Header(
         data_length=hdr_data_length,
         compression=hdr_compression,
         density=hdr_density,
-        salt=hdr_salt
+        salt=hdr_salt,
+        stream=hdr_stream,
+        kdf=hdr_kdf,
+        version=1,
+    )
+
+
+def _parse_binary_header(b: bytes) -> Header:
+    """Parses a binary (version 2) header, checking its CRC first."""
+    data = b[:Header.binary_layout.size]
+    crc = b[Header.binary_layout.size:Header.binary_header_length]
+    if len(crc) != Header.binary_crc.size or \
+            Header.binary_crc.unpack(crc)[0] != crc32(data):
+        raise UnrecognisedHeaderError("Invalid header!")
+
+    (_, version, density, channels, data_length, codec, compression, cipher,
+     kdf, salt) = Header.binary_layout.unpack(data)
+
+    # Reject versions and identifiers this library does not know
+    if version != 2:
+        raise UnrecognisedHeaderError("Unsupported header version!")
+    if density not in Config.available_density or \
+            channels not in Header.available_channels or \
+            kdf >= len(Config.available_kdf) or \
+            cipher not in (Header.cipher_fernet, Header.cipher_stream) or \
+            (codec != codec_none and codec not in codecs) or \
+            (codec == codec_none) != (compression == 0) or \
+            compression not in Config.available_compression:
+        raise UnrecognisedHeaderError("Invalid header!")
+
+    # Build and return a Header object
+    return Header(
+        data_length=data_length,
+        compression=compression,
+        density=density,
+        salt=str(b64encode(salt), "utf-8"),
+        stream=cipher == Header.cipher_stream,
+        kdf=kdf,
+        version=2,
+        codec=codec,
+        channels=channels,
     )
@@ -1,12 +1,15 @@
 # Builtin modules
-from os import path, getcwd
+from json import dumps, loads
+from os import cpu_count, path, getcwd, makedirs, stat
 from sys import stdout as std
+from time import perf_counter
+from typing import TextIO
 
 # Internal modules
-from StegLibrary.helper import err_imp, raw_open, open_image
+# Each command imports the modules it needs, so that the CLI starts without
+# loading numpy, Pillow, cryptography or PyQt5 until a command needs them
+from StegLibrary.helper import err_imp
 from StegLibrary.core import SteganographyConfig as Config
-from StegLibrary.core.steg import write_steg, extract_steg
-from StegLibrary.gui import execute_gui
 
 # Non-builtin modules
 try:
@@ -21,6 +24,30 @@ def steg():
     pass
 
 
+def _read_file(file_path: str) -> bytes:
+    try:
+        with open(file_path, "rb") as file:
+            return file.read()
+    except IOError:
+        raise click.FileError(file_path)
+
+
+def _connect_daemon(*file_paths: str):
+    """Connects to the daemon, if it runs and accepts files this large."""
+    from StegLibrary.core.client import connect_daemon
+
+    try:
+        size = sum(stat(file_path).st_size for file_path in file_paths)
+    except IOError:
+        # Reported when running in this process
+        return None
+    client = connect_daemon()
+    if client is not None and not client.accepts(size):
+        client.close()
+        return None
+    return client
+
+
 @steg.command(
     "create",
     help="Create steganograph"
@@ -46,6 +73,18 @@ def steg():
     type=int,
     default=Config.default_compression
 )
+@click.option(
+    "--codec",
+    help="Compression codec (zlib is fastest, lzma compresses most)",
+    type=click.Choice(Config.available_codec),
+    default=Config.default_codec,
+)
+@click.option(
+    "--auto-compress",
+    help="Whether to skip compression of incompressible data",
+    type=bool,
+    default=Config.flag_auto_compress,
+)
 @click.option(
     "-p",
     "--pack",
@@ -65,16 +104,100 @@ def steg():
     type=bool,
     default=False,
 )
+@click.option(
+    "--stream",
+    help="Whether to embed data chunk by chunk, with bounded memory",
+    type=bool,
+    default=Config.flag_stream,
+)
+@click.option(
+    "-b",
+    "--buffer",
+    help="Size of each chunk (in bytes) when streaming",
+    type=int,
+    default=Config.default_buffer_size,
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of worker processes (requires the numpy engine)",
+    type=click.IntRange(min=1),
+    default=Config.default_workers,
+)
+@click.option(
+    "--kdf",
+    help="Key derive function and its cost (recorded in the steganograph)",
+    type=click.Choice(Config.available_kdf),
+    default=Config.default_kdf,
+)
+@click.option(
+    "--mapped",
+    help="Whether to write a copy of an uncompressed image (BMP, PPM/PGM " +
+    "or TIFF) in place, rather than a PNG",
+    type=bool,
+    default=False,
+)
+@click.option(
+    "--png-preset",
+    help="Settings of the PNG encoder (\"fast\" favours speed over size)",
+    type=click.Choice(Config.available_png_preset),
+    default=Config.default_png_preset,
+)
+@click.option(
+    "--png-level",
+    help="zlib compression level of the PNG (overrides the preset)",
+    type=click.IntRange(0, 9),
+    default=None,
+)
+@click.option(
+    "--png-strategy",
+    help="zlib strategy of the PNG (overrides the preset)",
+    type=click.Choice(Config.available_png_strategy),
+    default=None,
+)
+@click.option(
+    "--png-optimize",
+    help="Whether to search for the smallest PNG (overrides the preset)",
+    type=bool,
+    default=None,
+)
+@click.option(
+    "--daemon",
+    help="Whether to run on the daemon (steg daemon), when it runs",
+    type=bool,
+    default=True,
+)
+@click.option(
+    "--timings",
+    help="Whether to report the time spent in each stage (on stderr)",
+    type=bool,
+    default=False,
+)
 @click.argument("data", type=click.Path(True, True, False), required=True)
 def create(
     image: str,
     key: str,
     compress: int,
+    codec: str,
+    auto_compress: bool,
     pack: int,
     output: str,
     showim: bool,
+    stream: bool,
+    buffer: int,
+    jobs: int,
+    kdf: str,
+    mapped: bool,
+    png_preset: str,
+    png_level: int,
+    png_strategy: str,
+    png_optimize: bool,
+    daemon: bool,
+    timings: bool,
     data: str
 ):
+    from StegLibrary.helper import raw_open
+
     if pack not in Config.available_density:
         raise click.exceptions.BadOptionUsage(
             "pack", "Density must be from 1 to 3!")
@@ -90,36 +213,96 @@ def create(
     if output is None:
         # Get the absolute path for the default output file
         # Default is the name of data file, change extension to .png
+        # (or to that of the image, if mapped)
         name_no_ext = path.splitext(data)[0]
-        output = name_no_ext + ".png"
+        output = name_no_ext + \
+            (path.splitext(image)[1] if mapped else ".png")
     elif not path.isabs(output):
         # Get the absolute path for the user-specified output file
         output = path.join(getcwd(), *path.split(output))
 
+    # Forward to the daemon when it runs, unless an option needs this process
+    client = _connect_daemon(data, image) if daemon and not mapped and \
+        not showim and not timings else None
+    if client is not None:
+        with client:
+            steganograph = client.create(
+                _read_file(data),
+                _read_file(image),
+                auth_key=key,
+                compression=compress,
+                codec=codec,
+                auto_compress=auto_compress,
+                density=pack,
+                stream=stream,
+                buffer_size=buffer,
+                kdf=kdf,
+                png_preset=png_preset,
+                png_compress_level=png_level,
+                png_strategy=png_strategy,
+                png_optimize=png_optimize,
+            )
+        try:
+            with raw_open(output, "wb") as output_fileobject:
+                output_fileobject.write(steganograph)
+        except IOError:
+            raise click.FileError(output)
+        return
+
+    from StegLibrary.helper import open_image
+    from StegLibrary.core.mapped import open_carrier
+    from StegLibrary.core.steg import write_steg
+    from StegLibrary.core.timing import Timings
+
+    stage_timings = Timings() if timings else None
+
     # Attempt to read files
-    try:
-        image_fileobject = raw_open(image)
-    except IOError:
-        raise click.FileError(image)
     try:
         data_fileobject = raw_open(data)
     except IOError:
         raise click.FileError(data)
-    try:
-        output_fileobject = raw_open(output, "wb")
-    except IOError:
-        raise click.FileError(output)
+    if mapped:
+        # The copy of the image is written in place
+        try:
+            carrier = open_carrier(image, output)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="image")
+        except IOError:
+            raise click.FileError(output)
+        output_fileobject = None
+    else:
+        try:
+            carrier = open_image(raw_open(image))
+        except IOError:
+            raise click.FileError(image)
+        try:
+            output_fileobject = raw_open(output, "wb")
+        except IOError:
+            raise click.FileError(output)
 
     # Perform operation
     write_steg(
         data_fileobject,
-        open_image(image_fileobject),
+        carrier,
         output_fileobject,
         auth_key=key,
         compression=compress,
+        codec=codec,
+        auto_compress=auto_compress,
         density=pack,
         show_image_on_completion=showim,
+        stream=stream,
+        buffer_size=buffer,
+        workers=jobs,
+        kdf=kdf,
+        png_preset=png_preset,
+        png_compress_level=png_level,
+        png_strategy=png_strategy,
+        png_optimize=png_optimize,
+        timings=stage_timings,
     )
+    if stage_timings is not None:
+        click.echo(stage_timings, err=True)
 
 
 @steg.command(
@@ -146,12 +329,49 @@ def create(
     type=bool,
     default=False
 )
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of worker processes (requires the numpy engine)",
+    type=click.IntRange(min=1),
+    default=Config.default_workers,
+)
+@click.option(
+    "--mapped",
+    help="Whether to read an uncompressed image (BMP, PPM/PGM or TIFF) " +
+    "through a memory map, rather than decoding it",
+    type=bool,
+    default=False,
+)
+@click.option(
+    "--daemon",
+    help="Whether to run on the daemon (steg daemon), when it runs",
+    type=bool,
+    default=True,
+)
+@click.option(
+    "--timings",
+    help="Whether to report the time spent in each stage (on stderr)",
+    type=bool,
+    default=False,
+)
 @click.argument(
     "steganograph",
     required=True,
     type=click.Path(True, True, False)
 )
-def extract(key: str, output: str, stdout: bool, steganograph: str):
+def extract(
+    key: str,
+    output: str,
+    stdout: bool,
+    jobs: int,
+    mapped: bool,
+    daemon: bool,
+    timings: bool,
+    steganograph: str
+):
+    from StegLibrary.helper import raw_open
+
     if not path.isabs(steganograph):
         # Get the absolute path for the steganograph
         steganograph = path.join(getcwd(), *path.split(steganograph))
@@ -161,13 +381,49 @@ def extract(key: str, output: str, stdout: bool, steganograph: str):
         # Default is the name of the steganograph, extension-stripped
         output = path.splitext(steganograph)[0]
 
+    # The output file is emptied before the steganograph is read, so it
+    # must not be the steganograph. Also catches links.
+    if path.normcase(path.abspath(output)) == path.normcase(steganograph) \
+            or path.exists(output) and path.samefile(steganograph, output):
+        from StegLibrary.core.errors import OutputFileError
+        raise OutputFileError(
+            f"Output file would overwrite the steganograph: {output}")
+
+    # Forward to the daemon when it runs, unless an option needs this process
+    client = _connect_daemon(steganograph) if daemon and not mapped and \
+        not timings else None
+    if client is not None:
+        with client:
+            image = _read_file(steganograph)
+            try:
+                output_fileobject = raw_open(output, "wb")
+            except IOError:
+                raise click.FileError(output)
+            output_object = [output_fileobject]
+            if stdout:
+                output_object.append(std)
+            client.extract(image, output_object, auth_key=key)
+        return
+
+    from StegLibrary.core.mapped import open_carrier
+    from StegLibrary.core.steg import extract_steg
+    from StegLibrary.core.timing import Timings
+
+    stage_timings = Timings() if timings else None
+
     # Attempt to read files
     try:
-        steganograph_fileobject = raw_open(steganograph)
+        if mapped:
+            steganograph_fileobject = open_carrier(steganograph,
+                                                   writable=False)
+        else:
+            steganograph_fileobject = raw_open(steganograph)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="steganograph")
     except IOError:
         raise click.FileError(steganograph)
     try:
-        output_fileobject = raw_open(output)
+        output_fileobject = raw_open(output, "wb")
     except IOError:
         raise click.FileError(output)
 
@@ -180,7 +436,529 @@ def extract(key: str, output: str, stdout: bool, steganograph: str):
         steganograph_fileobject,
         output_object,
         auth_key=key,
+        workers=jobs,
+        timings=stage_timings,
+    )
+    if stage_timings is not None:
+        click.echo(stage_timings, err=True)
+
+
+@steg.command(
+    "extract-batch",
+    help="Extract many steganographs in parallel, logging results as JSONL",
+)
+@click.option(
+    "-d",
+    "--dir",
+    "directory",
+    help="Directory of steganographs (PNG files)",
+    type=click.Path(True, False, True),
+)
+@click.option(
+    "-g",
+    "--glob",
+    "pattern",
+    help="Glob pattern of steganographs (\"**\" is recursive)",
+    type=str,
+)
+@click.option(
+    "-m",
+    "--manifest",
+    help="File listing one steganograph per line",
+    type=click.Path(True, True, False),
+)
+@click.option(
+    "-k",
+    "--key",
+    help="The authentication key",
+    type=str,
+    default=Config.default_auth_key,
+)
+@click.option(
+    "-o",
+    "--output",
+    help="Directory of output files (default is next to each steganograph)",
+    type=click.Path(False, False, True),
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of worker processes",
+    type=click.IntRange(min=1),
+    default=cpu_count() or 1,
+)
+@click.option(
+    "-l",
+    "--log",
+    help="Path to the JSONL result log (default is stdout)",
+    type=click.File("w"),
+    default="-",
+)
+def extract_batch(
+    directory: str,
+    pattern: str,
+    manifest: str,
+    key: str,
+    output: str,
+    jobs: int,
+    log: TextIO,
+):
+    from StegLibrary.core.batch import (
+        collect_steganographs,
+        extract_steg_batch,
+    )
+
+    if directory is None and pattern is None and manifest is None:
+        raise click.exceptions.UsageError(
+            "One of --dir, --glob or --manifest is required!")
+
+    if output is not None:
+        makedirs(output, exist_ok=True)
+
+    steganographs = collect_steganographs(
+        directory=directory, pattern=pattern, manifest=manifest)
+
+    # Log one line per steganograph, as soon as it completes
+    start = perf_counter()
+    failed = 0
+    for steganograph, output_path, result in extract_steg_batch(
+            steganographs, output_dir=output, workers=jobs, ordered=False,
+            auth_key=key):
+        entry = {
+            "path": steganograph,
+            "output": output_path,
+            "status": "ok" if result.success else "error",
+            "bytes": result.value if result.success else 0,
+            "elapsed": round(result.elapsed, 6),
+            "completed": round(perf_counter() - start, 6),
+        }
+        if not result.success:
+            failed += 1
+            entry["error"] = \
+                f"{type(result.error).__name__}: {result.error}"
+        log.write(dumps(entry) + "\n")
+        log.flush()
+
+    if failed:
+        raise click.exceptions.Exit(1)
+
+
+@steg.command(
+    "capacity",
+    help="Show how much data an image can hold, without decoding it",
+)
+@click.option(
+    "-d",
+    "--data",
+    help="Path to the payload to check",
+    type=click.Path(True, True, False),
+)
+@click.option(
+    "-s",
+    "--size",
+    help="Size of the payload to check (in bytes)",
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "-c",
+    "--compress",
+    help="Compression level of the steganograph",
+    type=click.IntRange(min(Config.available_compression),
+                        max(Config.available_compression)),
+    default=Config.default_compression,
+)
+@click.option(
+    "--codec",
+    help="Compression codec of the steganograph",
+    type=click.Choice(Config.available_codec),
+    default=Config.default_codec,
+)
+@click.option(
+    "--stream",
+    help="Whether data would be embedded chunk by chunk",
+    type=bool,
+    default=Config.flag_stream,
+)
+@click.option(
+    "-b",
+    "--buffer",
+    help="Size of each chunk (in bytes) when streaming",
+    type=click.IntRange(min=1),
+    default=Config.default_buffer_size,
+)
+@click.argument("image", type=click.Path(True, True, False), required=True)
+def capacity(
+    data: str,
+    size: int,
+    compress: int,
+    codec: str,
+    stream: bool,
+    buffer: int,
+    image: str,
+):
+    from StegLibrary.core.capacity import plan_capacity
+
+    if data is not None:
+        size = stat(data).st_size
+    # Without a payload, only the usable bytes are of interest
+    payload_size = 0 if size is None else size
+
+    try:
+        plans = [
+            plan_capacity(image, payload_size, density=density,
+                          compression=compress, codec=codec,
+                          stream=stream, buffer_size=buffer)
+            for density in Config.available_density
+        ]
+    except IOError:
+        raise click.FileError(image)
+
+    x_dim, y_dim = plans[0].size
+    click.echo(f"Image: {x_dim}x{y_dim}")
+    for plan in plans:
+        line = f"Density {plan.density}: {plan.usable_bytes} usable bytes"
+        if size is not None:
+            if plan.fits_worst_case:
+                verdict = "fits"
+            elif plan.fits_best_case:
+                verdict = "may fit, depending on compression"
+            else:
+                verdict = "does not fit"
+            line += f", payload {verdict} ({plan.best_case_bytes} to " + \
+                f"{plan.worst_case_bytes} of {plan.storable_bytes} bytes)"
+        click.echo(line)
+
+
+@steg.command(
+    "serve",
+    help="Serve create, extract, inspect and capacity over local HTTP",
+)
+@click.option(
+    "-h",
+    "--host",
+    help="Address to listen on",
+    default=Config.default_host,
+)
+@click.option(
+    "-p",
+    "--port",
+    help="TCP port to listen on",
+    type=click.IntRange(0, 65535),
+    default=Config.default_port,
+)
+@click.option(
+    "-u",
+    "--unix",
+    help="Path of a Unix socket to listen on, instead of TCP",
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of worker processes",
+    type=click.IntRange(min=1),
+    default=Config.default_concurrency,
+)
+@click.option(
+    "--max-body",
+    help="Largest request body accepted (in bytes)",
+    type=click.IntRange(min=1),
+    default=Config.default_max_body_size,
+)
+def serve(host: str, port: int, unix: str, jobs: int, max_body: int):
+    from StegLibrary.core.server import serve as run_server
+
+    def on_start(listener) -> None:
+        if unix is not None:
+            click.echo(f"Serving on {unix}")
+        else:
+            address, bound_port = listener.sockets[0].getsockname()[:2]
+            click.echo(f"Serving on http://{address}:{bound_port}")
+
+    run_server(host, port, unix, workers=jobs, max_body_size=max_body,
+               on_start=on_start)
+
+
+@steg.command(
+    "daemon",
+    help="Keep a warm worker pool on a Unix socket, which create and " +
+    "extract run on",
+)
+@click.option(
+    "-u",
+    "--unix",
+    help="Path of the Unix socket (default: $STEG_SOCKET, else in the " +
+    "runtime directory)",
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of worker processes",
+    type=click.IntRange(min=1),
+    default=Config.default_concurrency,
+)
+@click.option(
+    "--max-body",
+    help="Largest request accepted (in bytes); larger files are run in " +
+    "the process of the command",
+    type=click.IntRange(min=1),
+    default=Config.default_max_body_size,
+)
+def daemon(unix: str, jobs: int, max_body: int):
+    from StegLibrary.core.client import (
+        DaemonError,
+        check_private,
+        connect_daemon,
+        daemon_socket_path,
     )
+    from StegLibrary.core.server import serve as run_server
+
+    if unix is None:
+        unix = daemon_socket_path()
+        # Clients only use a socket in a directory private to the user
+        directory = path.dirname(unix)
+        makedirs(directory, 0o700, exist_ok=True)
+        try:
+            check_private(directory)
+        except DaemonError as e:
+            raise click.ClickException(str(e))
+    client = connect_daemon(unix)
+    if client is not None:
+        client.close()
+        raise click.ClickException(f"A daemon already runs on {unix}")
+
+    def on_start(_) -> None:
+        click.echo(f"Daemon running on {unix}")
+
+    run_server(unix_path=unix, workers=jobs, max_body_size=max_body,
+               on_start=on_start)
+
+
+@steg.group(
+    "bench",
+    help="Benchmark create and extract on synthetic carriers",
+)
+def bench():
+    pass
+
+
+@bench.command(
+    "run",
+    help="Run the benchmark suite, and write its results as JSON",
+)
+@click.option(
+    "-P",
+    "--profile",
+    help="Scenarios to run (\"full\" goes up to 50 megapixels, and " +
+    "takes hours)",
+    type=click.Choice(["quick", "full"]),
+    default="quick",
+)
+@click.option(
+    "-s",
+    "--size",
+    "sizes",
+    help="Size of the carriers, in megapixels (overrides the profile)",
+    type=click.FloatRange(min=0.001),
+    multiple=True,
+)
+@click.option(
+    "-p",
+    "--pack",
+    "densities",
+    help="Density of the steganographs (overrides the profile)",
+    type=click.IntRange(min(Config.available_density),
+                        max(Config.available_density)),
+    multiple=True,
+)
+@click.option(
+    "--codec",
+    "codecs",
+    help="Compression codec (overrides the profile)",
+    type=click.Choice(Config.available_codec),
+    multiple=True,
+)
+@click.option(
+    "-c",
+    "--compress",
+    "compressions",
+    help="Compression level (overrides the profile)",
+    type=click.IntRange(min(Config.available_compression),
+                        max(Config.available_compression)),
+    multiple=True,
+)
+@click.option(
+    "-e",
+    "--entropy",
+    "entropies",
+    help="Kind of payload (overrides the profile)",
+    type=click.Choice(["low", "medium", "high"]),
+    multiple=True,
+)
+@click.option(
+    "-r",
+    "--repeat",
+    help="Number of rounds, each running every operation once " +
+    "(overrides the profile)",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--seed",
+    help="Seed of the carriers and payloads",
+    type=int,
+    default=0,
+)
+@click.option(
+    "--isolate",
+    help="Whether to run each scenario in a new process, so that its " +
+    "peak RSS is its own",
+    type=bool,
+    default=True,
+)
+@click.option(
+    "-o",
+    "--output",
+    help="Path to the JSON results (default is stdout)",
+    type=click.File("w"),
+    default="-",
+)
+def bench_run(
+    profile: str,
+    sizes: tuple,
+    densities: tuple,
+    codecs: tuple,
+    compressions: tuple,
+    entropies: tuple,
+    repeat: int,
+    seed: int,
+    isolate: bool,
+    output: TextIO,
+):
+    from StegLibrary.core.bench import bench_profiles, plan_scenarios, \
+        run_bench
+
+    # Axes given on the command line replace those of the profile
+    settings = bench_profiles[profile]._replace(**{
+        name: value for name, value in (
+            ("sizes", sizes),
+            ("densities", densities),
+            ("codecs", codecs),
+            ("compressions", compressions),
+            ("entropies", entropies),
+            ("repeat", repeat),
+        ) if value
+    })
+    scenarios = plan_scenarios(settings)
+
+    def on_progress(done: int, total: int, scenario) -> None:
+        # Progress goes to stderr, so that stdout is only JSON
+        click.echo(f"[{done}/{total}] {scenario.name}", err=True)
+
+    results = run_bench(scenarios, settings.repeat, seed=seed,
+                        isolate=isolate, on_progress=on_progress)
+    results["settings"]["profile"] = profile
+    output.write(dumps(results, indent=2) + "\n")
+
+
+@bench.command(
+    "compare",
+    help="Compare the results of two runs, and fail on regressions",
+)
+@click.option(
+    "-t",
+    "--tolerance",
+    help="Smallest relative change of a median time that is reported",
+    type=click.FloatRange(min=0),
+    default=Config.default_bench_tolerance,
+)
+@click.option(
+    "--sigmas",
+    help="Number of standard deviations of the noise of both runs a " +
+    "change must exceed",
+    type=click.FloatRange(min=0),
+    default=Config.default_bench_sigmas,
+)
+@click.option(
+    "--alpha",
+    help="Largest probability of a change being noise, for it to be " +
+    "reported",
+    type=click.FloatRange(0, 1),
+    default=Config.default_bench_alpha,
+)
+@click.option(
+    "-m",
+    "--memory-tolerance",
+    help="Smallest relative change of a peak RSS that is reported",
+    type=click.FloatRange(min=0),
+    default=Config.default_bench_memory_tolerance,
+)
+@click.option(
+    "--normalise",
+    help="Whether to scale times by the speed of each machine, measured " +
+    "by a calibration workload",
+    type=bool,
+    default=True,
+)
+@click.option(
+    "-a",
+    "--all",
+    "show_all",
+    help="Whether to also show the scenarios that did not change",
+    type=bool,
+    default=False,
+)
+@click.argument("baseline", type=click.File("r"), required=True)
+@click.argument("current", type=click.File("r"), required=True)
+def bench_compare(
+    tolerance: float,
+    sigmas: float,
+    alpha: float,
+    memory_tolerance: float,
+    normalise: bool,
+    show_all: bool,
+    baseline: TextIO,
+    current: TextIO,
+):
+    from StegLibrary.core.bench import compare_bench, format_comparisons
+
+    try:
+        baseline_results = loads(baseline.read())
+        current_results = loads(current.read())
+        comparison = compare_bench(
+            baseline_results, current_results, tolerance=tolerance,
+            sigmas=sigmas, alpha=alpha, memory_tolerance=memory_tolerance,
+            normalise=normalise)
+    except (ValueError, KeyError, TypeError) as e:
+        raise click.ClickException(f"Results cannot be compared: {e}")
+
+    if baseline_results.get("environment") != \
+            current_results.get("environment"):
+        click.echo("Warning: runs were made in different environments",
+                   err=True)
+    if comparison.speed is not None:
+        click.echo(f"Machine speed: calibration took {comparison.speed:.2f}" +
+                   "x the time of the baseline (times are scaled by it)")
+
+    # Overall changes are always shown
+    shown = [change for change in comparison.comparisons
+             if show_all or change.verdict != "unchanged" or
+             change.name == "overall"]
+    if shown:
+        click.echo(format_comparisons(shown))
+    for name in comparison.missing:
+        click.echo(f"Missing from the current run: {name}", err=True)
+    for name in comparison.added:
+        click.echo(f"Missing from the baseline: {name}", err=True)
+
+    counts = {verdict: sum(change.verdict == verdict
+                           for change in comparison.comparisons)
+              for verdict in ("regression", "improvement", "unchanged")}
+    click.echo(f"{counts['regression']} regressions, " +
+               f"{counts['improvement']} improvements, " +
+               f"{counts['unchanged']} unchanged")
+    if counts["regression"]:
+        raise click.exceptions.Exit(1)
 
 
 @steg.command(
@@ -188,4 +966,6 @@ def extract(key: str, output: str, stdout: bool, steganograph: str):
     help="Run the Graphical User Interface"
 )
 def gui():
+    from StegLibrary.gui import execute_gui
+
     execute_gui()
@@ -0,0 +1,218 @@
+# This script implements the memory-mapped carriers. Images in uncompressed
+# formats (BMP, PPM/PGM and uncompressed TIFF) store their pixels as plain
+# bytes, so the file is mapped into memory and the colour integers holding
+# the data are rewritten in place. Nothing is decoded nor re-encoded, hence
+# the cost depends on the size of the data, not on the size of the image.
+
+# Builtin modules
+from shutil import copyfile
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Internal modules
+from StegLibrary.core.engine import (
+    channels_per_pixel,
+    embed_array,
+    extract_array,
+    mode_channels,
+)
+from StegLibrary.helper import err_imp
+
+# Non-builtin modules
+try:
+    from PIL import Image
+except ImportError:
+    err_imp("Pillow")
+    exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    err_imp("numpy")
+    exit(1)
+
+
+class RawLayout(NamedTuple):
+    """How the pixels of an uncompressed image are stored."""
+
+    # Image mode of the pixels, once mapped
+    mode: str
+    # Type of each colour integer
+    dtype: str
+    # Number of colour integers stored for each pixel
+    raw_channels: int
+    # Whether the colour integers are stored in reverse order (e.g. BGR)
+    reverse: bool
+
+
+# Layouts of the pixels which can be mapped, by Pillow raw mode
+raw_layouts: Dict[str, RawLayout] = {
+    "L": RawLayout("L", "u1", 1, False),
+    "LA": RawLayout("LA", "u1", 2, False),
+    "RGB": RawLayout("RGB", "u1", 3, False),
+    "RGBA": RawLayout("RGBA", "u1", 4, False),
+    "BGR": RawLayout("RGB", "u1", 3, True),
+    # The fourth byte of 32-bit BMP pixels is unused
+    "BGRX": RawLayout("RGB", "u1", 4, True),
+    "I;16": RawLayout("I;16", "<u2", 1, False),
+    "I;16B": RawLayout("I;16", ">u2", 1, False),
+}
+
+
+def _find_pixels(path: str) -> Tuple[Tuple[int, int], RawLayout, int, int,
+                                     int]:
+    """Finds where and how the pixels of an image file are stored, from
+    its header alone.
+
+    ### Returns
+
+    A tuple (size, layout, offset, stride, orientation) of the image: the
+    offset of the first row stored, the number of bytes between rows, and
+    whether rows are stored from the top (1) or the bottom (-1)
+
+    ### Raises
+
+    - ValueError
+        - Raised when the pixels are compressed, or stored in a layout
+        which cannot be mapped
+    """
+    with Image.open(path) as image:
+        size, tiles = image.size, image.tile
+    x_dim, y_dim = size
+
+    # Every tile must be raw, and span whole rows
+    if not tiles or any(tile[0] != "raw" or tile[1][0] != 0 or
+                        tile[1][2] != x_dim for tile in tiles):
+        raise ValueError("Image format cannot be mapped!")
+
+    # Raw mode, then the optional stride and orientation
+    args = tiles[0][3]
+    if isinstance(args, str):
+        args = (args,)
+    raw_mode = args[0]
+    stride = args[1] if len(args) > 1 else 0
+    orientation = args[2] if len(args) > 2 else 1
+    if raw_mode not in raw_layouts or orientation not in (1, -1) or \
+            any(tile[3] != tiles[0][3] for tile in tiles):
+        raise ValueError("Image format cannot be mapped!")
+    layout = raw_layouts[raw_mode]
+    stride = stride or \
+        x_dim * layout.raw_channels * np.dtype(layout.dtype).itemsize
+
+    # Strips must follow each other, so that rows are evenly spaced
+    offset, y_next = tiles[0][2], 0
+    for tile in tiles:
+        _, y_start, _, y_stop = tile[1]
+        if y_start != y_next or tile[2] != offset + y_start * stride:
+            raise ValueError("Image format cannot be mapped!")
+        y_next = y_stop
+    if y_next != y_dim:
+        raise ValueError("Image format cannot be mapped!")
+
+    return size, layout, offset, stride, orientation
+
+
+class MappedCarrier:
+    """An image file in an uncompressed format, whose pixels are mapped
+    into memory.
+
+    The pixels are exposed as an array of shape (height, width, channels),
+    in the same order as the pixels of the image opened by Pillow, so that
+    steganographs written through the map can be read by Pillow, and
+    conversely.
+    """
+
+    def __init__(self, path: str, writable: bool = False) -> None:
+        size, layout, offset, stride, orientation = _find_pixels(path)
+
+        self.path: str = path
+        self.size: Tuple[int, int] = size
+        self.mode: str = layout.mode
+        self.writable: bool = writable
+
+        # Map the whole file, then view the rows of pixels in it
+        self._mmap = np.memmap(path, np.uint8, "r+" if writable else "r")
+        x_dim, y_dim = size
+        itemsize = np.dtype(layout.dtype).itemsize
+        pixels = np.ndarray(
+            (y_dim, x_dim, layout.raw_channels), layout.dtype,
+            buffer=self._mmap, offset=offset,
+            strides=(stride, layout.raw_channels * itemsize, itemsize),
+        )
+        # Rows stored from the bottom are flipped, and colour integers
+        # stored in reverse order are reversed, both without copying
+        if orientation == -1:
+            pixels = pixels[::-1]
+        channels = mode_channels[layout.mode]
+        if layout.reverse:
+            pixels = pixels[..., channels - 1::-1]
+        else:
+            pixels = pixels[..., :channels]
+        self.pixels: np.ndarray = pixels
+
+    def __enter__(self) -> "MappedCarrier":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def flush(self) -> None:
+        """Writes the modified pixels back to the file."""
+        if self.writable:
+            self._mmap.flush()
+
+    def close(self) -> None:
+        """Writes the modified pixels back to the file, then unmaps it."""
+        self.flush()
+        # The map is released once no view of it is left
+        self.pixels = None
+        self._mmap = None
+
+
+def open_carrier(path: str, output: Optional[str] = None, *,
+                 writable: bool = True) -> MappedCarrier:
+    """Maps an image file in an uncompressed format into memory.
+
+    ### Positional arguments
+
+    - path (str)
+        - Path of the image, in BMP, PPM/PGM or uncompressed TIFF format
+
+    - output (str) (default = None)
+        - Path of a copy of the image to map instead, leaving the image
+        untouched
+
+    ### Keyword arguments
+
+    - writable (bool) (default = True)
+        - Whether the pixels can be modified
+
+    ### Returns
+
+    A MappedCarrier of the image (or of its copy)
+
+    ### Raises
+
+    - ValueError
+        - Raised when the pixels of the image cannot be mapped
+    """
+    if output is not None:
+        # Check the image before copying it
+        _find_pixels(path)
+        copyfile(path, output)
+        path = output
+    return MappedCarrier(path, writable)
+
+
+def embed_mapped(carrier: MappedCarrier, data: bytes, density: int,
+                 bit_offset: int = 0,
+                 channels: int = channels_per_pixel) -> None:
+    """Embeds data into a mapped carrier, in place (see embed_array)."""
+    embed_array(carrier.pixels, data, density, bit_offset, channels)
+
+
+def extract_mapped(carrier: MappedCarrier, density: int, length: int,
+                   bit_offset: int = 0,
+                   channels: int = channels_per_pixel) -> bytes:
+    """Extracts data from a mapped carrier (see extract_array)."""
+    return extract_array(carrier.pixels, density, length, bit_offset,
+                         channels)
@@ -0,0 +1,205 @@
+# This script implements the in-memory API, which takes and returns bytes
+# rather than file-like objects. Payloads are read through a memoryview, so
+# that bytes, bytearray, numpy arrays and any other buffer are never copied
+# before being compressed or encrypted.
+
+# Builtin modules
+from io import BytesIO
+from typing import Any, Optional, Union
+
+# Internal modules
+from StegLibrary.core import SteganographyConfig as cfg
+from StegLibrary.core.png import find_png_options, save_png
+from StegLibrary.core.steg import iter_steg, write_steg
+from StegLibrary.core.timing import Timings, measure
+from StegLibrary.crypto import KeyCache
+from StegLibrary.helper import err_imp
+
+# Non-builtin modules
+try:
+    from PIL import Image, UnidentifiedImageError
+except ImportError:
+    err_imp("Pillow")
+    exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    err_imp("numpy")
+    exit(1)
+
+
+def _byte_view(data: Any) -> memoryview:
+    """Views a buffer as a flat sequence of bytes, without copying.
+
+    ### Raises
+
+    - TypeError
+        - Raised when the object does not support the buffer protocol, or
+        its buffer is not contiguous
+    """
+    view = memoryview(data)
+    if view.format != "B" or view.ndim != 1:
+        view = view.cast("B")
+    return view
+
+
+def open_carrier_image(carrier: Union[bytes, Image.Image, np.ndarray,
+                                      Any],
+                       writable: bool = False) -> Image.Image:
+    """Opens a carrier given as an image, an array of pixels or the bytes
+    of an encoded image.
+
+    ### Positional arguments
+
+    - carrier (bytes-like | PIL.Image.Image | numpy.ndarray)
+        - The encoded image, an opened image object (returned as is) or
+        an array of pixels
+
+    - writable (bool) (default = False)
+        - Whether the image is to be embedded into, in which case an
+        array of pixels is copied rather than shared
+
+    ### Returns
+
+    The opened image
+
+    ### Raises
+
+    - TypeError
+        - Raised when the bytes are not those of an image, or the object
+        does not support the buffer protocol
+    """
+    if isinstance(carrier, Image.Image):
+        return carrier
+    if isinstance(carrier, np.ndarray):
+        # The image may share the pixels of the array, read-only, so it is
+        # copied before being written: the array is never modified
+        image = Image.fromarray(carrier)
+        return image.copy() if writable else image
+    # Bytes are shared by BytesIO, and other buffers are copied once
+    if not isinstance(carrier, bytes):
+        carrier = _byte_view(carrier)
+    try:
+        return Image.open(BytesIO(carrier))
+    except UnidentifiedImageError:
+        raise TypeError("Carrier must be an image, or the bytes of one!")
+
+
+def embed_bytes(
+    payload: Any,
+    carrier: Union[bytes, Image.Image, np.ndarray, Any],
+    *,
+    auth_key: str = cfg.default_auth_key,
+    compression: int = cfg.default_compression,
+    codec: str = cfg.default_codec,
+    auto_compress: bool = cfg.flag_auto_compress,
+    density: int = cfg.default_density,
+    engine: str = cfg.default_engine,
+    stream: bool = cfg.flag_stream,
+    buffer_size: int = cfg.default_buffer_size,
+    workers: int = cfg.default_workers,
+    kdf: str = cfg.default_kdf,
+    header_version: int = cfg.default_header_version,
+    png_preset: str = cfg.default_png_preset,
+    png_compress_level: Optional[int] = None,
+    png_strategy: Optional[str] = None,
+    png_optimize: Optional[bool] = None,
+    timings: Optional[Timings] = None,
+) -> bytes:
+    """Embeds a payload into a carrier, and returns the steganograph.
+
+    ### Positional arguments
+
+    - payload (bytes-like)
+        - The data to embed: bytes, bytearray, memoryview or any object
+        supporting the buffer protocol (read without copying)
+
+    - carrier (bytes-like | PIL.Image.Image | numpy.ndarray)
+        - The encoded carrier image, an opened image object (modified in
+        place, as by write_steg) or an array of pixels (never modified)
+
+    ### Keyword arguments
+
+    Same as write_steg.
+
+    ### Returns
+
+    The steganograph, encoded as PNG
+
+    ### Raises
+
+    Same as write_steg, and:
+
+    - TypeError
+        - Raised when the payload or carrier is not a supported type
+    """
+    # Fail on invalid PNG settings before doing any work
+    png_options = find_png_options(png_preset, png_compress_level,
+                                   png_strategy, png_optimize)
+    image = open_carrier_image(carrier, writable=True)
+
+    # The image is written in place, then encoded once
+    write_steg(
+        _byte_view(payload),
+        image,
+        None,
+        auth_key=auth_key,
+        compression=compression,
+        codec=codec,
+        auto_compress=auto_compress,
+        density=density,
+        close_on_exit=False,
+        engine=engine,
+        stream=stream,
+        buffer_size=buffer_size,
+        workers=workers,
+        kdf=kdf,
+        header_version=header_version,
+        timings=timings,
+    )
+    output = BytesIO()
+    with measure(timings, "encode"):
+        save_png(image, output, png_options)
+    return output.getvalue()
+
+
+def extract_bytes(
+    image: Union[bytes, Image.Image, np.ndarray, Any],
+    *,
+    auth_key: str = cfg.default_auth_key,
+    engine: str = cfg.default_engine,
+    buffer_size: int = cfg.default_buffer_size,
+    workers: int = cfg.default_workers,
+    key_cache: Optional[KeyCache] = None,
+    timings: Optional[Timings] = None,
+) -> bytes:
+    """Extracts the payload of a steganograph.
+
+    ### Positional arguments
+
+    - image (bytes-like | PIL.Image.Image | numpy.ndarray)
+        - The encoded steganograph, an opened image object of it, or an
+        array of its pixels
+
+    ### Keyword arguments
+
+    Same as iter_steg.
+
+    ### Returns
+
+    The extracted data
+
+    ### Raises
+
+    Same as iter_steg.
+    """
+    return b"".join(iter_steg(
+        open_carrier_image(image),
+        auth_key=auth_key,
+        engine=engine,
+        buffer_size=buffer_size,
+        workers=workers,
+        key_cache=key_cache,
+        timings=timings,
+    ))
@@ -0,0 +1,318 @@
+# This script implements the parallel mode of the "numpy" engine. The
+# columns of the carrier touched by the data are copied once into shared
+# memory, in traversal order, and split into independent ranges of colour
+# integers, each of which is embedded or extracted by a worker process.
+
+# Builtin modules
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# Internal modules
+from StegLibrary.core.engine import (
+    as_columns,
+    channel_span,
+    channels_per_pixel,
+    embed_bits,
+    embed_numpy,
+    embedders,
+    extract_flat,
+    extract_numpy,
+    extractors,
+)
+from StegLibrary.helper import err_imp
+
+# Non-builtin modules
+try:
+    from PIL import Image
+except ImportError:
+    err_imp("Pillow")
+    exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    err_imp("numpy")
+    exit(1)
+
+# Shared memory is only available from Python 3.8
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:
+    SharedMemory = None
+
+
+# Minimum number of bytes handled by each worker, below which the
+# overhead of the worker outweighs the gain
+min_bytes_per_worker: int = 1 << 16
+
+
+def _split(start: int, stop: int, pieces: int) -> List[Tuple[int, int]]:
+    """Splits a range into (at most) the given number of equal ranges."""
+    step = -(-(stop - start) // pieces)
+    return [(i, min(i + step, stop)) for i in range(start, stop, step)]
+
+
+def _embed_worker(name: str, size: int, dtype: str, data: bytes,
+                  density: int, bit_offset: int, skip: int,
+                  count: int) -> None:
+    """Embeds count bits of data, after skipping the first skip bits."""
+    # The block is owned (and unlinked) by the parent process
+    shm = SharedMemory(name=name)
+    try:
+        flat = np.ndarray((size,), dtype, buffer=shm.buf)
+        bits = np.unpackbits(np.frombuffer(data, np.uint8), bitorder="little")
+        embed_bits(flat, bits[skip:skip + count], density, bit_offset)
+        # The view must be released before closing the block
+        del flat
+    finally:
+        shm.close()
+
+
+def _extract_worker(name: str, size: int, dtype: str, density: int,
+                    length: int, bit_offset: int) -> bytes:
+    """Extracts length bytes, starting from the given bit."""
+    # The block is owned (and unlinked) by the parent process
+    shm = SharedMemory(name=name)
+    try:
+        flat = np.ndarray((size,), dtype, buffer=shm.buf)
+        data = extract_flat(flat, density, length, bit_offset)
+        # The view must be released before closing the block
+        del flat
+        return data
+    finally:
+        shm.close()
+
+
+def _count_workers(length: int, workers: int) -> int:
+    """Finds the number of workers worth using for the given data length."""
+    return max(1, min(workers, length // min_bytes_per_worker))
+
+
+def _share_columns(image: Image.Image, start: int, stop: int,
+                   channels: int) -> Tuple[np.ndarray, int, SharedMemory]:
+    """Copies the columns holding colour integers [start, stop) into a
+    shared memory block, in traversal order.
+
+    ### Returns
+
+    A tuple (region, x_start, shm) of the decoded columns, the index of the
+    first column, and the shared memory block
+    """
+    y_dim = image.size[1]
+    per_column = y_dim * channels
+    x_start, x_stop = start // per_column, -(-stop // per_column)
+    region = np.array(image.crop((x_start, 0, x_stop, y_dim)))
+    view = as_columns(region)[..., :channels]
+
+    shm = SharedMemory(create=True, size=view.nbytes)
+    flat = np.ndarray((view.size,), view.dtype, buffer=shm.buf)
+    # Pixels are traversed column by column, so transpose while copying
+    np.copyto(flat.reshape(x_stop - x_start, y_dim, channels),
+              view.transpose(1, 0, 2))
+    del flat
+    return region, x_start, shm
+
+
+def embed_parallel(image: Image.Image, data: bytes, density: int,
+                   bit_offset: int = 0,
+                   channels: int = channels_per_pixel, *, workers: int,
+                   executor: Optional[Executor] = None) -> None:
+    """Embeds data into an image, using several worker processes.
+
+    ### Positional arguments
+
+    - image (PIL.Image.Image)
+        - The carrier image, modified in place
+
+    - data (bytes)
+        - The data to embed
+
+    - density (int)
+        - The data density
+
+    - bit_offset (int) (default = 0)
+        - Index of the first bit to be written
+
+    - channels (int) (default = channels_per_pixel)
+        - Number of colour integers of each pixel used to store data
+
+    ### Keyword arguments
+
+    - workers (int)
+        - The maximum number of worker processes
+
+    - executor (concurrent.futures.Executor) (default = None)
+        - The pool to submit the work to, a new one is made if None
+
+    ### Returns
+
+    None
+    """
+    pieces = _count_workers(len(data), workers)
+    if pieces == 1:
+        return embed_numpy(image, data, density, bit_offset, channels)
+
+    width = density + 1
+    bit_count = len(data) * 8
+    start, stop = channel_span(bit_offset, bit_count, density)
+    region, x_start, shm = _share_columns(image, start, stop, channels)
+    try:
+        view = as_columns(region)[..., :channels]
+        # Offset of the data, relative to the shared columns
+        offset = bit_offset - x_start * image.size[1] * channels * width
+        start, stop = channel_span(offset, bit_count, density)
+
+        with _executor(executor, pieces) as pool:
+            futures = []
+            # Ranges of colour integers never overlap, so the workers
+            # never write to the same colour integer
+            for range_start, range_stop in _split(start, stop, pieces):
+                bit_start = max(range_start * width, offset)
+                bit_stop = min(range_stop * width, offset + bit_count)
+                data_start, data_stop = bit_start - offset, bit_stop - offset
+                futures.append(pool.submit(
+                    _embed_worker, shm.name, view.size, view.dtype.str,
+                    data[data_start // 8:-(-data_stop // 8)], density,
+                    bit_start, data_start % 8, data_stop - data_start,
+                ))
+            for future in futures:
+                future.result()
+
+        # Copy the columns back, in image order
+        flat = np.ndarray((view.size,), view.dtype, buffer=shm.buf)
+        np.copyto(view, flat.reshape(view.shape[1], view.shape[0],
+                                     channels).transpose(1, 0, 2))
+        del flat
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # Write the modified columns back to the image
+    image.paste(Image.fromarray(region), (x_start, 0))
+
+
+def extract_parallel(image: Image.Image, density: int, length: int,
+                     bit_offset: int = 0,
+                     channels: int = channels_per_pixel, *, workers: int,
+                     executor: Optional[Executor] = None) -> bytes:
+    """Extracts data from an image, using several worker processes.
+
+    ### Positional arguments
+
+    - image (PIL.Image.Image)
+        - The steganograph
+
+    - density (int)
+        - The data density
+
+    - length (int)
+        - Number of bytes to extract
+
+    - bit_offset (int) (default = 0)
+        - Index of the first bit to be read
+
+    - channels (int) (default = channels_per_pixel)
+        - Number of colour integers of each pixel used to store data
+
+    ### Keyword arguments
+
+    - workers (int)
+        - The maximum number of worker processes
+
+    - executor (concurrent.futures.Executor) (default = None)
+        - The pool to submit the work to, a new one is made if None
+
+    ### Returns
+
+    The extracted bytes string
+    """
+    pieces = _count_workers(length, workers)
+    if pieces == 1:
+        return extract_numpy(image, density, length, bit_offset, channels)
+
+    start, stop = channel_span(bit_offset, length * 8, density)
+    region, x_start, shm = _share_columns(image, start, stop, channels)
+    try:
+        view = as_columns(region)[..., :channels]
+        # Offset of the data, relative to the shared columns
+        offset = bit_offset - x_start * image.size[1] * channels * \
+            (density + 1)
+
+        with _executor(executor, pieces) as pool:
+            # Reading is harmless, so ranges are split on byte boundaries
+            futures = [
+                pool.submit(
+                    _extract_worker, shm.name, view.size, view.dtype.str,
+                    density, data_stop - data_start, offset + data_start * 8,
+                )
+                for data_start, data_stop in _split(0, length, pieces)
+            ]
+            return b"".join(future.result() for future in futures)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+@contextmanager
+def _executor(executor: Optional[Executor],
+              workers: int) -> Iterator[Executor]:
+    """Yields the given executor, or a temporary process pool."""
+    if executor is not None:
+        yield executor
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        yield pool
+
+
+def _check_workers(engine: str, workers: int) -> None:
+    """Validates the number of workers against the engine."""
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError("Number of workers must be a positive integer!")
+    if workers > 1 and engine != "numpy":
+        raise ValueError("Parallel mode requires the numpy engine!")
+    if workers > 1 and SharedMemory is None:
+        raise ValueError("Parallel mode requires Python 3.8 or later!")
+
+
+@contextmanager
+def open_embedder(engine: str, workers: int = 1) -> Iterator[
+        Callable[[Image.Image, bytes, int, int, int], None]]:
+    """Provides the embedding function of the engine.
+
+    With more than one worker, a process pool is kept for as long as the
+    context is open, and shared by every call.
+
+    ### Raises
+
+    - ValueError
+        - Raised when the number of workers is invalid for the engine
+    """
+    _check_workers(engine, workers)
+    if workers == 1:
+        yield embedders[engine]
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        yield partial(embed_parallel, workers=workers, executor=pool)
+
+
+@contextmanager
+def open_extractor(engine: str, workers: int = 1) -> Iterator[
+        Callable[[Image.Image, int, int, int, int], bytes]]:
+    """Provides the extraction function of the engine.
+
+    With more than one worker, a process pool is kept for as long as the
+    context is open, and shared by every call.
+
+    ### Raises
+
+    - ValueError
+        - Raised when the number of workers is invalid for the engine
+    """
+    _check_workers(engine, workers)
+    if workers == 1:
+        yield extractors[engine]
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        yield partial(extract_parallel, workers=workers, executor=pool)
@@ -0,0 +1,116 @@
+# This script defines the settings of the PNG encoder used to save
+# steganographs. Encoding is often the most expensive step of write_steg on
+# large carriers, so the zlib level and strategy can be traded for speed.
+
+# Builtin modules
+import zlib
+from typing import Dict, NamedTuple, Optional, Union
+from io import RawIOBase, BufferedIOBase
+
+# Internal modules
+from StegLibrary.core import SteganographyConfig as cfg
+from StegLibrary.helper import err_imp
+
+# Non-builtin modules
+try:
+    from PIL import Image
+except ImportError:
+    err_imp("Pillow")
+    exit(1)
+
+
+class PngOptions(NamedTuple):
+    """Settings of the PNG encoder."""
+
+    # zlib compression level (0 - 9)
+    compress_level: int
+    # zlib strategy, one of cfg.available_png_strategy
+    strategy: str
+    # Whether to search for the smallest encoding (much slower)
+    optimize: bool
+
+
+# zlib strategies, by name. Pillow chooses the row filters itself, so the
+# strategy is the way to adapt zlib to the filtered rows.
+png_strategies: Dict[str, int] = {
+    "default": zlib.Z_DEFAULT_STRATEGY,
+    "filtered": zlib.Z_FILTERED,
+    "huffman": zlib.Z_HUFFMAN_ONLY,
+    "rle": zlib.Z_RLE,
+    "fixed": zlib.Z_FIXED,
+}
+
+# Settings of each preset, by name.
+# The least significant bits of a steganograph are noise, which defeats
+# the matching of zlib, so Huffman coding alone is much faster at a
+# similar size.
+png_presets: Dict[str, PngOptions] = {
+    # Same as the defaults of Pillow
+    "default": PngOptions(6, "default", False),
+    "fast": PngOptions(1, "huffman", False),
+}
+
+
+def find_png_options(
+    preset: str = cfg.default_png_preset,
+    compress_level: Optional[int] = None,
+    strategy: Optional[str] = None,
+    optimize: Optional[bool] = None,
+) -> PngOptions:
+    """Finds the settings of the PNG encoder, from a preset and the
+    settings overriding it.
+
+    ### Positional arguments
+
+    - preset (str) (default = cfg.default_png_preset)
+        - The preset, one of cfg.available_png_preset
+
+    - compress_level (int) (default = None)
+        - The zlib compression level, or None to use that of the preset
+
+    - strategy (str) (default = None)
+        - The zlib strategy, or None to use that of the preset
+
+    - optimize (bool) (default = None)
+        - Whether to search for the smallest encoding, or None to use
+        that of the preset
+
+    ### Returns
+
+    A PngOptions of the settings
+
+    ### Raises
+
+    - ValueError
+        - Raised when the parametres given are not valid
+    """
+    if preset not in cfg.available_png_preset:
+        raise ValueError("PNG preset not defined!")
+    if compress_level is not None and \
+            compress_level not in cfg.available_compression:
+        raise ValueError("PNG compression level not defined!")
+    if strategy is not None and strategy not in cfg.available_png_strategy:
+        raise ValueError("PNG strategy not defined!")
+
+    options = png_presets[preset]
+    return PngOptions(
+        options.compress_level if compress_level is None else compress_level,
+        options.strategy if strategy is None else strategy,
+        options.optimize if optimize is None else optimize,
+    )
+
+
+def save_png(image: Image.Image,
+             output_file: Union[RawIOBase, BufferedIOBase],
+             options: PngOptions) -> None:
+    """Saves an image as PNG, with the given encoder settings."""
+    # 16-bit images opened in I mode are stored as such
+    if image.mode == "I":
+        image = image.convert("I;16")
+    image.save(
+        output_file,
+        "png",
+        compress_level=options.compress_level,
+        compress_type=png_strategies[options.strategy],
+        optimize=options.optimize,
+    )
@@ -0,0 +1,97 @@
+# This script defines what the service (core/server.py) and its client
+# (core/client.py) agree on: the query parameters of each endpoint and the
+# encoding of requests. It only needs the standard library, so that the
+# client starts fast.
+
+# Builtin modules
+from os import urandom
+from typing import Any, Callable, Dict, Tuple
+from urllib.parse import urlencode
+
+
+def as_bool(value: str) -> bool:
+    """Converts a query parameter into a boolean."""
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"Not a boolean: {value}")
+
+
+# Query parameters accepted by each endpoint, as
+# (name of the keyword argument, conversion)
+create_parameters: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "key": ("auth_key", str),
+    "compression": ("compression", int),
+    "codec": ("codec", str),
+    "auto_compress": ("auto_compress", as_bool),
+    "density": ("density", int),
+    "stream": ("stream", as_bool),
+    "buffer": ("buffer_size", int),
+    "kdf": ("kdf", str),
+    "header_version": ("header_version", int),
+    "png_preset": ("png_preset", str),
+    "png_level": ("png_compress_level", int),
+    "png_strategy": ("png_strategy", str),
+    "png_optimize": ("png_optimize", as_bool),
+}
+extract_parameters: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "key": ("auth_key", str),
+    "buffer": ("buffer_size", int),
+}
+capacity_parameters: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    "size": ("payload_size", int),
+    "compression": ("compression", int),
+    "codec": ("codec", str),
+    "stream": ("stream", as_bool),
+    "buffer": ("buffer_size", int),
+    "header_version": ("header_version", int),
+}
+
+
+def encode_query(options: Dict[str, Any],
+                 parameters: Dict[str, Tuple[str, Callable]]) -> str:
+    """Converts keyword arguments into query parameters, leaving out those
+    set to None.
+
+    ### Raises
+
+    - TypeError
+        - Raised when a keyword argument is not accepted by the endpoint
+    """
+    names = {argument: name for name, (argument, _) in parameters.items()}
+    query = []
+    for argument, value in options.items():
+        if argument not in names:
+            raise TypeError(f"Unexpected keyword argument: {argument}")
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        query.append((names[argument], value))
+    return urlencode(query)
+
+
+def encode_form(fields: Dict[str, bytes]) -> Tuple[str, bytes]:
+    """Encodes files as a multipart/form-data body.
+
+    ### Returns
+
+    The content type (with its boundary) and the body
+    """
+    # A random boundary, checked against the content
+    while True:
+        boundary = urandom(16).hex()
+        delimiter = b"--" + boundary.encode()
+        if not any(delimiter in value for value in fields.values()):
+            break
+
+    parts = []
+    for name, value in fields.items():
+        parts.append(delimiter + b"\r\nContent-Disposition: form-data; " +
+                     f'name="{name}"; filename="{name}"'.encode() +
+                     b"\r\nContent-Type: application/octet-stream\r\n\r\n")
+        parts.append(value)
+        parts.append(b"\r\n")
+    parts.append(delimiter + b"--\r\n")
+    return f"multipart/form-data; boundary={boundary}", b"".join(parts)
@@ -0,0 +1,465 @@
+# This script implements the service mode, which keeps the library and a
+# pool of workers warm behind a small HTTP/1.1 server, on TCP or on a Unix
+# socket, so that small requests do not pay for imports and start-up.
+# Only the standard library (asyncio) is used.
+#
+# Endpoints:
+# - POST /create    multipart form with "payload" and "carrier" files,
+#                   returns the steganograph (PNG)
+# - POST /extract   the steganograph as body, returns the payload
+# - POST /inspect   the image as body, returns its header (JSON)
+# - POST /capacity  the image as body, returns a plan per density (JSON)
+# - GET  /health    returns the status of the service (JSON)
+# - GET  /metrics   returns the request counters (JSON)
+# Settings of write_steg and extract_steg are given as query parameters.
+
+# Builtin modules
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from collections import Counter
+from http import HTTPStatus
+from json import dumps
+from os import makedirs, path, remove, umask
+from signal import SIGTERM
+from time import monotonic, perf_counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# Internal modules
+from StegLibrary.core import SteganographyConfig as cfg
+from StegLibrary.core.aio import async_extract_steg, async_write_steg, offload
+from StegLibrary.core.capacity import plan_capacity
+from StegLibrary.core.codec import codecs
+from StegLibrary.core.errors import (
+    AuthenticationError,
+    InputFileError,
+    InsufficientStorageError,
+    UnrecognisedHeaderError,
+)
+from StegLibrary.core.header import Header
+from StegLibrary.core.memory import open_carrier_image
+from StegLibrary.core.protocol import (
+    capacity_parameters,
+    create_parameters,
+    extract_parameters,
+)
+from StegLibrary.core.steg import peek_header
+
+
+class Response(NamedTuple):
+    """A response of the service."""
+
+    status: HTTPStatus
+    content_type: str
+    body: bytes
+
+
+class HttpError(Exception):
+    """Raised to answer a request with an error status."""
+
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_query(query: str, parameters: Dict[str, Tuple[str, Callable]]
+                 ) -> Dict[str, Any]:
+    """Converts query parameters into keyword arguments."""
+    options = {}
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        if name not in parameters:
+            raise HttpError(HTTPStatus.BAD_REQUEST,
+                            f"Unknown parameter: {name}")
+        argument, convert = parameters[name]
+        try:
+            options[argument] = convert(value)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST,
+                            f"Invalid parameter: {name}")
+    return options
+
+
+def _parse_form(content_type: str, body: bytes) -> Dict[str, bytes]:
+    """Splits a multipart/form-data body into its fields, by name."""
+    kind, _, parameters = content_type.partition(";")
+    boundary = None
+    for parameter in parameters.split(";"):
+        name, _, value = parameter.strip().partition("=")
+        if name == "boundary":
+            boundary = value.strip('"')
+    if kind.strip() != "multipart/form-data" or not boundary:
+        raise HttpError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                        "Expected multipart/form-data")
+
+    fields = {}
+    delimiter = b"\r\n--" + boundary.encode()
+    # The first delimiter is not preceded by a line break
+    parts = (b"\r\n" + body).split(delimiter)
+    for part in parts[1:]:
+        if part.startswith(b"--"):
+            break
+        headers, _, value = part[2:].partition(b"\r\n\r\n")
+        for line in headers.split(b"\r\n"):
+            if not line.lower().startswith(b"content-disposition:"):
+                continue
+            for parameter in line.split(b";")[1:]:
+                name, _, field = parameter.strip().partition(b"=")
+                if name == b"name":
+                    fields[field.strip(b'"').decode()] = value
+    return fields
+
+
+def _inspect(body: bytes) -> Optional[Header]:
+    """Sniffs the header of an image, on a worker."""
+    return peek_header(open_carrier_image(body))
+
+
+def _plan(body: bytes, options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Plans the capacity of an image for every density, on a worker."""
+    image = open_carrier_image(body)
+    return [plan_capacity(image, density=density, **options)._asdict()
+            for density in cfg.available_density]
+
+
+def _json(status: HTTPStatus, data: Any) -> Response:
+    return Response(status, "application/json", dumps(data).encode())
+
+
+def _error(status: HTTPStatus, error: BaseException) -> Response:
+    """Describes an error, with its type so that clients can raise it."""
+    return _json(status, {"error": str(error), "type": type(error).__name__})
+
+
+class StegServer:
+    """Serves the library over HTTP, from a warm pool of workers.
+
+    ### Keyword arguments
+
+    - workers (int) (default = cfg.default_concurrency)
+        - Number of worker processes embedding and extracting
+
+    - max_body_size (int) (default = cfg.default_max_body_size)
+        - Largest request body accepted, in bytes
+
+    - concurrency (int) (default = None)
+        - Number of jobs in flight, beyond which requests wait (twice the
+        number of workers if None, so that workers never idle)
+    """
+
+    def __init__(self, *, workers: int = cfg.default_concurrency,
+                 max_body_size: int = cfg.default_max_body_size,
+                 concurrency: Optional[int] = None) -> None:
+        self.workers: int = workers
+        self.max_body_size: int = max_body_size
+        self.concurrency: int = concurrency or 2 * workers
+        self.executor: Optional[Executor] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.started: float = monotonic()
+        # Number of responses, by endpoint and status
+        self.responses: Counter = Counter()
+        self.in_flight: int = 0
+        self.busy_seconds: float = 0.0
+
+        self.routes: Dict[Tuple[str, str], Callable] = {
+            ("POST", "/create"): self.create,
+            ("POST", "/extract"): self.extract,
+            ("POST", "/inspect"): self.inspect,
+            ("POST", "/capacity"): self.capacity,
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+        }
+
+    async def start(self, host: str = cfg.default_host,
+                    port: int = cfg.default_port,
+                    unix_path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Starts the worker pool, then listens on a TCP port, or on a
+        Unix socket if a path is given."""
+        self.executor = ProcessPoolExecutor(self.workers)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        # Start every worker now, rather than on the first requests
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self.executor, int)
+            for _ in range(self.workers)))
+
+        if unix_path is not None:
+            directory = path.dirname(unix_path)
+            if directory:
+                makedirs(directory, 0o700, exist_ok=True)
+            # Only the owner may connect. The socket is created so, rather
+            # than made so once bound, which would leave a window open.
+            mask = umask(0o177)
+            try:
+                return await asyncio.start_unix_server(self.handle, unix_path)
+            finally:
+                umask(mask)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self) -> None:
+        """Stops the worker pool."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """Answers the requests of a connection, until it is closed."""
+        try:
+            keep_alive = True
+            while keep_alive:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                response = await self.dispatch(method, target, headers, body)
+                self._write_response(writer, response, keep_alive)
+                await writer.drain()
+        except HttpError as e:
+            # The request cannot be read, so the connection is dropped
+            self._write_response(writer, _json(e.status, {"error": str(e)}),
+                                 False)
+            await writer.drain()
+            await self._linger(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _linger(reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        """Discards what the client is still sending, for a while, so that
+        closing the connection does not reset it before the response is
+        read."""
+        if writer.can_write_eof():
+            writer.write_eof()
+
+        async def discard() -> None:
+            while await reader.read(1 << 16):
+                pass
+        try:
+            await asyncio.wait_for(discard(), cfg.default_linger_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[
+            Tuple[str, str, Dict[str, str], bytes]]:
+        """Reads a request, or returns None once the connection is closed.
+
+        ### Raises
+
+        - HttpError
+            - Raised when the request is malformed or too large
+        """
+        try:
+            line = await reader.readuntil(b"\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(HTTPStatus.REQUEST_URI_TOO_LONG,
+                            "Request line too long")
+        try:
+            method, target, _ = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while True:
+            try:
+                line = await reader.readuntil(b"\r\n")
+            except asyncio.LimitOverrunError:
+                raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                "Header too long")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        # Bodies are only accepted with a length, within the limit
+        if "transfer-encoding" in headers:
+            raise HttpError(HTTPStatus.LENGTH_REQUIRED,
+                            "Chunked bodies are not supported")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length < 0 or length > self.max_body_size:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                            f"Body larger than {self.max_body_size} bytes")
+        body = await reader.readexactly(length)
+        return method, target, headers, body
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, response: Response,
+                        keep_alive: bool) -> None:
+        status = response.status
+        writer.write((
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {response.content_type}\r\n"
+            f"Content-Length: {len(response.body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        ).encode("latin-1"))
+        writer.write(response.body)
+
+    async def dispatch(self, method: str, target: str,
+                       headers: Dict[str, str], body: bytes) -> Response:
+        """Answers a request, mapping errors to statuses."""
+        url = urlsplit(target)
+        route = self.routes.get((method, url.path))
+        if route is None:
+            if any(path == url.path for _, path in self.routes):
+                response = _json(HTTPStatus.METHOD_NOT_ALLOWED,
+                                 {"error": "Method not allowed"})
+            else:
+                response = _json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+            self.responses[("-", response.status.value)] += 1
+            return response
+
+        start = perf_counter()
+        self.in_flight += 1
+        try:
+            response = await route(url.query, headers, body)
+        except HttpError as e:
+            response = _json(e.status, {"error": str(e)})
+        except AuthenticationError as e:
+            response = _error(HTTPStatus.FORBIDDEN, e)
+        except (UnrecognisedHeaderError, InsufficientStorageError) as e:
+            response = _error(HTTPStatus.UNPROCESSABLE_ENTITY, e)
+        except (ValueError, TypeError, InputFileError) as e:
+            response = _error(HTTPStatus.BAD_REQUEST, e)
+        except Exception as e:
+            # Keep serving other requests, whatever went wrong
+            response = _error(HTTPStatus.INTERNAL_SERVER_ERROR, e)
+        finally:
+            self.in_flight -= 1
+            self.busy_seconds += perf_counter() - start
+        self.responses[(url.path, response.status.value)] += 1
+        return response
+
+    async def create(self, query: str, headers: Dict[str, str],
+                     body: bytes) -> Response:
+        options = _parse_query(query, create_parameters)
+        fields = _parse_form(headers.get("content-type", ""), body)
+        if "payload" not in fields or "carrier" not in fields:
+            raise HttpError(HTTPStatus.BAD_REQUEST,
+                            "Expected payload and carrier fields")
+        steganograph = await async_write_steg(
+            fields["payload"], fields["carrier"], executor=self.executor,
+            semaphore=self.semaphore, **options)
+        return Response(HTTPStatus.OK, "image/png", steganograph)
+
+    async def extract(self, query: str, headers: Dict[str, str],
+                      body: bytes) -> Response:
+        options = _parse_query(query, extract_parameters)
+        data = await async_extract_steg(
+            body, executor=self.executor, semaphore=self.semaphore,
+            **options)
+        return Response(HTTPStatus.OK, "application/octet-stream", data)
+
+    async def inspect(self, query: str, headers: Dict[str, str],
+                      body: bytes) -> Response:
+        _parse_query(query, {})
+        # Opening the image decodes all of it, so it is done on a worker
+        header = await offload(self.executor, self.semaphore, _inspect, body)
+        if header is None:
+            raise UnrecognisedHeaderError("Not a steganograph!")
+        return _json(HTTPStatus.OK, {
+            "version": header.version,
+            "data_length": header.data_length,
+            "density": header.density,
+            "channels": header.channels,
+            "compression": header.compression,
+            "codec": codecs[header.codec].name if header.codec else None,
+            "stream": header.stream,
+            "kdf": cfg.available_kdf[header.kdf],
+        })
+
+    async def capacity(self, query: str, headers: Dict[str, str],
+                       body: bytes) -> Response:
+        options = _parse_query(query, capacity_parameters)
+        options.setdefault("payload_size", 0)
+        plans = await offload(self.executor, self.semaphore, _plan, body,
+                              options)
+        return _json(HTTPStatus.OK, plans)
+
+    async def health(self, query: str, headers: Dict[str, str],
+                     body: bytes) -> Response:
+        return _json(HTTPStatus.OK, {
+            "status": "ok" if self.executor is not None else "stopped",
+            "workers": self.workers,
+            "max_body_size": self.max_body_size,
+            "uptime_seconds": round(monotonic() - self.started, 3),
+        })
+
+    async def metrics(self, query: str, headers: Dict[str, str],
+                      body: bytes) -> Response:
+        return _json(HTTPStatus.OK, {
+            "uptime_seconds": round(monotonic() - self.started, 3),
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            # The request for the metrics is in flight itself
+            "in_flight": self.in_flight,
+            "busy_seconds": round(self.busy_seconds, 6),
+            "responses": [
+                {"endpoint": endpoint, "status": status, "count": count}
+                for (endpoint, status), count in sorted(
+                    self.responses.items())
+            ],
+        })
+
+
+def serve(host: str = cfg.default_host, port: int = cfg.default_port,
+          unix_path: Optional[str] = None, *,
+          workers: int = cfg.default_concurrency,
+          max_body_size: int = cfg.default_max_body_size,
+          concurrency: Optional[int] = None,
+          on_start: Optional[Callable[[asyncio.AbstractServer], None]] = None
+          ) -> None:
+    """Runs the service until interrupted (see StegServer).
+
+    ### Positional arguments
+
+    - host (str) (default = cfg.default_host)
+        - The address to listen on
+
+    - port (int) (default = cfg.default_port)
+        - The TCP port to listen on
+
+    - unix_path (str) (default = None)
+        - Path of a Unix socket to listen on instead of TCP
+
+    ### Keyword arguments
+
+    - workers, max_body_size, concurrency
+        - See StegServer
+
+    - on_start (Callable) (default = None)
+        - Called with the listening server, once it is ready
+    """
+    async def run() -> None:
+        server = StegServer(workers=workers, max_body_size=max_body_size,
+                            concurrency=concurrency)
+        listener = await server.start(host, port, unix_path)
+        # Stop cleanly when terminated, as by a service manager
+        stop = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(SIGTERM, stop.set)
+        except NotImplementedError:
+            # Not supported on Windows
+            pass
+        try:
+            if on_start is not None:
+                on_start(listener)
+            async with listener:
+                await stop.wait()
+        finally:
+            server.close()
+            if unix_path is not None and path.exists(unix_path):
+                remove(unix_path)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
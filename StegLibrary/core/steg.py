@@ -3,9 +3,9 @@
 # bits) and an option to enable password verification.
 
 # Builtin modules
-from io import TextIOBase, RawIOBase, BufferedIOBase
-from bz2 import compress, decompress
-from typing import List, Union
+from io import SEEK_END, TextIOBase, RawIOBase, BufferedIOBase
+from contextlib import nullcontext
+from typing import Callable, Iterable, Iterator, List, Optional, Union
 
 # Internal modules
 from StegLibrary.core import SteganographyConfig as cfg
@@ -21,20 +21,45 @@
     build_header,
     parse_header
 )
+from StegLibrary.core.engine import (
+    extract_flat,
+    extractors,
+    mode_channels,
+    read_array_channels,
+    read_channels,
+)
+from StegLibrary.core.capacity import (
+    carrier_channels,
+    storable_bits,
+    token_length,
+)
+from StegLibrary.core.codec import choose_compression, codecs, find_codec
+from StegLibrary.core.mapped import (
+    MappedCarrier,
+    embed_mapped,
+    extract_mapped,
+)
+from StegLibrary.core.parallel import open_embedder, open_extractor
+from StegLibrary.core.png import find_png_options, save_png
+from StegLibrary.core.timing import TimedWriter, Timings, measure
 from StegLibrary.helper import (
+    check_output_files,
     err_imp,
-    is_bit_set,
-    set_bit,
     show_image,
-    unset_bit
+    write_chunks,
 )
 from StegLibrary.crypto import (
     make_salt,
     extract_raw_salt,
     create_kdf,
+    find_kdf,
     build_fernet,
-    InvalidToken
+    InvalidToken,
+    StreamEncryptor,
+    StreamDecryptor,
+    KeyCache,
 )
+from StegLibrary.crypto.stream import frame_header_length, nonce_prefix_length
 
 
 # Non-builtin modules
@@ -44,30 +69,322 @@
     err_imp("Pillow")
     exit(1)
 
+try:
+    import numpy as np
+except ImportError:
+    err_imp("numpy")
+    exit(1)
+
 
-def write_steg(
-    input_file: Union[RawIOBase, BufferedIOBase],
+def _read_input(input_file: Union[RawIOBase, BufferedIOBase, memoryview]
+                ) -> Union[bytes, memoryview]:
+    """Reads the whole input, from a file-like object or a buffer."""
+    if isinstance(input_file, memoryview):
+        # Buffers are used as they are, without copying
+        data = input_file
+    else:
+        # 1. Return to the starting index first, to avoid exhaustion.
+        input_file.seek(0)
+        # 2. Read data to memory
+        # This can return a bytes object or a NoneType.
+        data = input_file.read()
+        # 3. Check that the data is not None
+        if data is None:
+            raise InputFileError("Input file is not readable!")
+    # 4. Check that the data is non-empty
+    if len(data) == 0:
+        raise InputFileError("Input file is empty or exhausted!")
+    return data
+
+
+def _iter_input(input_file: Union[RawIOBase, BufferedIOBase, memoryview],
+                buffer_size: int, timings: Optional[Timings] = None
+                ) -> Iterator[Union[bytes, memoryview]]:
+    """Reads the input chunk by chunk, from a file-like object or a
+    buffer (whose chunks are views of it)."""
+    if isinstance(input_file, memoryview):
+        for start in range(0, len(input_file), buffer_size):
+            yield input_file[start:start + buffer_size]
+        return
+
+    # Return to the starting index first, to avoid exhaustion.
+    input_file.seek(0)
+    while True:
+        # This can return a bytes object or a NoneType.
+        with measure(timings, "read") as measurement:
+            chunk = input_file.read(buffer_size)
+            measurement.bytes_out = len(chunk or b"")
+        if chunk is None:
+            raise InputFileError("Input file is not readable!")
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def _write_buffered(
+    input_file: Union[RawIOBase, BufferedIOBase, memoryview],
     image_file: Image.Image,
-    output_file: Union[RawIOBase, BufferedIOBase],
+    no_of_storable_bit: int,
+    *,
+    auth_key: str,
+    compression: int,
+    codec: int,
+    density: int,
+    kdf: int,
+    header_version: int,
+    channels: int,
+    embed: Callable[[Image.Image, bytes, int, int, int], None],
+    timings: Optional[Timings],
+) -> None:
+    """Writes the whole input file to the image in a single Fernet token."""
+    # Read data from input file
+    with measure(timings, "read") as measurement:
+        data = _read_input(input_file)
+        measurement.bytes_out = len(data)
+
+    # Compress data, unless disabled by the caller
+    if compression > 0:
+        # Compress using the codec requested
+        with measure(timings, "compress", len(data)) as measurement:
+            data = codecs[codec].compress(data, compression)
+            measurement.bytes_out = len(data)
+
+    # Fail early if the token alone cannot be stored, before paying for
+    # the KDF and the encryption
+    if no_of_storable_bit < token_length(len(data)) * 8:
+        raise InsufficientStorageError("Data is too big to be stored!")
+
+    # Encrypt data
+    with measure(timings, "kdf"):
+        # 1. Make salt
+        salt, salt_str = make_salt()
+        # 2. Make KDF, with the profile requested
+        fn_kdf = create_kdf(salt, kdf)
+        # 3. Derive key from auth_key
+        # Authentication key will be encoded first to pass to KDF.
+        key = fn_kdf.derive(auth_key.encode())
+    with measure(timings, "encrypt", len(data)) as measurement:
+        # 4. Build Fernet
+        # Fernet is a simple, symmetric (secret key) authenticated
+        # cryptography. a.k.a, it is secure and easy to implement.
+        fn = build_fernet(key)
+        # 5. Start encryption
+        # Data will be passed through Fernet, which only takes bytes
+        data = fn.encrypt(bytes(data))
+        measurement.bytes_out = len(data)
+
+    # Craft the finished data
+    # 1. Build a header for the steganograph
+    with measure(timings, "header") as measurement:
+        header = build_header(
+            data_length=len(data),
+            compression=compression,
+            density=density,
+            salt=salt_str,
+            kdf=kdf,
+            version=header_version,
+            codec=codec,
+            channels=channels,
+        )
+        measurement.bytes_out = len(header)
+    # 2. Prepend data with the serialised header
+    data = header + data
+
+    # Find the number of bits to be stored by
+    # multiplying by 8 (1 byte contains 8 bit)
+    no_of_stored_bit = len(data) * 8
+
+    # Make sure there are enough space to store all bits
+    if no_of_storable_bit < no_of_stored_bit:
+        # If there are not enough, raise error
+        raise InsufficientStorageError("Data is too big to be stored!")
+
+    # Embed with the selected engine
+    with measure(timings, "embed", len(data)):
+        embed(image_file, data, density, 0, channels)
+
+
+def _write_stream(
+    input_file: Union[RawIOBase, BufferedIOBase, memoryview],
+    image_file: Image.Image,
+    no_of_storable_bit: int,
+    *,
+    auth_key: str,
+    compression: int,
+    codec: int,
+    density: int,
+    kdf: int,
+    header_version: int,
+    channels: int,
+    buffer_size: int,
+    embed: Callable[[Image.Image, bytes, int, int, int], None],
+    timings: Optional[Timings],
+) -> None:
+    """Writes the input file to the image chunk by chunk.
+
+    The input is read, compressed, encrypted and embedded buffer_size
+    bytes at a time, so that memory use does not grow with the input.
+    The header is padded to a fixed length and written last, once the
+    length of the data is known.
+    """
+    # Derive the key, as for the buffered format
+    with measure(timings, "kdf"):
+        salt, salt_str = make_salt()
+        key = create_kdf(salt, kdf).derive(auth_key.encode())
+    encryptor = StreamEncryptor(key)
+
+    # Compress incrementally, unless disabled by the caller
+    compressor = codecs[codec].compressor(compression) \
+        if compression > 0 else None
+
+    # Data starts right after the (fixed length) header
+    if header_version == 1:
+        no_of_stored_bit = Header.header_length * 8
+    else:
+        no_of_stored_bit = Header.binary_header_length * 8
+    data_length = 0
+
+    def emit(data: bytes) -> None:
+        nonlocal no_of_stored_bit, data_length
+        # Make sure there are enough space to store all bits
+        if no_of_storable_bit < no_of_stored_bit + len(data) * 8:
+            raise InsufficientStorageError("Data is too big to be stored!")
+        with measure(timings, "embed", len(data)):
+            embed(image_file, data, density, no_of_stored_bit, channels)
+        no_of_stored_bit += len(data) * 8
+        data_length += len(data)
+
+    # The nonce prefix of the stream comes first
+    emit(encryptor.nonce_prefix)
+
+    def compress(data: bytes, flush: bool = False) -> bytes:
+        with measure(timings, "compress", len(data)) as measurement:
+            data = compressor.compress(data)
+            if flush:
+                data += compressor.flush()
+            measurement.bytes_out = len(data)
+        return data
+
+    def encrypt(data: bytes, last: bool = False) -> bytes:
+        with measure(timings, "encrypt", len(data)) as measurement:
+            data = encryptor.encrypt(data, last=last)
+            measurement.bytes_out = len(data)
+        return data
+
+    pending = bytearray()
+    is_empty = True
+    for chunk in _iter_input(input_file, buffer_size, timings):
+        is_empty = False
+
+        pending += compress(chunk) if compressor else chunk
+        # Seal every full buffer as soon as it is available
+        while len(pending) >= buffer_size:
+            emit(encrypt(bytes(pending[:buffer_size])))
+            del pending[:buffer_size]
+
+    # Check that the data is non-empty
+    if is_empty:
+        raise InputFileError("Input file is empty or exhausted!")
+
+    # Seal whatever is left as the last frame
+    if compressor:
+        pending += compress(b"", flush=True)
+    emit(encrypt(bytes(pending), last=True))
+
+    # The v1 header cannot record longer data
+    if header_version == 1 and \
+            data_length >= 10 ** Header.maximum_data_length:
+        raise InsufficientStorageError("Data is too big to be stored!")
+
+    # Finally, write the header in the space reserved for it
+    with measure(timings, "header") as measurement:
+        header = build_header(
+            data_length=data_length,
+            compression=compression,
+            density=density,
+            salt=salt_str,
+            stream=True,
+            kdf=kdf,
+            version=header_version,
+            codec=codec,
+            channels=channels,
+        )
+        measurement.bytes_out = len(header)
+    with measure(timings, "embed", len(header)):
+        embed(image_file, header, density, 0, channels)
+
+
+def _sample_input(input_file: Union[RawIOBase, BufferedIOBase, memoryview],
+                  sample_size: int) -> bytes:
+    """Reads a sample of the input file, from its start, middle and end."""
+    if isinstance(input_file, memoryview):
+        length = len(input_file)
+
+        def read(start: int, size: int) -> bytes:
+            return bytes(input_file[start:start + size])
+    else:
+        input_file.seek(0, SEEK_END)
+        length = input_file.tell()
+
+        def read(start: int, size: int) -> bytes:
+            input_file.seek(start)
+            return input_file.read(size) or b""
+
+    if length <= sample_size:
+        sample = read(0, sample_size)
+    else:
+        part = sample_size // 3
+        sample = b""
+        for start in (0, (length - part) // 2, length - part):
+            sample += read(start, part)
+
+    # Return to the starting index, for the actual read
+    if not isinstance(input_file, memoryview):
+        input_file.seek(0)
+    return sample
+
+
+def write_steg(
+    input_file: Union[RawIOBase, BufferedIOBase, memoryview],
+    image_file: Union[Image.Image, MappedCarrier],
+    output_file: Optional[Union[RawIOBase, BufferedIOBase]],
     *,
     auth_key: str = cfg.default_auth_key,
     compression: int = cfg.default_compression,
+    codec: str = cfg.default_codec,
+    auto_compress: bool = cfg.flag_auto_compress,
     density: int = cfg.default_density,
     close_on_exit: bool = cfg.flag_close_on_exit,
     show_image_on_completion: bool = cfg.flag_show_image_on_completion,
+    engine: str = cfg.default_engine,
+    stream: bool = cfg.flag_stream,
+    buffer_size: int = cfg.default_buffer_size,
+    workers: int = cfg.default_workers,
+    kdf: str = cfg.default_kdf,
+    header_version: int = cfg.default_header_version,
+    png_preset: str = cfg.default_png_preset,
+    png_compress_level: Optional[int] = None,
+    png_strategy: Optional[str] = None,
+    png_optimize: Optional[bool] = None,
+    timings: Optional[Timings] = None,
 ) -> bool:
     """Performs steaganography on input file and write data to image file.
 
     ### Positional arguments
 
-    - input_file (RawIOBase | BufferedIOBase)
-        - A readable file-like object of the input file
+    - input_file (RawIOBase | BufferedIOBase | memoryview)
+        - A readable file-like object of the input file, or a memoryview
+        of the data (read without copying)
 
-    - image_file (PIL.Image.Image)
-        - An opened image object
+    - image_file (PIL.Image.Image | MappedCarrier)
+        - An opened image object, in L, LA, RGB, RGBA, I;16 or I mode (only
+        RGB and RGBA can carry a version 1 header), or a carrier mapped
+        by open_carrier, which is written in place
 
-    - output_file (RawIOBase | BufferedIOBase)
-        - A writable file-like object of the output file
+    - output_file (RawIOBase | BufferedIOBase | None)
+        - A writable file-like object of the output file, or None to
+        leave the image modified in place without saving it (always None
+        if image_file is a MappedCarrier)
 
     ### Keyword arguments
 
@@ -77,6 +394,15 @@ def write_steg(
     - compression (int) (default = cfg.default_compression)
         - The compression level
 
+    - codec (str) (default = cfg.default_codec)
+        - The compression codec, one of cfg.available_codec. Only bz2
+        can be recorded in a version 1 header.
+
+    - auto_compress (bool) (default = cfg.flag_auto_compress)
+        - Whether to sample the input file first, and skip compression
+        (or use level 1) when it would not pay off. The level used is
+        recorded in the header.
+
     - density (int) (default = cfg.default_density)
         - The data density
 
@@ -87,6 +413,47 @@ def write_steg(
     (default = cfg.flag_show_image_on_completion)
         - Whether to show image on completion
 
+    - engine (str) (default = cfg.default_engine)
+        - The embedding engine, "loop" or "numpy"
+
+    - stream (bool) (default = cfg.flag_stream)
+        - Whether to read, compress, encrypt and embed the input file
+        in chunks, keeping memory use bounded
+
+    - buffer_size (int) (default = cfg.default_buffer_size)
+        - Size of each chunk, in bytes, when stream is enabled
+
+    - workers (int) (default = cfg.default_workers)
+        - Number of worker processes embedding in parallel (the numpy
+        engine is required for more than one, and mapped carriers are
+        always written by a single process)
+
+    - kdf (str) (default = cfg.default_kdf)
+        - The key derive function and its cost, one of cfg.available_kdf.
+        It is recorded in the header, so extraction needs no setting.
+
+    - header_version (int) (default = cfg.default_header_version)
+        - The header format: 1 (text, readable by older versions of this
+        library, data up to 99,999,999 bytes) or 2 (binary, checksummed)
+
+    - png_preset (str) (default = cfg.default_png_preset)
+        - Settings of the PNG encoder, one of cfg.available_png_preset
+        ("fast" favours encoding speed over file size)
+
+    - png_compress_level (int) (default = None)
+        - The zlib compression level of the PNG, overriding the preset
+
+    - png_strategy (str) (default = None)
+        - The zlib strategy of the PNG, one of cfg.available_png_strategy,
+        overriding the preset
+
+    - png_optimize (bool) (default = None)
+        - Whether to search for the smallest PNG encoding, overriding
+        the preset
+
+    - timings (Timings) (default = None)
+        - Records the time spent in each stage, if given
+
     ### Return values
 
     True if the operation is successful, otherwise False
@@ -96,6 +463,10 @@ def write_steg(
     - TypeError
         - Raised when the parametres given are in incorrect types
 
+    - ValueError
+        - Raised when the engine, codec, buffer size, number of workers,
+        KDF, header version, image mode or PNG setting is not valid
+
     - InputFileError
         - Raised when there is an I/O error when trying to read
         the input file
@@ -109,29 +480,34 @@ def write_steg(
         the maximum storage
     """
 
-    # Validate input file
+    # Check if engine is valid by compare with configuration
+    if engine not in cfg.available_engine:
+        raise ValueError("Engine not defined!")
+
+    # Check if KDF is valid, and find its identifier for the header
+    if kdf not in cfg.available_kdf:
+        raise ValueError("KDF not defined!")
+    kdf_id = find_kdf(kdf)
+
+    # Check if header version is valid by compare with configuration
+    if header_version not in cfg.available_header_version:
+        raise ValueError("Header version not defined!")
+
+    # Find the settings of the PNG encoder, before doing any work
+    png_options = find_png_options(png_preset, png_compress_level,
+                                   png_strategy, png_optimize)
+
+    # Validate input file, unless it is a buffer
     # 1. Type guard
     try:
         # 2. Check that the file can be read.
-        if not input_file.readable():
+        if not isinstance(input_file, memoryview) and \
+                not input_file.readable():
             raise InputFileError("Input file is not readable!")
     except AttributeError:
         raise InputFileError("Input file must be a readable file-like object!")
 
-    # Read data from input file
-    # 1. Return to the starting index first, to avoid exhaustion.
-    input_file.seek(0)
-    # 2. Read data to memory
-    # This can return a bytes object or a NoneType.
-    data = input_file.read()
-    # 3. Check that the data is not None
-    if data is None:
-        raise InputFileError("Input file is not readable!")
-    # 4. Check that the data is non-empty
-    if len(data) == 0:
-        raise InputFileError("Input file is empty or exhausted!")
-
-    # Compress data
+    # Validate compression level
     # 1. Type checking
     if not isinstance(compression, int):
         raise TypeError(
@@ -141,157 +517,232 @@ def write_steg(
     # 2. Check if compression level is valid by compare with configuration
     if compression not in cfg.available_compression:
         raise ValueError("Compression level not defined!")
-    # 3. Start compression, unless disabled by the caller
-    if compression > 0:
-        # Compress using the builtin bzip2 library
-        data = compress(data, compresslevel=compression)
 
-    # Encrypt data
-    # 1. Type checking
+    # Check if codec is valid, and find its identifier for the header
+    if codec not in cfg.available_codec:
+        raise ValueError("Codec not defined!")
+    codec_id = find_codec(codec)
+    if header_version == 1 and codec != "bz2":
+        raise ValueError("Only bz2 can be recorded in a version 1 header!")
+
+    # Validate authentication key
     if not isinstance(auth_key, str):
         raise TypeError(
             "Authentication key must be a string" +
             f"(given {type(auth_key)} instead)"
         )
-    # 2. Make salt
-    salt, salt_str = make_salt()
-    # 3. Make KDF
-    kdf = create_kdf(salt)
-    # 4. Derive key from auth_key
-    # Authentication key will be encoded first to pass to KDF.
-    key = kdf.derive(auth_key.encode())
-    # 5. Build Fernet
-    # Fernet is a simple, symmetric (secret key) authenticated cryptography.
-    # a.k.a, it is secure and easy to implement.
-    fn = build_fernet(key)
-    # 6. Start encryption
-    # Data will be passed through Fernet
-    data = fn.encrypt(data)
-
-    # Craft the finished data
-    # 1. Build a header for the steganograph
-    header = build_header(
-        data_length=len(data),
-        compression=compression,
-        density=density,
-        salt=salt_str,
-    )
-    # 2. Serialise header and prepend data with header
-    data = bytes(header, "utf-8") + data
-
-    # Retrieve access to pixel data
-    # 1. Type guarding
-    try:
-        # 2. Load PixelAccess
-        pix = image_file.load()
-    except AttributeError:
-        raise TypeError(
-            f"Image file must be a PIL.Image.Image (given {type(image_file)})")
-
-    # Retrieve metadata of image file
-    x_dim, y_dim = image_file.size
-
-    # Check if the image has enough room to store data
-    # 1. Find the number of writable pixels
-    no_of_pixel = x_dim * y_dim
-    # 2. Find the number of colour codes by multyplying by 3
-    # since each pixel contains 3 integers
-    no_of_rgb = no_of_pixel * 3
-    # 3. Depending on the density, find the maximum number
-    # of bits can be stored
-    no_of_storable_bit = no_of_rgb * density
-    # 4. Find the number of bits to be stored by
-    # multiplying by 8 (1 byte contains 8 bit)
-    no_of_stored_bit = len(data) * 8
-
-    # Make sure there are enough space to store all bits
-    if no_of_storable_bit < no_of_stored_bit:
-        # If there are not enough, raise error
-        raise InsufficientStorageError("Data is too big to be stored!")
 
-    # Start writing steganograph
-    # Declare usable variables as pointer to bit being written
-    x, y, count, bit_loc = 0, 0, 0, density
-    # Declare a local variable for pixel to reduce look-up time
-    current_pix = list(pix[0, 0])
-
-    # Firstly, iterate through all the bytes to be written
-    for byte in data:
-        # Secondly, iterate through all the bits of the given byte
-        for i in range(8):
-            # Thirdly, check if the bit is set
-            # If bit is set
-            if is_bit_set(byte, i):
-                # Check if the bit at the current location in the image is set
-                # If unset then set it, otherwise unchange
-                current_pix[count] = set_bit(current_pix[count], bit_loc)
-            # If bit is unset
-            else:
-                # Check if the bit at the current location in the image is set
-                # If set then unset it, otherwise unchange
-                current_pix[count] = unset_bit(current_pix[count], bit_loc)
-
-            # Move to the next bit
-            # by decrementing index
-            bit_loc -= 1
-            # If reached the final bit
-            if bit_loc == -1:
-                # Move to the next integer
-                # by incrementing the count
-                count += 1
-                # Reset density
-                bit_loc = density
-                # If reached the last RGB
-                if count == 3:
-                    # Save pixel
-                    pix[x, y] = tuple(current_pix)
-                    # Reset count
-                    count = 0
-                    y += 1
-                    # If the entire row of pixel is written
-                    if y == y_dim:
-                        # Move on to the next row and reset
-                        y = 0
-                        x += 1
-                    # Request new pixel to be written
-                    current_pix = list(pix[x, y])
-
-    # Validate output file
-    # 1. Type guard
-    try:
-        # 2. Check that the file can be written.
-        if not input_file.readable():
-            raise InputFileError("Output file is not writable!")
-    except AttributeError:
-        raise InputFileError(
-            "Output file must be a writable file-like object!")
+    # Load pixel data, unless they are mapped already
+    mapped = isinstance(image_file, MappedCarrier)
+    if mapped:
+        if workers != 1:
+            raise ValueError("Mapped carriers do not support parallel mode!")
+        if output_file is not None:
+            raise ValueError("Mapped carriers are written in place!")
+    else:
+        # 1. Type guarding
+        try:
+            # 2. Decode the image, so that engines work on loaded pixels
+            with measure(timings, "load"):
+                image_file.load()
+        except AttributeError:
+            raise TypeError(
+                "Image file must be a PIL.Image.Image " +
+                f"(given {type(image_file)})")
+
+    # Find which colour integers store data, from the image mode, then
+    # how many bits the image has room for, from its dimensions
+    channels = carrier_channels(image_file.mode, header_version)
+    no_of_storable_bit = storable_bits(image_file.size, density, channels)
+
+    # Skip compression, or use a fast level, if it would not pay off
+    if auto_compress:
+        compression = choose_compression(
+            _sample_input(input_file, cfg.default_sample_size), compression)
+
+    # Start writing steganograph, in the format requested
+    if stream and (not isinstance(buffer_size, int) or buffer_size < 1):
+        raise ValueError("Buffer size must be a positive integer!")
+    # Mapped carriers are written through the map, with array operations
+    embedder = nullcontext(embed_mapped) if mapped else \
+        open_embedder(engine, workers)
+    with embedder as embed:
+        if stream:
+            _write_stream(input_file, image_file, no_of_storable_bit,
+                          auth_key=auth_key, compression=compression,
+                          codec=codec_id,
+                          density=density, kdf=kdf_id,
+                          header_version=header_version,
+                          channels=channels,
+                          buffer_size=buffer_size, embed=embed,
+                          timings=timings)
+        else:
+            _write_buffered(input_file, image_file, no_of_storable_bit,
+                            auth_key=auth_key, compression=compression,
+                            codec=codec_id,
+                            density=density, kdf=kdf_id,
+                            header_version=header_version,
+                            channels=channels, embed=embed,
+                            timings=timings)
+
+    if mapped:
+        # Only the pixels modified are written back to the file
+        with measure(timings, "write"):
+            image_file.flush()
+    elif output_file is not None:
+        # Validate output file
+        # 1. Type guard
+        try:
+            # 2. Check that the file can be written.
+            if not output_file.writable():
+                raise OutputFileError("Output file is not writable!")
+        except AttributeError:
+            raise OutputFileError(
+                "Output file must be a writable file-like object!")
 
-    # Save as PNG
-    image_file.save(output_file, "png")
+        # Save as PNG, with the encoder settings requested. Writing to
+        # the output file is measured apart from encoding.
+        with measure(timings, "encode"):
+            save_png(image_file, output_file if timings is None else
+                     TimedWriter(output_file, timings), png_options)
 
-    # Check if image should be shown on completion
-    if show_image_on_completion:
-        show_image(image_file)
+        # Check if image should be shown on completion
+        if show_image_on_completion:
+            show_image(image_file)
 
     # Check if close on exit flag is enabled
     if close_on_exit:
-        # If enabled, close all file objects
-        input_file.close()
+        # If enabled, close all file objects. A memoryview belongs to
+        # the caller, so it is left as is.
+        if not isinstance(input_file, memoryview):
+            input_file.close()
         image_file.close()
-        output_file.close()
+        if output_file is not None:
+            output_file.close()
 
     # At this step, operation is successful, so return True
     return True
 
 
-def extract_header(image: Image.Image) -> Header:
+def peek_header(
+    image: Union[Image.Image, MappedCarrier, RawIOBase, BufferedIOBase]
+) -> Optional[Header]:
+    """Sniffs the header of a steganograph, without raising on failure.
+
+    The pixels able to hold a header are read once for each number of
+    channels the image mode allows, and every density is decoded from
+    that single buffer. Candidates whose first bytes
+    cannot start a header are rejected before decoding the rest: a
+    binary header is recognised by its magic, a text header by its
+    leading data length.
+
+    ### Positional arguments
+
+    - image (PIL.Image.Image | MappedCarrier | RawIOBase | BufferedIOBase)
+        - An opened image object, a mapped carrier, or a readable
+        file-like object of an image
+
+    ### Returns
+
+    A Header object if a header is found, otherwise None
+    """
+    # Open the image if a file-like object is given
+    if not isinstance(image, (Image.Image, MappedCarrier)):
+        try:
+            image = Image.open(image)
+        except (UnidentifiedImageError, AttributeError, OSError):
+            return None
+
+    for channels in _candidate_channels(image):
+        # Read the colour integers needed by the sparsest density, once
+        width = min(cfg.available_density) + 1
+        count = -(-Header.maximum_header_length * 8 // width)
+        if isinstance(image, MappedCarrier):
+            prefix = read_array_channels(image.pixels, count, channels)
+        else:
+            prefix = read_channels(image, count, channels)
+
+        header = _sniff_header(prefix, channels)
+        if header is not None:
+            return header
+
+    return None
+
+
+def _candidate_channels(image: Union[Image.Image, MappedCarrier]
+                        ) -> List[int]:
+    """Lists the numbers of colour integers per pixel a steganograph of
+    the image mode may have been written with."""
+    if image.mode not in mode_channels:
+        return []
+    candidates = [mode_channels[image.mode]]
+    # Text headers leave the alpha channel alone
+    if candidates[0] > Header.legacy_channels:
+        candidates.append(Header.legacy_channels)
+    return candidates
+
+
+def _sniff_header(prefix: np.ndarray, channels: int) -> Optional[Header]:
+    """Finds a header in the first colour integers of an image, read with
+    the given number of channels, trying every density."""
+    for density in cfg.available_density:
+        # 1. Cheap check: either the magic of a binary header, or a data
+        # length followed by a separator within the first few bytes
+        start = extract_flat(prefix, density, Header.maximum_data_length + 1)
+        if start[:len(Header.magic)] == Header.magic:
+            length = Header.binary_header_length
+        else:
+            end = start.find(bytes(Header.separator, "utf-8"))
+            if end < 1 or not start[:end].isdigit():
+                continue
+            length = Header.header_length
+
+        # 2. Full check: the header must parse, and agree with the
+        # density and channels used to read it
+        try:
+            header = parse_header(extract_flat(prefix, density, length))
+        except UnrecognisedHeaderError:
+            continue
+        if header.density == density and header.channels == channels:
+            return header
+
+    return None
+
+
+def is_steganograph(
+    image: Union[Image.Image, RawIOBase, BufferedIOBase]
+) -> bool:
+    """Checks if the image is a steganograph.
+
+    ### Positional arguments
+
+    - image (PIL.Image.Image | RawIOBase | BufferedIOBase)
+        - An opened image object, or a readable file-like object of it
+
+    ### Returns
+
+    True if a header is found, otherwise False
+    """
+    return peek_header(image) is not None
+
+
+def extract_header(
+    image: Union[Image.Image, MappedCarrier],
+    *,
+    engine: str = cfg.default_engine,
+) -> Header:
     """Extracts header from valid steganography file.
 
     ### Positional arguements
 
-    - image (PIL.Image.Image)
+    - image (PIL.Image.Image | MappedCarrier)
         - The image to extract header
 
+    ### Keyword arguments
+
+    - engine (str) (default = cfg.default_engine)
+        - The extraction engine, "loop" or "numpy"
+
     ### Returns
 
     A Header object of the extracted header
@@ -304,77 +755,292 @@ def extract_header(image: Image.Image) -> Header:
     - TypeError
         - Raised when the parametres given are in incorrect types
     """
-    # Retrieve access to pixel data
-    pix = image.load()
-
-    # Retrieve metadata of image file
-    y_dim = image.size[1]
-
-    # Declare some local variables as the extraction starts
-    x, y, count = 0, 0, 0
-    result_data = b""
-    density = 1
-    bit_loc = density
-
-    # Firstly, the header is retrieved by reading for its known length.
-    # Since the density is unknown, check all density one by one.
-    while density in Header.available_density:
-        bit_loc = density
-        while len(result_data) < Header.header_length:
-            byte = 0
-            # Read every single bit
-            # Iterate through every single bit of the byte
-            for i in range(8):
-                # If bit is set, set the corressponding bit of 'byte'
-                if pix[x, y][count] & (1 << bit_loc):
-                    byte += (1 << (7 - i))
-                # Move to the next bit by decrement bit index
-                bit_loc -= 1
-                # If all readable bits of the colour integer are consumed
-                if bit_loc == -1:
-                    # Move to the next RGB and reset the bit index
-                    count += 1
-                    bit_loc = density
-                    # If the entire pixel is read
-                    if count == 3:
-                        # Move to the next pixel in the row and reset the count
-                        count = 0
-                        y += 1
-                        # If the entire row of pixels is read
-                        if y == y_dim:
-                            # Move to the next row and reset row index
-                            y = 0
-                            x += 1
-            # Convert the single byte (integer) to bytes
-            # By design, the resulting data is strictly stored in 1 byte
-            # and endianness does not matter since it is only 1 byte
-            result_data += byte.to_bytes(1, "big")
-        # If header is invalid
-        # e.g wrong density
+    # The numpy engine sniffs all densities in a single pass, and so are
+    # mapped carriers
+    if engine == "numpy" or isinstance(image, MappedCarrier):
+        header = peek_header(image)
+        if header is None:
+            raise UnrecognisedHeaderError("Invalid header!")
+        return header
+
+    # Retrieve the extraction function of the engine
+    extract = extractors[engine]
+
+    # Firstly, the header is retrieved by reading for its maximum length.
+    # Since the density and channels are unknown, check them one by one.
+    x_dim, y_dim = image.size
+    for channels in _candidate_channels(image):
+        for density in cfg.available_density:
+            # Skip images too small to hold a header
+            if x_dim * y_dim * channels * (density + 1) < \
+                    Header.maximum_header_length * 8:
+                continue
+            result_data = extract(image, density,
+                                  Header.maximum_header_length, 0, channels)
+            # If header is invalid
+            # e.g wrong density
+            try:
+                # Invalid header has undecodable byte
+                header = parse_header(result_data)
+            except UnrecognisedHeaderError:
+                # Hence, switch to the next possible density
+                continue
+            # The header must agree with the density and channels used to
+            # read it
+            if header.density == density and header.channels == channels:
+                return header
+
+    raise UnrecognisedHeaderError("Invalid header!")
+
+
+def _read_frames(
+    image: Union[Image.Image, MappedCarrier],
+    header: Header,
+    key: bytes,
+    extract: Callable[[Union[Image.Image, MappedCarrier], int, int, int, int],
+                      bytes],
+    timings: Optional[Timings] = None,
+) -> Iterator[bytes]:
+    """Reads and decrypts the frames of data in stream format, one by one.
+
+    ### Raises
+
+    - InvalidToken
+        - Raised when a frame fails authentication, or the stream is
+        truncated
+    """
+    # Data starts right after the header, and must not overrun its length
+    offset = header.length * 8
+    end = offset + header.data_length * 8
+
+    def read(length: int) -> bytes:
+        nonlocal offset
+        if offset + length * 8 > end:
+            raise InvalidToken
+        with measure(timings, "extract") as measurement:
+            data = extract(image, header.density, length, offset,
+                           header.channels)
+            measurement.bytes_out = len(data)
+        offset += length * 8
+        return data
+
+    # The nonce prefix of the stream comes first, then the frames
+    decryptor = StreamDecryptor(key, read(nonce_prefix_length))
+    while not decryptor.finalised:
+        length, last = StreamDecryptor.parse_frame_header(
+            read(frame_header_length))
+        frame = read(length)
+        with measure(timings, "decrypt", len(frame)) as measurement:
+            data = decryptor.decrypt(frame, last)
+            measurement.bytes_out = len(data)
+        yield data
+
+
+def _decompress(chunks: Iterable[bytes], buffer_size: int, codec: int,
+                timings: Optional[Timings] = None) -> Iterator[bytes]:
+    """Decompresses chunks, yielding at most buffer_size bytes at a time."""
+    decompressor = codecs[codec].decompressor()
+
+    def decompress(data: bytes) -> bytes:
+        with measure(timings, "decompress", len(data)) as measurement:
+            data = decompressor.decompress(data, buffer_size)
+            measurement.bytes_out = len(data)
+        return data
+
+    for chunk in chunks:
+        data = decompress(chunk)
+        while True:
+            if data:
+                yield data
+            # Stop once the decompressor has flushed all it can
+            if decompressor.eof or decompressor.needs_input:
+                break
+            data = decompress(b"")
+
+
+def iter_steg(
+    input_file: Union[RawIOBase, BufferedIOBase, Image.Image, MappedCarrier],
+    *,
+    auth_key: str = cfg.default_auth_key,
+    engine: str = cfg.default_engine,
+    buffer_size: int = cfg.default_buffer_size,
+    workers: int = cfg.default_workers,
+    key_cache: Optional[KeyCache] = None,
+    timings: Optional[Timings] = None,
+) -> Iterator[bytes]:
+    """Extract steaganography on input file, chunk by chunk.
+
+    Chunks are only yielded once they have been authenticated. Data in
+    stream format is read from the image one frame at a time, so memory
+    use stays bounded. Otherwise, the whole token has to be verified
+    before the first chunk is yielded.
+
+    ### Positional arguments
+
+    - input_file (RawIOBase | BufferedIOBase | PIL.Image.Image |
+    MappedCarrier)
+        - A readable file-like object of the input file, an opened image
+        object, or a carrier mapped by open_carrier, which is read through
+        the map
+
+    ### Keyword arguments
+
+    - auth_key (str) (default = cfg.default_auth_key)
+        - The authentication key
+
+    - engine (str) (default = cfg.default_engine)
+        - The extraction engine, "loop" or "numpy"
+
+    - buffer_size (int) (default = cfg.default_buffer_size)
+        - The maximum size of a decompressed chunk, in bytes
+
+    - workers (int) (default = cfg.default_workers)
+        - Number of worker processes extracting in parallel (the numpy
+        engine is required for more than one, and mapped carriers are
+        always read by a single process)
+
+    - key_cache (KeyCache) (default = None)
+        - A cache of derived keys, to skip the KDF when extracting
+        the same steganograph again with the same authentication key
+
+    - timings (Timings) (default = None)
+        - Records the time spent in each stage, if given
+
+    ### Yields
+
+    The extracted data, in chunks
+
+    ### Raises
+
+    - TypeError
+        - Raised when the parametres given are in incorrect types
+
+    - ValueError
+        - Raised when the engine, buffer size or number of workers is
+        not valid
+
+    - UnrecognisedHeaderError
+        - Raised when failing to parse a header
+
+    - AuthenticationError
+        - Raised when the provided authentication key is invalid, or
+        the data has been tampered with
+    """
+
+    # Check if engine is valid by compare with configuration
+    if engine not in cfg.available_engine:
+        raise ValueError("Engine not defined!")
+    if not isinstance(buffer_size, int) or buffer_size < 1:
+        raise ValueError("Buffer size must be a positive integer!")
+
+    # Parse input file into Image, unless its pixels are mapped already
+    mapped = isinstance(input_file, MappedCarrier)
+    if mapped:
+        if workers != 1:
+            raise ValueError("Mapped carriers do not support parallel mode!")
+        image = input_file
+    elif isinstance(input_file, Image.Image):
+        image = input_file
+    else:
         try:
-            # Invalid header has undecodable byte
-            return parse_header(result_data)
-        except UnrecognisedHeaderError:
-            # Hence, switch to the next possible density
-            # Reset all values to original
-            density += 1
-            result_data = b""
-            x, y, count = 0, 0, 0
+            with measure(timings, "open"):
+                image = Image.open(input_file)
+        except UnidentifiedImageError:
+            raise TypeError(
+                "Image file must be a PIL.Image.Image " +
+                f"(given {type(input_file)})")
+    if not mapped:
+        # Decode the image once, rather than in the engines
+        with measure(timings, "load"):
+            image.load()
+
+    # Attempt to extract and parse header
+    with measure(timings, "header"):
+        header = extract_header(image, engine=engine)
+
+    # Derive key
+    # Salt is already obtained (from the header) -> KDF -> Key
+    # 0. Extract salt from salt string
+    salt = extract_raw_salt(header.salt)
+    # 1. Type checking
+    if not isinstance(auth_key, str):
+        raise TypeError(
+            f"Authentication key must be a string (given {type(auth_key)})")
+    # 2. Derive key, from the cache if one is given
+    # Authentication key will be encoded first to pass to KDF.
+    with measure(timings, "kdf"):
+        if key_cache is None:
+            key = create_kdf(salt, header.kdf).derive(auth_key.encode())
+        else:
+            key = key_cache.derive(salt, auth_key.encode(), header.kdf)
+
+    # Mapped carriers are read through the map, with array operations
+    extractor = nullcontext(extract_mapped) if mapped else \
+        open_extractor(engine, workers)
+    with extractor as extract:
+        # Decrypt data
+        if header.stream:
+            # Frames are read and authenticated one at a time
+            chunks = _read_frames(image, header, key, extract, timings)
+        else:
+            # Read data, which starts right after the header
+            with measure(timings, "extract") as measurement:
+                token = extract(image, header.density, header.data_length,
+                                header.length * 8, header.channels)
+                measurement.bytes_out = len(token)
+
+            # The Fernet token can only be authenticated as a whole
+            def decrypt_token() -> Iterator[bytes]:
+                with measure(timings, "decrypt", len(token)) as measurement:
+                    data = build_fernet(key).decrypt(token)
+                    measurement.bytes_out = len(data)
+                yield data
+            chunks = decrypt_token()
+
+        # If compressed (as indicated by the header), decompress it
+        if header.compression > 0:
+            chunks = _decompress(chunks, buffer_size, header.codec, timings)
+
+        # Wrapped to catch invalid key
+        try:
+            for chunk in chunks:
+                yield chunk
+        except InvalidToken:
+            raise AuthenticationError("Invalid authentication key")
+
+
+def _measure_writes(chunks: Iterable[bytes],
+                    timings: Timings) -> Iterator[bytes]:
+    """Measures the time the caller takes to write each chunk, until it
+    asks for the next one, as the write stage."""
+    for chunk in chunks:
+        with timings.measure("write", len(chunk)) as measurement:
+            yield chunk
+            measurement.bytes_out = len(chunk)
 
 
 def extract_steg(
-    input_file: Union[RawIOBase, BufferedIOBase],
+    input_file: Union[RawIOBase, BufferedIOBase, MappedCarrier],
     output_file: List[Union[RawIOBase, BufferedIOBase, TextIOBase]],
     *,
     auth_key: str = cfg.default_auth_key,
     close_on_exit: bool = cfg.flag_close_on_exit,
+    engine: str = cfg.default_engine,
+    buffer_size: int = cfg.default_buffer_size,
+    workers: int = cfg.default_workers,
+    key_cache: Optional[KeyCache] = None,
+    timings: Optional[Timings] = None,
 ) -> bool:
     """Extract steaganography on input file and write data to output file.
 
+    Data is written to the output file objects chunk by chunk, as soon
+    as it has been extracted and authenticated (see iter_steg).
+
     ### Positional arguments
 
-    - input_file (RawIOBase | BufferedIOBase)
-        - A readable file-like object of the input file
+    - input_file (RawIOBase | BufferedIOBase | MappedCarrier)
+        - A readable file-like object of the input file, or a mapped
+        carrier
 
     - output_file (List[RawIOBase | BufferedIOBase | TextIOBase])
         - A list of writable file-like object(s) of the output file
@@ -389,6 +1055,23 @@ def extract_steg(
     - close_on_exit (bool) (default = Config.flag_close_on_exit)
         - Whether to close the file objects on exit
 
+    - engine (str) (default = cfg.default_engine)
+        - The extraction engine, "loop" or "numpy"
+
+    - buffer_size (int) (default = cfg.default_buffer_size)
+        - The maximum size of a chunk written at once, in bytes
+
+    - workers (int) (default = cfg.default_workers)
+        - Number of worker processes extracting in parallel (the numpy
+        engine is required for more than one)
+
+    - key_cache (KeyCache) (default = None)
+        - A cache of derived keys, to skip the KDF when extracting
+        the same steganograph again with the same authentication key
+
+    - timings (Timings) (default = None)
+        - Records the time spent in each stage, if given
+
     ### Return values
 
     True if the operation is successful, otherwise False
@@ -398,6 +1081,10 @@ def extract_steg(
     - TypeError
         - Raised when the parametres given are in incorrect types
 
+    - ValueError
+        - Raised when the engine, buffer size or number of workers is
+        not valid
+
     - InputFileError
         - Raised when there is an I/O error when trying to read
         the input file
@@ -413,135 +1100,14 @@ def extract_steg(
         - Raised when the provided authentication key is invalid
     """
 
-    # Parse input file into Image
-    try:
-        image = Image.open(input_file)
-    except UnidentifiedImageError:
-        raise TypeError(
-            f"Image file must be a PIL.Image.Image (given {type(input_file)})")
-
-    # Attempt to extract and parse header
-    header = extract_header(image)
-    # Retrieve access to pixel data
-    pix = image.load()
-
-    # Retrieve metadata of image file
-    y_dim = image.size[1]
-
-    # Calculate length of data to be extracted (including the header)
-    data_length = Header.header_length + header.data_length
-
-    # Declare some local variables as the extraction starts
-    x, y, count = 0, 0, 0
-    result_data = b""
-    bit_loc = header.density
-
-    # Attempt to read data
-    while len(result_data) < data_length:
-        byte = 0
-        # Read every single bit
-        # Iterate through every single bit of the byte
-        for i in range(8):
-            # If bit is set, set the corressponding bit of 'byte'
-            if pix[x, y][count] & (1 << bit_loc):
-                byte += (1 << (7 - i))
-            # Move to the next bit by decrement bit index
-            bit_loc -= 1
-            # If all readable bits of the colour integer are consumed
-            if bit_loc == -1:
-                # Move to the next RGB and reset the bit index
-                count += 1
-                bit_loc = header.density
-                # If the entire pixel is read
-                if count == 3:
-                    # Move to the next pixel in the row and reset the count
-                    count = 0
-                    y += 1
-                    # If the entire row of pixels is read
-                    if y == y_dim:
-                        # Move to the next row and reset row index
-                        y = 0
-                        x += 1
-        # Convert the single byte (integer) to bytes
-        # By design, the resulting data is strictly stored in 1 byte
-        # and endianness does not matter since it is only 1 byte
-        result_data += byte.to_bytes(1, "big")
-
-    # Strip header by slicing its known length
-    result_data = result_data[Header.header_length:]
-
-    # Decrypt data
-    # Salt is already obtained (from the header) -> KDF
-    # -> Key -> Fernet -> Decrypted data
-    # 0. Extract salt from salt string
-    salt = extract_raw_salt(header.salt)
-    # 1. Create KDF
-    kdf = create_kdf(salt)
-    # 2. Derive key
-    # Authentication key will be encoded first to pass to KDF.
-    try:
-        key = kdf.derive(auth_key.encode())
-    except AttributeError:
-        raise TypeError(
-            f"Authentication key must be a string (given {type(auth_key)})")
-    # 3. Build Fernet
-    fn = build_fernet(key)
-    # 4. Attempt to decrypt data
-    # Wrapped to catch invalid key
-    try:
-        # 5. Store decrypted data
-        result_data = fn.decrypt(result_data)
-    except InvalidToken:
-        raise AuthenticationError("Invalid authentication key")
-
-    # If compressed (as indicated by the header), decompress it
-    if header.compression > 0:
-        result_data = decompress(result_data)
-
-    # Write data to output file objects
-    # Iterate through all file objects
-    for file in output_file:
-        # Check if the file object is writable, or
-        # even a file at all
-        try:
-            if not (file.writable() or file.closed):
-                raise OutputFileError(
-                    "Output file must be opened and writable")
-        except AttributeError:
-            raise TypeError(
-                "Output file must be supported file object" +
-                f"(given {type(file)})"
-            )
-        # If file object is text-based, i.e TextIOBase
-        if isinstance(file, TextIOBase):
-            # Attempt to decode binary data to string
-            try:
-                s = str(result_data, "utf-8")
-            except UnicodeDecodeError:
-                continue
-
-            # Attempt to write data
-            try:
-                file.write(s)
-            except IOError:
-                raise OutputFileError("Data cannot be writen")
-        # If file object is binary-based
-        elif isinstance(file, (BufferedIOBase, RawIOBase)):
-            # Attempt to write data
-            try:
-                file.write(result_data)
-            except IOError:
-                raise OutputFileError("Data cannot be writen")
-        # If file object is something-else file-like objects
-        else:
-            # Presume invalid
-            raise TypeError(
-                "Output file must be supported file object" +
-                f"(given {type(file)})"
-            )
-        # After writing, close the files, unless disabled by
-        # the caller
-        if close_on_exit:
-            file.close()
+    # Check all file objects before writing anything
+    check_output_files(output_file)
 
+    # Write data to output file objects, as soon as it is extracted
+    chunks = iter_steg(input_file, auth_key=auth_key, engine=engine,
+                       buffer_size=buffer_size, workers=workers,
+                       key_cache=key_cache, timings=timings)
+    if timings is not None:
+        chunks = _measure_writes(chunks, timings)
+    write_chunks(chunks, output_file, close_on_exit=close_on_exit)
     return True
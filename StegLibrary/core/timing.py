@@ -0,0 +1,166 @@
+# This script implements the instrumentation of write_steg and iter_steg,
+# which records the wall and CPU time spent in each stage of an operation
+# (reading, compression, KDF, encryption, embedding, PNG encoding...), with
+# the number of bytes going in and out of it. Operations are only measured
+# when given a Timings object, and cost a shared no-op otherwise.
+
+# Builtin modules
+from time import perf_counter, process_time
+from typing import Any, Dict, List, Optional
+
+
+class StageTiming:
+    """Time spent in a stage, summed over all the times it ran."""
+
+    __slots__ = ("wall", "cpu", "calls", "bytes_in", "bytes_out")
+
+    def __init__(self) -> None:
+        # Elapsed time, in seconds
+        self.wall: float = 0.0
+        # CPU time of this process, in seconds (worker processes of the
+        # parallel engines are not included)
+        self.cpu: float = 0.0
+        # Number of times the stage ran (once per chunk in stream format)
+        self.calls: int = 0
+        # Number of bytes going in and out of the stage
+        self.bytes_in: int = 0
+        self.bytes_out: int = 0
+
+
+class _Measurement:
+    """Measures a stage, while in its context.
+
+    Time spent in stages measured within it is left out, so that the time
+    of each stage is its own.
+    """
+
+    __slots__ = ("timings", "timing", "bytes_out", "wall", "cpu",
+                 "inner_wall", "inner_cpu")
+
+    def __init__(self, timings: "Timings", timing: StageTiming,
+                 bytes_in: int) -> None:
+        self.timings: Timings = timings
+        self.timing: StageTiming = timing
+        self.timing.bytes_in += bytes_in
+        # Set by the caller once known
+        self.bytes_out: int = 0
+        # Time spent in inner stages
+        self.inner_wall: float = 0.0
+        self.inner_cpu: float = 0.0
+
+    def __enter__(self) -> "_Measurement":
+        self.timings._active.append(self)
+        self.wall = perf_counter()
+        self.cpu = process_time()
+        return self
+
+    def __exit__(self, *_) -> None:
+        wall = perf_counter() - self.wall
+        cpu = process_time() - self.cpu
+        active = self.timings._active
+        active.pop()
+        if active:
+            active[-1].inner_wall += wall
+            active[-1].inner_cpu += cpu
+
+        timing = self.timing
+        timing.wall += wall - self.inner_wall
+        timing.cpu += cpu - self.inner_cpu
+        timing.calls += 1
+        timing.bytes_out += self.bytes_out
+
+
+class _NoMeasurement:
+    """Stands for a measurement, when operations are not measured."""
+
+    __slots__ = ("bytes_out",)
+
+    def __enter__(self) -> "_NoMeasurement":
+        return self
+
+    def __exit__(self, *_) -> None:
+        pass
+
+
+_no_measurement = _NoMeasurement()
+
+
+class Timings:
+    """Records the time spent in each stage of write_steg or iter_steg.
+
+    Stages of write_steg: read, compress, kdf, encrypt, header, load,
+    embed, encode (PNG), write. Stages of iter_steg (and extract_steg):
+    open, load, header, kdf, extract, decrypt, decompress, write. Stages
+    are kept in the order they first ran, and one object can be given to
+    many operations to sum them.
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, StageTiming] = {}
+        # Measurements in progress, innermost last
+        self._active: List[_Measurement] = []
+
+    def measure(self, stage: str, bytes_in: int = 0) -> _Measurement:
+        """Returns a context measuring a stage, given the number of bytes
+        going in (the bytes going out are set on the context)."""
+        if stage not in self.stages:
+            self.stages[stage] = StageTiming()
+        return _Measurement(self, self.stages[stage], bytes_in)
+
+    @property
+    def wall(self) -> float:
+        """Elapsed time of all stages, in seconds."""
+        return sum(timing.wall for timing in self.stages.values())
+
+    @property
+    def cpu(self) -> float:
+        """CPU time of all stages, in seconds."""
+        return sum(timing.cpu for timing in self.stages.values())
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the timings of each stage, in a JSON serialisable form."""
+        return {
+            stage: {name: getattr(timing, name)
+                    for name in StageTiming.__slots__}
+            for stage, timing in self.stages.items()
+        }
+
+    def __str__(self) -> str:
+        """Returns the timings as a table."""
+        lines = [f"{'stage':<12}{'wall ms':>10}{'cpu ms':>10}{'calls':>7}"
+                 f"{'bytes in':>12}{'bytes out':>12}"]
+        for stage, timing in self.stages.items():
+            lines.append(
+                f"{stage:<12}{timing.wall * 1000:>10.2f}"
+                f"{timing.cpu * 1000:>10.2f}{timing.calls:>7}"
+                f"{timing.bytes_in:>12}{timing.bytes_out:>12}")
+        lines.append(f"{'total':<12}{self.wall * 1000:>10.2f}"
+                     f"{self.cpu * 1000:>10.2f}")
+        return "\n".join(lines)
+
+
+def measure(timings: Optional[Timings], stage: str,
+            bytes_in: int = 0) -> Any:
+    """Returns a context measuring a stage, or a shared no-op if timings is
+    None (see Timings.measure)."""
+    if timings is None:
+        return _no_measurement
+    return timings.measure(stage, bytes_in)
+
+
+class TimedWriter:
+    """Wraps a writable file-like object, measuring the time spent writing
+    to it as the write stage, apart from the stage writing to it."""
+
+    def __init__(self, file: Any, timings: Timings) -> None:
+        self._file = file
+        self._timings = timings
+
+    def write(self, data: Any) -> int:
+        with self._timings.measure("write", len(data)) as measurement:
+            written = self._file.write(data)
+            measurement.bytes_out = len(data)
+        return written
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._file, name)
@@ -1,7 +1,18 @@
 # Import expose API functions
-from .salt import make_salt, extract_raw_salt
-from .kdf import create_kdf
-from .fernet import build_fernet, _InvalidToken as InvalidToken
+# Modules are only imported on first access, as most need cryptography
+from StegLibrary.helper.lazy_op import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), {
+    "make_salt": ".salt",
+    "extract_raw_salt": ".salt",
+    "create_kdf": ".kdf",
+    "find_kdf": ".kdf",
+    "build_fernet": ".fernet",
+    "InvalidToken": ".fernet",
+    "StreamEncryptor": ".stream",
+    "StreamDecryptor": ".stream",
+    "KeyCache": ".cache",
+})
 
 # Define import * functionality
 # Import all only imports main API
@@ -10,6 +21,10 @@
     "make_salt",
     "extract_raw_salt",
     "create_kdf",
+    "find_kdf",
     "build_fernet",
-    "InvalidToken"
+    "InvalidToken",
+    "StreamEncryptor",
+    "StreamDecryptor",
+    "KeyCache",
 ]
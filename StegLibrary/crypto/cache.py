@@ -0,0 +1,138 @@
+# This file implements an in-process cache of derived keys, so that
+# extracting the same steganograph again with the same authentication key
+# does not pay for the key derivation function again.
+
+# Builtin modules
+from collections import OrderedDict
+from hashlib import sha256
+from hmac import new as hmac_new
+from os import urandom
+from threading import Lock
+from time import monotonic
+from typing import NamedTuple, Optional, Tuple
+
+# Internal modules
+from StegLibrary.crypto.kdf import create_kdf
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of a KeyCache."""
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class KeyCache:
+    """A bounded, thread-safe LRU cache of derived keys.
+
+    Entries are keyed by the KDF profile, the salt and a keyed hash of
+    the authentication key, which is itself never stored. Derived keys
+    are zeroed when they are evicted or the cache is cleared, and expired
+    keys are swept on every call to derive or info.
+    """
+
+    def __init__(self, maxsize: int = 128,
+                 ttl: Optional[float] = None) -> None:
+        # Type checking
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError("Maximum size must be a positive integer!")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("Time-to-live must be positive!")
+
+        self.maxsize: int = maxsize
+        self.ttl: Optional[float] = ttl
+
+        # Secret of the keyed hash, private to this cache
+        self._secret: bytes = urandom(32)
+        # Maps (kdf, salt, keyed hash) to (key, expiry), least recent first
+        self._entries: OrderedDict = OrderedDict()
+        self._lock: Lock = Lock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def _make_key(self, salt: bytes, auth_key: bytes,
+                  kdf: int) -> Tuple[int, bytes, bytes]:
+        """Makes the cache key of a salt and an authentication key."""
+        return kdf, salt, hmac_new(self._secret, auth_key, sha256).digest()
+
+    def _evict(self, cache_key: Tuple[int, bytes, bytes]) -> None:
+        """Removes an entry and zeroes its key. The lock must be held."""
+        key, _ = self._entries.pop(cache_key)
+        key[:] = bytes(len(key))
+
+    def _sweep(self, now: float) -> None:
+        """Evicts every expired entry. The lock must be held."""
+        if self.ttl is None:
+            return
+        # Hits do not extend the expiry, so entries are not ordered by it
+        for cache_key in [cache_key for cache_key, (_, expiry)
+                          in self._entries.items() if expiry <= now]:
+            self._evict(cache_key)
+            self.evictions += 1
+
+    def derive(self, salt: bytes, auth_key: bytes, kdf: int = 0) -> bytes:
+        """Derives a key, or returns it from the cache.
+
+        ### Positional arguments
+
+        - salt (bytes)
+            - The salt of the KDF
+
+        - auth_key (bytes)
+            - The encoded authentication key
+
+        - kdf (int) (default = 0)
+            - The identifier of the KDF profile
+
+        ### Returns
+
+        The derived key
+        """
+        cache_key = self._make_key(salt, auth_key, kdf)
+
+        with self._lock:
+            # Expired keys are derived again
+            self._sweep(monotonic())
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return bytes(entry[0])
+            self.misses += 1
+
+        # Derive outside of the lock, so that other keys are not blocked
+        key = create_kdf(salt, kdf).derive(auth_key)
+
+        with self._lock:
+            if cache_key in self._entries:
+                self._evict(cache_key)
+            # Keys live for the time-to-live once derived
+            expiry = monotonic() + self.ttl if self.ttl is not None \
+                else float("inf")
+            self._entries[cache_key] = (bytearray(key), expiry)
+            # Evict the least recently used entries
+            while len(self._entries) > self.maxsize:
+                self._evict(next(iter(self._entries)))
+                self.evictions += 1
+
+        return key
+
+    def clear(self) -> None:
+        """Removes all entries, zeroing their keys. They count as
+        evictions."""
+        with self._lock:
+            for cache_key in list(self._entries):
+                self._evict(cache_key)
+                self.evictions += 1
+
+    def info(self) -> CacheInfo:
+        """Returns the hit, miss and eviction statistics of the cache."""
+        with self._lock:
+            self._sweep(monotonic())
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             self.maxsize, len(self._entries))
@@ -1,4 +1,8 @@
+# Builtin modules
+from typing import Union
+
 # Internal modules
+from StegLibrary.crypto.profiles import kdf_profiles
 from StegLibrary.helper import err_imp
 
 # Non-builtin modules
@@ -6,12 +10,36 @@
     from cryptography.hazmat.backends import default_backend
     from cryptography.hazmat.primitives import hashes
     from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 except ImportError:
     err_imp("cryptography")
     exit(1)
 
 
-def create_kdf(salt: bytes) -> PBKDF2HMAC:
+def find_kdf(name: str) -> int:
+    """Finds the identifier of a KDF profile by its name.
+
+    ### Positional arguments
+
+    - name (str)
+        - The name of the profile
+
+    ### Returns
+
+    The identifier of the profile
+
+    ### Raises
+
+    - ValueError
+        - Raised when no profile has the given name
+    """
+    for kdf, profile in enumerate(kdf_profiles):
+        if profile.name == name:
+            return kdf
+    raise ValueError("KDF not defined!")
+
+
+def create_kdf(salt: bytes, kdf: int = 0) -> Union[PBKDF2HMAC, Scrypt]:
     """Builds a key derive function with the salt given.
 
     ### Keyword arguments
@@ -19,24 +47,48 @@ def create_kdf(salt: bytes) -> PBKDF2HMAC:
     - salt (bytes)
         - A random 16-byte salt (can be made from make_salt())
 
+    - kdf (int) (default = 0)
+        - The identifier of the KDF profile
+
     ### Returns
 
-    A PBKDF2HMAC object, with can be used to derive key from password
+    A PBKDF2HMAC or Scrypt object, with can be used to derive key
+    from password
 
     ### Raises
 
     - TypeError
         - Raised when the parametres given are in incorrect types
+
+    - ValueError
+        - Raised when the KDF profile is not defined
     """
     # Type checking
     if not isinstance(salt, bytes):
         raise TypeError(f"The salt must be in bytes (given {type(salt)})")
+    if not isinstance(kdf, int):
+        raise TypeError(f"The KDF must be an integer (given {type(kdf)})")
+    if not 0 <= kdf < len(kdf_profiles):
+        raise ValueError("KDF not defined!")
+
+    profile = kdf_profiles[kdf]
+
+    # Initialise and return a Scrypt object
+    if profile.algorithm == "scrypt":
+        return Scrypt(
+            salt=salt,
+            length=32,
+            n=profile.cost,
+            r=8,
+            p=1,
+            backend=default_backend(),
+        )
 
     # Initialise and return a PBKDF2HMAC object
     return PBKDF2HMAC(
         algorithm=hashes.SHA512(),
         length=32,
         salt=salt,
-        iterations=10000,
+        iterations=profile.cost,
         backend=default_backend(),
     )
@@ -0,0 +1,31 @@
+# This file defines the profiles of the key derive functions. It needs no
+# dependency, so that the configuration and the CLI can list the profiles
+# without importing cryptography.
+
+# Builtin modules
+from typing import List, NamedTuple
+
+
+class KdfProfile(NamedTuple):
+    """The algorithm and cost of a key derive function."""
+
+    # Name of the profile, as given by the user
+    name: str
+    # Either "pbkdf2" (PBKDF2-HMAC-SHA512) or "scrypt"
+    algorithm: str
+    # Number of iterations of PBKDF2, or the CPU/memory cost n of Scrypt
+    cost: int
+
+
+# Available profiles, indexed by the identifier recorded in the header.
+# Identifiers are never reused, so that steganographs made with a profile
+# can always be read back with the same parameters.
+kdf_profiles: List[KdfProfile] = [
+    # The original (and default) profile
+    KdfProfile("pbkdf2-10k", "pbkdf2", 10000),
+    KdfProfile("pbkdf2-1k", "pbkdf2", 1000),
+    KdfProfile("pbkdf2-100k", "pbkdf2", 100000),
+    KdfProfile("pbkdf2-210k", "pbkdf2", 210000),
+    KdfProfile("scrypt-16k", "scrypt", 1 << 14),
+    KdfProfile("scrypt-128k", "scrypt", 1 << 17),
+]
@@ -0,0 +1,147 @@
+# This file implements a chunked authenticated encryption, used to encrypt
+# data which does not fit in memory at once. Every chunk is sealed with
+# AES-GCM, and its nonce is made of a random prefix, the chunk counter and a
+# flag marking the last chunk, so that chunks cannot be reordered, dropped
+# or truncated without detection.
+
+# Builtin modules
+from os import urandom
+from struct import Struct
+from typing import Tuple
+
+# Internal modules
+from StegLibrary.helper import err_imp
+from StegLibrary.crypto.fernet import _InvalidToken as InvalidToken
+
+# Non-builtin modules
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    err_imp("cryptography")
+    exit(1)
+
+
+# Length of the random nonce prefix, written before the first frame
+nonce_prefix_length: int = 7
+
+# Each frame starts with its length, the highest bit marks the last frame
+frame_header: Struct = Struct(">I")
+frame_header_length: int = frame_header.size
+last_frame_flag: int = 1 << 31
+
+# Size of the authentication tag appended to each frame
+tag_length: int = 16
+
+# Nonce suffix: chunk counter and last chunk flag
+_nonce_suffix: Struct = Struct(">I?")
+
+
+class StreamEncryptor:
+    """Encrypts a stream of chunks into authenticated frames."""
+
+    def __init__(self, key: bytes) -> None:
+        # Type checking
+        if not isinstance(key, bytes):
+            raise TypeError(f"The key must be in bytes (given {type(key)})")
+
+        self.cipher: AESGCM = AESGCM(key)
+        self.nonce_prefix: bytes = urandom(nonce_prefix_length)
+        self.counter: int = 0
+        self.finalised: bool = False
+
+    def encrypt(self, chunk: bytes, last: bool = False) -> bytes:
+        """Encrypts a chunk into a frame.
+
+        ### Positional arguments
+
+        - chunk (bytes)
+            - The plaintext chunk
+
+        - last (bool) (default = False)
+            - Whether this is the last chunk of the stream
+
+        ### Returns
+
+        The frame, i.e the frame header followed by the ciphertext
+
+        ### Raises
+
+        - ValueError
+            - Raised when the stream has already been finalised
+        """
+        if self.finalised:
+            raise ValueError("Stream has already been finalised")
+
+        nonce = self.nonce_prefix + _nonce_suffix.pack(self.counter, last)
+        ciphertext = self.cipher.encrypt(nonce, chunk, None)
+        self.counter += 1
+        self.finalised = last
+
+        flag = last_frame_flag if last else 0
+        return frame_header.pack(len(ciphertext) | flag) + ciphertext
+
+
+class StreamDecryptor:
+    """Decrypts authenticated frames made by StreamEncryptor."""
+
+    def __init__(self, key: bytes, nonce_prefix: bytes) -> None:
+        # Type checking
+        if not isinstance(key, bytes):
+            raise TypeError(f"The key must be in bytes (given {type(key)})")
+        if len(nonce_prefix) != nonce_prefix_length:
+            raise InvalidToken
+
+        self.cipher: AESGCM = AESGCM(key)
+        self.nonce_prefix: bytes = bytes(nonce_prefix)
+        self.counter: int = 0
+        self.finalised: bool = False
+
+    @staticmethod
+    def parse_frame_header(b: bytes) -> Tuple[int, bool]:
+        """Parses a frame header.
+
+        ### Positional arguments
+
+        - b (bytes)
+            - The frame header
+
+        ### Returns
+
+        A tuple (length, last) of the ciphertext length and whether
+        the frame is the last one
+        """
+        value = frame_header.unpack(b)[0]
+        return value & ~last_frame_flag, bool(value & last_frame_flag)
+
+    def decrypt(self, ciphertext: bytes, last: bool = False) -> bytes:
+        """Decrypts the ciphertext of a frame.
+
+        ### Positional arguments
+
+        - ciphertext (bytes)
+            - The ciphertext of the frame
+
+        - last (bool) (default = False)
+            - Whether the frame is marked as the last one
+
+        ### Returns
+
+        The plaintext chunk
+
+        ### Raises
+
+        - InvalidToken
+            - Raised when the frame fails authentication
+        """
+        if self.finalised:
+            raise InvalidToken
+
+        nonce = self.nonce_prefix + _nonce_suffix.pack(self.counter, last)
+        try:
+            chunk = self.cipher.decrypt(nonce, bytes(ciphertext), None)
+        except InvalidTag:
+            raise InvalidToken
+        self.counter += 1
+        self.finalised = last
+        return chunk
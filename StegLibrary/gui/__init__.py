@@ -1,7 +1,12 @@
 # Import expose API functions
-from .gui import Ui_MainWindow
-from .gui_action import MainWindow
-from .gui_api import execute_gui
+# Modules are only imported on first access, as all need PyQt5
+from StegLibrary.helper.lazy_op import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), {
+    "Ui_MainWindow": ".gui",
+    "MainWindow": ".gui_action",
+    "execute_gui": ".gui_api",
+})
 
 # Define import * functionality
 # Import all only imports main API
@@ -1,8 +1,18 @@
 # Import expose API functions
-from .bit_op import is_bit_set, set_bit, unset_bit
-from .console_op import err_imp
-from .image_op import show_image, open_image
-from .file_op import raw_open
+# Modules are only imported on first access, as image_op needs Pillow
+from .lazy_op import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, globals(), {
+    "is_bit_set": ".bit_op",
+    "set_bit": ".bit_op",
+    "unset_bit": ".bit_op",
+    "err_imp": ".console_op",
+    "show_image": ".image_op",
+    "open_image": ".image_op",
+    "raw_open": ".file_op",
+    "check_output_files": ".file_op",
+    "write_chunks": ".file_op",
+})
 
 # Define import * functionality
 # Import all only imports main API
@@ -15,4 +25,6 @@
     "show_image",
     "open_image",
     "raw_open",
+    "check_output_files",
+    "write_chunks",
 ]
@@ -1,10 +1,12 @@
 # Builtin modules
-from io import RawIOBase, BufferedIOBase
-from typing import Union
+from codecs import getincrementaldecoder
+from io import RawIOBase, BufferedIOBase, TextIOBase
+from typing import Iterable, List, Union
 from os import path
 
 # Internal modules
 from StegLibrary.core import SteganographyConfig as Config
+from StegLibrary.core.errors import OutputFileError
 
 
 def raw_open(
@@ -48,3 +50,106 @@ def raw_open(
         return open(filename, mode)
     except IOError:
         raise IOError("Unable to open file: " + filename)
+
+
+def check_output_files(
+    output_file: List[Union[RawIOBase, BufferedIOBase, TextIOBase]],
+) -> None:
+    """Checks that all file objects are opened and writable, or even a file
+    at all.
+
+    ### Raises
+
+    - TypeError
+        - Raised when an output file is not a supported file object
+
+    - OutputFileError
+        - Raised when an output file is closed or not writable
+    """
+    for file in output_file:
+        try:
+            if file.closed or not file.writable():
+                raise OutputFileError(
+                    "Output file must be opened and writable")
+        except AttributeError:
+            raise TypeError(
+                "Output file must be supported file object" +
+                f"(given {type(file)})"
+            )
+        if not isinstance(file, (TextIOBase, BufferedIOBase, RawIOBase)):
+            # Presume invalid
+            raise TypeError(
+                "Output file must be supported file object" +
+                f"(given {type(file)})"
+            )
+
+
+def write_chunks(
+    chunks: Iterable[bytes],
+    output_file: List[Union[RawIOBase, BufferedIOBase, TextIOBase]],
+    close_on_exit: bool = Config.flag_close_on_exit,
+) -> None:
+    """Writes chunks of data to file objects, as soon as each is given.
+
+    ### Positional arguments
+
+    - chunks (Iterable[bytes])
+        - The data to write
+
+    - output_file (List[RawIOBase | BufferedIOBase | TextIOBase])
+        - A list of writable file-like object(s)
+        - NOTE: Text-based file objects (such as sys.stdout) are only
+        written while the data can be decoded into string.
+
+    - close_on_exit (bool) (default = Config.flag_close_on_exit)
+        - Whether to close the file objects on exit
+
+    ### Raises
+
+    - OutputFileError
+        - Raised when there is an I/O error when trying to write
+        an output file
+    """
+    # Text-based file objects, i.e TextIOBase, are given decoded data.
+    # A decoder is kept for each, as a character may span two chunks.
+    decoders = {
+        id(file): getincrementaldecoder("utf-8")()
+        for file in output_file
+        if isinstance(file, TextIOBase)
+    }
+
+    for chunk in chunks:
+        # Iterate through all file objects
+        for file in output_file:
+            # If file object is text-based, i.e TextIOBase
+            if isinstance(file, TextIOBase):
+                # Skip the file object, once data cannot be decoded
+                if decoders[id(file)] is None:
+                    continue
+                # Attempt to decode binary data to string
+                try:
+                    s = decoders[id(file)].decode(chunk)
+                except UnicodeDecodeError:
+                    decoders[id(file)] = None
+                    continue
+            # If file object is binary-based
+            else:
+                s = chunk
+
+            # Attempt to write data
+            try:
+                file.write(s)
+            except IOError:
+                raise OutputFileError("Data cannot be writen")
+
+    # After writing, close the files, unless disabled by
+    # the caller
+    for file in output_file:
+        # Text-based file objects must not end with a partial character
+        if id(file) in decoders and decoders[id(file)] is not None:
+            try:
+                decoders[id(file)].decode(b"", final=True)
+            except UnicodeDecodeError:
+                pass
+        if close_on_exit:
+            file.close()
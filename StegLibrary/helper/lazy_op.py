@@ -0,0 +1,44 @@
+# Builtin modules
+from importlib import import_module
+from typing import Any, Callable, Dict, List, MutableMapping, Tuple
+
+
+def lazy_exports(
+    package: str,
+    namespace: MutableMapping[str, Any],
+    exports: Dict[str, str],
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """Exposes names of a package, importing their module on first access.
+
+    Keeps `import StegLibrary` and the CLI from loading heavy dependencies
+    (numpy, Pillow, cryptography, PyQt5) until they are needed.
+
+    ### Positional arguments
+
+    - package (str)
+        - Name of the package (__name__)
+
+    - namespace (MutableMapping)
+        - Namespace of the package (globals()), where each name is cached
+        once imported
+
+    - exports (Dict[str, str])
+        - Module defining each name, relative to the package
+
+    ### Returns
+
+    The __getattr__ and __dir__ functions of the package (PEP 562)
+    """
+
+    def __getattr__(name: str) -> Any:
+        if name not in exports:
+            raise AttributeError(
+                f"module {package!r} has no attribute {name!r}")
+        value = getattr(import_module(exports[name], package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,50 @@
+# This script reports the cost of deriving a key with each KDF profile,
+# so that the trade-off between throughput and strength can be measured.
+#
+# Usage: python -m benchmarks.bench_kdf [-r REPEAT]
+
+# Builtin modules
+from os import urandom
+from timeit import repeat
+
+# Internal modules
+from StegLibrary.helper import err_imp
+from StegLibrary.crypto.kdf import create_kdf, kdf_profiles
+
+# Non-builtin modules
+try:
+    import click
+except ImportError:
+    err_imp("click")
+    exit(1)
+
+
+def time_kdf(kdf: int, rounds: int) -> float:
+    """Returns the best time of a single key derivation, in seconds."""
+    salt = urandom(16)
+
+    def derive() -> None:
+        create_kdf(salt, kdf).derive(b"bGs21Gt@31")
+
+    return min(repeat(derive, repeat=rounds, number=1))
+
+
+@click.command(help="Measure the cost of each KDF profile")
+@click.option(
+    "-r",
+    "--repeat",
+    "rounds",
+    help="Number of derivations per profile (the best one is reported)",
+    type=click.IntRange(min=1),
+    default=5,
+)
+def main(rounds: int) -> None:
+    click.echo(f"{'profile':<14}{'algorithm':<11}{'cost':>8}{'ms/op':>10}")
+    for kdf, profile in enumerate(kdf_profiles):
+        elapsed = time_kdf(kdf, rounds)
+        click.echo(f"{profile.name:<14}{profile.algorithm:<11}"
+                   f"{profile.cost:>8}{elapsed * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# This script reports the cost of encoding a steganograph as PNG with each
+# preset of the encoder, so that the trade-off between encoding speed and
+# file size can be measured.
+#
+# Usage: python -m benchmarks.bench_png [-r REPEAT] [-s SIZE]
+
+# Builtin modules
+from io import BytesIO
+from os import urandom
+from timeit import repeat
+from typing import Tuple
+
+# Internal modules
+from StegLibrary.helper import err_imp
+from StegLibrary.core.engine import embed_numpy
+from StegLibrary.core.png import png_presets, save_png
+
+# Non-builtin modules
+try:
+    import click
+except ImportError:
+    err_imp("click")
+    exit(1)
+
+try:
+    from PIL import Image
+except ImportError:
+    err_imp("Pillow")
+    exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    err_imp("numpy")
+    exit(1)
+
+
+def make_steganograph(size: int) -> Image.Image:
+    """Makes a photo-like carrier (smooth gradients) whose least
+    significant bits are all used, as in a full steganograph."""
+    ramp = np.linspace(0, 255, size)
+    base = (np.add.outer(ramp, ramp) / 2).astype(np.uint8)
+    image = Image.fromarray(np.stack([base, base[::-1], base.T], -1))
+    embed_numpy(image, urandom(size * size * 3 // 4), 1)
+    return image
+
+
+def time_png(image: Image.Image, preset: str,
+             rounds: int) -> Tuple[float, int]:
+    """Returns the best time of a single encoding, in seconds, and the
+    size of the encoded image, in bytes."""
+    output = BytesIO()
+
+    def encode() -> None:
+        output.seek(0)
+        output.truncate()
+        save_png(image, output, png_presets[preset])
+
+    elapsed = min(repeat(encode, repeat=rounds, number=1))
+    return elapsed, len(output.getvalue())
+
+
+@click.command(help="Measure the cost of each PNG encoder preset")
+@click.option(
+    "-r",
+    "--repeat",
+    "rounds",
+    help="Number of encodings per preset (the best one is reported)",
+    type=click.IntRange(min=1),
+    default=3,
+)
+@click.option(
+    "-s",
+    "--size",
+    help="Width and height of the steganograph, in pixels",
+    type=click.IntRange(min=16),
+    default=2048,
+)
+def main(rounds: int, size: int) -> None:
+    image = make_steganograph(size)
+    click.echo(f"{'preset':<10}{'level':>6}{'strategy':>10}{'optimize':>10}"
+               f"{'ms/op':>10}{'KiB':>10}")
+    for preset, options in png_presets.items():
+        elapsed, length = time_png(image, preset, rounds)
+        click.echo(f"{preset:<10}{options.compress_level:>6}"
+                   f"{options.strategy:>10}{str(options.optimize):>10}"
+                   f"{elapsed * 1000:>10.1f}{length // 1024:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+# This script runs the benchmark suite of create and extract, as
+# `steg bench run` does (see StegLibrary/core/bench.py), and writes its
+# results as JSON.
+#
+# Usage: python -m benchmarks.bench_steg [-P PROFILE] [-r REPEAT] [-o OUTPUT]
+
+# Internal modules
+from StegLibrary.core.main import bench_run as main
+
+
+if __name__ == "__main__":
+    main()
@@ -18,8 +18,9 @@
         "pytest",
         "PyQt5",
         "cryptography",
+        "numpy",
     ],
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     platforms=["any"],
     classifiers=[
         "Development Status :: 5 - Production/Stable",
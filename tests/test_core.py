@@ -0,0 +1,1255 @@
+# Builtin modules
+import asyncio
+import socket
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from getpass import getuser
+from io import BytesIO, StringIO
+from json import dumps, loads
+from os import chmod, path, stat, urandom
+from random import Random
+from subprocess import run
+from sys import executable
+from time import perf_counter
+
+# Internal modules
+from StegLibrary.helper import err_imp
+from StegLibrary.crypto import KeyCache
+from StegLibrary.core import SteganographyConfig as Config
+from StegLibrary.core import batch as ba
+from StegLibrary.core import engine as en
+from StegLibrary.core import parallel as pa
+from StegLibrary.core.batch import (
+    collect_steganographs,
+    extract_steg_batch,
+    write_steg_batch,
+)
+from StegLibrary.core.errors import (
+    AuthenticationError,
+    InputFileError,
+    InsufficientStorageError,
+    OutputFileError,
+    UnrecognisedHeaderError,
+)
+from StegLibrary.core.capacity import plan_capacity
+from StegLibrary.core.client import (
+    DaemonError,
+    check_private,
+    connect_daemon,
+    daemon_socket_path,
+)
+from StegLibrary.core.codec import choose_compression, codecs, find_codec
+from StegLibrary.core.header import Header, build_header, parse_header
+from StegLibrary.core.main import steg
+from StegLibrary.core.mapped import open_carrier
+from StegLibrary.core.memory import embed_bytes, extract_bytes
+from StegLibrary.core.aio import async_extract_steg, async_write_steg
+from StegLibrary.core.bench import (
+    Profile,
+    compare_bench,
+    make_carrier,
+    make_payload,
+    percentile,
+    plan_scenarios,
+    run_bench,
+    slower_p_value,
+)
+from StegLibrary.core.png import find_png_options
+from StegLibrary.core.server import StegServer
+from StegLibrary.core.timing import Timings
+from StegLibrary.core.steg import (
+    write_steg,
+    extract_steg,
+    extract_header,
+    iter_steg,
+    peek_header,
+    is_steganograph,
+)
+
+# Non-builtin modules
+try:
+    from pytest import raises
+except ImportError:
+    err_imp("pytest")
+    exit(1)
+
+try:
+    from click.testing import CliRunner
+except ImportError:
+    err_imp("click")
+    exit(1)
+
+try:
+    from PIL import Image
+except ImportError:
+    err_imp("Pillow")
+    exit(1)
+
+try:
+    import numpy as np
+except ImportError:
+    err_imp("numpy")
+    exit(1)
+
+
+def make_image(x_dim: int, y_dim: int, mode: str = "RGB") -> Image.Image:
+    # Deterministic noise, so that failures can be reproduced
+    rng = Random(x_dim * y_dim)
+    data = bytes(rng.getrandbits(8) for _ in range(x_dim * y_dim * len(mode)))
+    return Image.frombytes(mode, (x_dim, y_dim), data)
+
+
+def test_embed_numpy():
+    # Assert 1: Same pixels as the loop engine, for all densities
+    for density in (1, 2, 3):
+        for length in (1, 7, 64, 333):
+            data = urandom(length)
+            expected = make_image(31, 17)
+            en.embed_loop(expected, data, density)
+            actual = make_image(31, 17)
+            en.embed_numpy(actual, data, density)
+            assert actual.tobytes() == expected.tobytes()
+
+    # Assert 2: Same pixels when starting in the middle of the stream
+    for density in (1, 2, 3):
+        for offset in (1, 5, 200, 1001):
+            data = urandom(50)
+            expected = make_image(23, 29)
+            en.embed_loop(expected, data, density, offset)
+            actual = make_image(23, 29)
+            en.embed_numpy(actual, data, density, offset)
+            assert actual.tobytes() == expected.tobytes()
+
+    # Assert 3: Alpha channel is left untouched
+    data = urandom(100)
+    expected = make_image(20, 20, "RGBA")
+    en.embed_loop(expected, data, 2)
+    actual = make_image(20, 20, "RGBA")
+    en.embed_numpy(actual, data, 2)
+    assert actual.tobytes() == expected.tobytes()
+    assert actual.getchannel("A").tobytes() == \
+        make_image(20, 20, "RGBA").getchannel("A").tobytes()
+
+    # Assert 4: Same pixels as the loop engine, for every channel count
+    for mode in ("L", "LA", "RGBA", "I;16"):
+        channels = en.mode_channels[mode]
+        data = urandom(100)
+        expected = make_image(20, 20, mode)
+        en.embed_loop(expected, data, 2, 7, channels)
+        actual = make_image(20, 20, mode)
+        en.embed_numpy(actual, data, 2, 7, channels)
+        assert actual.tobytes() == expected.tobytes()
+        assert en.extract_loop(actual, 2, 100, 7, channels) == data
+
+    # Assert 5: Same pixels when the data fills the image exactly
+    for mode in ("L", "RGB", "RGBA"):
+        channels = en.mode_channels[mode]
+        for density in (1, 2, 3):
+            data = urandom(8 * 8 * channels * (density + 1) // 8)
+            expected = make_image(8, 8, mode)
+            en.embed_loop(expected, data, density, 0, channels)
+            actual = make_image(8, 8, mode)
+            en.embed_numpy(actual, data, density, 0, channels)
+            assert actual.tobytes() == expected.tobytes()
+            for extract in (en.extract_loop, en.extract_numpy):
+                assert extract(actual, density, len(data), 0,
+                               channels) == data
+
+
+def test_extract_numpy():
+    # Assert 1: Same bytes as the loop engine, for all densities and offsets
+    image = make_image(37, 19)
+    for density in (1, 2, 3):
+        for offset in (0, 3, 8, 1001):
+            expected = en.extract_loop(image, density, 120, offset)
+            assert en.extract_numpy(image, density, 120, offset) == expected
+
+    # Assert 2: Reads back what has been embedded
+    for density in (1, 2, 3):
+        data = urandom(500)
+        image = make_image(40, 40)
+        en.embed_numpy(image, data, density, 13)
+        assert en.extract_numpy(image, density, 500, 13) == data
+
+
+def test_parse_header():
+    # Assert 1: Header followed by data, in both versions
+    for version in (1, 2):
+        header = build_header(data_length=1234, compression=7, density=2,
+                              salt="A" * 22 + "==", version=version)
+        parsed = parse_header(header + b"gAAAAAB\xff")
+        assert parsed.data_length == 1234
+        assert parsed.compression == 7
+        assert parsed.density == 2
+        assert parsed.version == version
+        assert parsed.length == len(header)
+        assert parsed.header == header
+
+    # Assert 2: KDF profile is recorded in the flag
+    header = build_header(data_length=5, compression=9, density=3,
+                          salt="A" * 22 + "==", stream=True, kdf=5, version=1)
+    assert parse_header(header).kdf == 5
+
+    # Assert 3: Binary header holds large lengths, and is checksummed
+    header = build_header(data_length=1 << 40, compression=0, density=1,
+                          salt="A" * 22 + "==", stream=True, kdf=4)
+    parsed = parse_header(header)
+    assert (parsed.data_length, parsed.stream, parsed.kdf) == (1 << 40, 1, 4)
+    assert len(header) == Header.binary_header_length
+    with raises(UnrecognisedHeaderError):
+        parse_header(header[:-1] + bytes([header[-1] ^ 1]))
+    with raises(UnrecognisedHeaderError):
+        parse_header(header[:-1])
+
+    # Assert 4: Error handling
+    with raises(UnrecognisedHeaderError):
+        parse_header(b"\xff" * 37)
+    with raises(UnrecognisedHeaderError):
+        parse_header(b"5?999?" + b"A" * 22 + b"==")
+    with raises(TypeError):
+        parse_header(str(header))
+
+
+def test_codec():
+    data = b"Hello, world! " * 1000 + urandom(1000)
+
+    # Assert 1: Every codec is available
+    assert Config.available_codec == [codec.name for codec in codecs.values()]
+
+    for codec in codecs.values():
+        # Assert 2: Incremental compression reverses at once
+        compressor = codec.compressor(9)
+        compressed = compressor.compress(data) + compressor.flush()
+        assert codec.compress(data, 9) == compressed
+
+        # Assert 3: Incremental decompression honours the output limit
+        decompressor = codec.decompressor()
+        output = [decompressor.decompress(compressed, 100)]
+        while not decompressor.eof:
+            assert not decompressor.needs_input
+            output.append(decompressor.decompress(b"", 100))
+        assert all(len(chunk) <= 100 for chunk in output)
+        assert b"".join(output) == data
+
+        # Assert 4: Compressed sizes are within bounds
+        for sample in (b"", b"\0" * 100000, urandom(100000)):
+            best, worst = codec.bounds(len(sample))
+            assert best <= len(codec.compress(sample, 9)) <= worst
+
+
+def test_auto_compress():
+    text = b"Hello, world! " * 2000
+
+    # Assert 1: Compressed formats and random data are left alone
+    assert choose_compression(b"PK\x03\x04" + text, 9) == 0
+    assert choose_compression(urandom(10000), 9) == 0
+    assert choose_compression(text, 9) == 9
+    assert choose_compression(text, 0) == 0
+
+    # Assert 2: The level chosen is recorded, and extraction follows it
+    for data, level in ((urandom(1000), 0), (text, 9)):
+        image = BytesIO()
+        write_steg(BytesIO(data), make_image(64, 64), image,
+                   auto_compress=True, close_on_exit=False)
+        image.seek(0)
+        assert peek_header(image).compression == level
+        output = BytesIO()
+        image.seek(0)
+        extract_steg(image, [output], close_on_exit=False)
+        assert output.getvalue() == data
+
+
+def test_write_steg_engine():
+    # Assert 1: Both engines stay within the carrier
+    for engine in ("loop", "numpy"):
+        output = BytesIO()
+        assert write_steg(BytesIO(b"Hello" * 20), make_image(64, 64), output,
+                          engine=engine, close_on_exit=False)
+        assert Image.open(output).size == (64, 64)
+
+    # Assert 2: Error handling
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), BytesIO(),
+                   engine="gpu")
+
+    # Assert 3: A memoryview as input, with the default arguments
+    data = memoryview(b"Hello" * 20)
+    output = BytesIO()
+    assert write_steg(data, make_image(64, 64), output)
+    assert output.closed
+    assert data.tobytes() == b"Hello" * 20
+
+
+def test_png_options():
+    # Assert 1: Settings override the preset
+    assert find_png_options() == (6, "default", False)
+    assert find_png_options("fast") == (1, "huffman", False)
+    assert find_png_options("fast", 4, optimize=True) == (4, "huffman", True)
+
+    # Assert 2: Round trip, with the fast preset
+    image = BytesIO()
+    write_steg(BytesIO(b"Hello"), make_image(64, 64), image,
+               png_preset="fast", png_strategy="rle", close_on_exit=False)
+    output = BytesIO()
+    image.seek(0)
+    extract_steg(image, [output], close_on_exit=False)
+    assert output.getvalue() == b"Hello"
+
+    # Assert 3: Error handling
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), BytesIO(),
+                   png_preset="tiny")
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), BytesIO(),
+                   png_compress_level=10)
+    with raises(ValueError):
+        find_png_options(strategy="paeth")
+
+
+def test_extract_steg():
+    # Assert 1: Round trip, for all engines and densities
+    for engine in ("loop", "numpy"):
+        for density in (1, 2, 3):
+            data = urandom(300)
+            image = BytesIO()
+            write_steg(BytesIO(data), make_image(64, 64), image,
+                       density=density, engine=engine, close_on_exit=False)
+            output = BytesIO()
+            image.seek(0)
+            assert extract_steg(image, [output], engine=engine,
+                                close_on_exit=False)
+            assert output.getvalue() == data
+
+    # Assert 2: Round trip, with the KDF recorded in the header
+    for kdf in ("pbkdf2-1k", "scrypt-16k"):
+        image = BytesIO()
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), image, kdf=kdf,
+                   close_on_exit=False)
+        image.seek(0)
+        assert peek_header(image).kdf == Config.available_kdf.index(kdf)
+        output = BytesIO()
+        image.seek(0)
+        extract_steg(image, [output], close_on_exit=False)
+        assert output.getvalue() == b"Hello"
+
+    # Assert 3: Not a steganograph
+    image = BytesIO()
+    make_image(48, 32).save(image, "png")
+    with raises(UnrecognisedHeaderError):
+        extract_steg(image, [BytesIO()])
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), BytesIO(),
+                   kdf="md5")
+
+
+def test_peek_header():
+    # Assert 1: Same header as the trial-and-error detection
+    for density in (1, 2, 3):
+        image = BytesIO()
+        write_steg(BytesIO(b"Hello" * 20), make_image(64, 64), image,
+                   density=density, close_on_exit=False)
+        image.seek(0)
+        header = peek_header(Image.open(image))
+        expected = extract_header(Image.open(image), engine="loop")
+        assert header.header == expected.header
+        assert header.density == density
+        assert is_steganograph(image)
+
+    # Assert 2: Not a steganograph
+    assert peek_header(make_image(64, 64)) is None
+    assert not is_steganograph(make_image(64, 64, "L"))
+    assert not is_steganograph(BytesIO(b"Not an image"))
+
+
+def test_image_modes():
+    # Assert 1: Round trip, for all modes and engines
+    for mode in ("L", "LA", "RGB", "RGBA", "I;16"):
+        for engine in ("loop", "numpy"):
+            image = BytesIO()
+            write_steg(BytesIO(b"Hello" * 20), make_image(64, 64, mode),
+                       image, engine=engine, close_on_exit=False)
+            image.seek(0)
+            assert Image.open(image).mode == mode
+            header = peek_header(image)
+            assert header.channels == en.mode_channels[mode]
+            output = BytesIO()
+            image.seek(0)
+            extract_steg(image, [output], engine=engine, close_on_exit=False)
+            assert output.getvalue() == b"Hello" * 20
+
+    # Assert 2: The alpha channel adds a third to the capacity
+    rgb = plan_capacity(make_image(64, 64), 0)
+    rgba = plan_capacity(make_image(64, 64, "RGBA"), 0)
+    assert rgba.storable_bytes == rgb.storable_bytes * 4 // 3
+
+    # Assert 3: Version 1 headers leave the alpha channel alone
+    image = BytesIO()
+    write_steg(BytesIO(b"Hello"), make_image(64, 64, "RGBA"), image,
+               header_version=1, close_on_exit=False)
+    image.seek(0)
+    assert Image.open(image).getchannel("A").tobytes() == \
+        make_image(64, 64, "RGBA").getchannel("A").tobytes()
+    output = BytesIO()
+    image.seek(0)
+    extract_steg(image, [output], engine="loop", close_on_exit=False)
+    assert output.getvalue() == b"Hello"
+
+    # Assert 4: Error handling
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64, "P"), BytesIO())
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64, "L"), BytesIO(),
+                   header_version=1)
+    with raises(ValueError):
+        plan_capacity(make_image(64, 64, "CMYK"), 0)
+    assert peek_header(make_image(64, 64, "L")) is None
+
+
+def test_mapped_carrier(tmpdir):
+    # Assert 1: Round trip through the map, for all mappable formats
+    for mode, ext, options in (
+        ("RGB", "bmp", {}),
+        ("RGBA", "bmp", {}),
+        ("RGB", "ppm", {}),
+        ("L", "pgm", {}),
+        ("I;16", "pgm", {}),
+        ("RGB", "tif", {}),
+        ("LA", "tif", {}),
+        ("RGBA", "tif", {}),
+        ("I;16", "tif", {}),
+    ):
+        path = str(tmpdir / f"carrier.{ext}")
+        copy = str(tmpdir / f"steg.{ext}")
+        make_image(61, 47, mode).save(path, **options)
+        original = Image.open(path)
+        original.load()
+
+        with open_carrier(path, copy) as carrier:
+            assert carrier.size == (61, 47)
+            write_steg(BytesIO(b"Hello" * 50), carrier, None,
+                       stream=True, buffer_size=64, close_on_exit=False)
+
+        # The image is left untouched, and the copy only differs in
+        # the columns holding the data
+        assert Image.open(path).tobytes() == original.tobytes()
+        written = Image.open(copy)
+        assert written.size == original.size
+        assert written.crop((40, 0, 61, 47)).tobytes() == \
+            original.crop((40, 0, 61, 47)).tobytes()
+
+        with open_carrier(copy, writable=False) as carrier:
+            output = BytesIO()
+            extract_steg(carrier, [output], close_on_exit=False)
+            assert output.getvalue() == b"Hello" * 50
+
+    # Assert 2: Pillow reads steganographs written through the map
+    path = str(tmpdir / "carrier.bmp")
+    make_image(64, 64).save(path)
+    with open_carrier(path) as carrier:
+        write_steg(BytesIO(b"Hello"), carrier, None, close_on_exit=False)
+    output = BytesIO()
+    with open(path, "rb") as image:
+        extract_steg(image, [output], close_on_exit=False)
+    assert output.getvalue() == b"Hello"
+    assert peek_header(Image.open(path)).channels == 3
+
+    # Assert 3: Same for 16-bit PGM, which Pillow opens in I mode
+    path = str(tmpdir / "carrier16.pgm")
+    make_image(64, 64, "I;16").save(path)
+    with open_carrier(path, str(tmpdir / "steg16.pgm")) as carrier:
+        write_steg(BytesIO(b"Hello"), carrier, None, close_on_exit=False)
+    assert Image.open(str(tmpdir / "steg16.pgm")).mode == "I"
+    for engine in ("loop", "numpy"):
+        output = BytesIO()
+        with open(str(tmpdir / "steg16.pgm"), "rb") as image:
+            extract_steg(image, [output], engine=engine,
+                         close_on_exit=False)
+        assert output.getvalue() == b"Hello"
+        image = BytesIO()
+        write_steg(BytesIO(b"Hello"), Image.open(path), image,
+                   engine=engine, close_on_exit=False)
+        image.seek(0)
+        output = BytesIO()
+        extract_steg(image, [output], close_on_exit=False)
+        assert output.getvalue() == b"Hello"
+
+    # Assert 4: Error handling
+    path = str(tmpdir / "carrier.png")
+    make_image(64, 64).save(path)
+    with raises(ValueError):
+        open_carrier(path)
+    path = str(tmpdir / "compressed.tif")
+    make_image(64, 64).save(path, compression="tiff_lzw")
+    with raises(ValueError):
+        open_carrier(path, str(tmpdir / "copy.tif"))
+    path = str(tmpdir / "carrier.bmp")
+    with open_carrier(path) as carrier:
+        with raises(ValueError):
+            write_steg(BytesIO(b"Hello"), carrier, BytesIO())
+        with raises(ValueError):
+            write_steg(BytesIO(b"Hello"), carrier, None, workers=2)
+
+
+def test_embed_bytes():
+    # Assert 1: Round trip, for every kind of payload and carrier
+    encoded = BytesIO()
+    make_image(64, 64).save(encoded, "png")
+    pixels = np.asarray(make_image(64, 64)).copy()
+    payload = urandom(200)
+    for data in (payload, bytearray(payload), memoryview(payload),
+                 np.frombuffer(payload, np.uint16)):
+        for carrier in (encoded.getvalue(), bytearray(encoded.getvalue()),
+                        make_image(64, 64), pixels):
+            for stream in (False, True):
+                steganograph = embed_bytes(data, carrier, stream=stream,
+                                           buffer_size=64)
+                assert extract_bytes(steganograph) == payload
+                assert extract_bytes(memoryview(steganograph)) == payload
+
+    # Assert 2: Arrays of pixels are left untouched, on both engines
+    assert pixels.tobytes() == make_image(64, 64).tobytes()
+    for mode in ("L", "RGB", "RGBA"):
+        array = np.asarray(make_image(64, 64, mode)).copy()
+        for engine in ("loop", "numpy"):
+            steganograph = embed_bytes(b"Hello", array, engine=engine)
+            assert extract_bytes(steganograph) == b"Hello"
+        assert array.tobytes() == make_image(64, 64, mode).tobytes()
+
+    # Assert 3: Same settings as write_steg, and error handling
+    steganograph = embed_bytes(b"Hello", pixels, auto_compress=True,
+                               header_version=1, png_preset="fast")
+    assert extract_bytes(Image.open(BytesIO(steganograph))) == b"Hello"
+    with raises(InputFileError):
+        embed_bytes(b"", pixels)
+    with raises(TypeError):
+        embed_bytes("Hello", pixels)
+    with raises(TypeError):
+        extract_bytes(b"Not an image")
+    with raises(AuthenticationError):
+        extract_bytes(steganograph, auth_key="wrong")
+
+
+def test_async_steg(tmpdir):
+    carrier = str(tmpdir / "carrier.png")
+    make_image(64, 64).save(carrier)
+    payload = str(tmpdir / "payload")
+    with open(payload, "wb") as file:
+        file.write(b"Hello" * 20)
+
+    async def round_trip(**options) -> bytes:
+        output = str(tmpdir / "steg.png")
+        await async_write_steg(payload, carrier, output, **options)
+        return await async_extract_steg(output, **options)
+
+    # Assert 1: Round trip through files, on threads and processes
+    assert asyncio.run(round_trip()) == b"Hello" * 20
+    with ProcessPoolExecutor(1) as executor:
+        assert asyncio.run(round_trip(executor=executor)) == b"Hello" * 20
+
+    # Assert 2: Jobs in flight are capped, and keep their slot until done
+    async def cancel_pending() -> None:
+        semaphore = asyncio.Semaphore(1)
+        steganograph = await async_write_steg(
+            memoryview(b"Hello"), make_image(64, 64), semaphore=semaphore)
+        with ThreadPoolExecutor(1) as executor:
+            tasks = [asyncio.ensure_future(async_extract_steg(
+                steganograph, executor=executor, semaphore=semaphore))
+                for _ in range(3)]
+            await asyncio.sleep(0)
+            assert semaphore.locked()
+            for task in tasks[1:]:
+                task.cancel()
+            assert await tasks[0] == b"Hello"
+            for task in tasks[1:]:
+                with raises(asyncio.CancelledError):
+                    await task
+            await asyncio.sleep(0.01)
+            assert not semaphore.locked()
+    asyncio.run(cancel_pending())
+
+    # Assert 3: Errors are raised in the caller
+    output = str(tmpdir / "steg.png")
+    asyncio.run(async_write_steg(payload, carrier, output, auth_key="key"))
+    with raises(AuthenticationError):
+        asyncio.run(async_extract_steg(output))
+    with raises(ValueError):
+        asyncio.run(async_write_steg(b"Hello", carrier, codec="zstd"))
+
+
+def test_serve():
+    carrier = BytesIO()
+    make_image(64, 64).save(carrier, "png")
+
+    async def request(port: int, method: str, target: str, body: bytes = b"",
+                      content_type: str = "application/octet-stream"):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"{method} {target} HTTP/1.1\r\n"
+                     f"Content-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     "Connection: close\r\n\r\n".encode() + body)
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), body
+
+    def form(**fields: bytes) -> bytes:
+        return b"".join(
+            b"--x\r\nContent-Disposition: form-data; name=\"" +
+            name.encode() + b"\"; filename=\"f\"\r\n\r\n" + value +
+            b"\r\n" for name, value in fields.items()) + b"--x--\r\n"
+
+    async def exercise() -> None:
+        server = StegServer(workers=1, max_body_size=1 << 16)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            # Assert 1: Round trip, with binary data and options
+            payload = bytes(range(256)) + b"\r\n\r\n--"
+            status, steganograph = await request(
+                port, "POST", "/create?key=abc&codec=zlib&png_preset=fast",
+                form(payload=payload, carrier=carrier.getvalue()),
+                "multipart/form-data; boundary=x")
+            assert status == 200
+            status, data = await request(port, "POST", "/extract?key=abc",
+                                         steganograph)
+            assert (status, data) == (200, payload)
+
+            # Assert 2: Inspect and capacity
+            status, body = await request(port, "POST", "/inspect",
+                                         steganograph)
+            assert status == 200
+            assert loads(body)["codec"] == "zlib"
+            status, body = await request(port, "POST", "/capacity?size=10",
+                                         steganograph)
+            plans = loads(body)
+            assert [plan["density"] for plan in plans] == [1, 2, 3]
+            assert plans[0]["fits_worst_case"]
+
+            # Assert 3: Errors are mapped to statuses
+            assert (await request(port, "POST", "/extract?key=no",
+                                  steganograph))[0] == 403
+            assert (await request(port, "POST", "/extract",
+                                  carrier.getvalue()))[0] == 422
+            assert (await request(port, "POST", "/extract",
+                                  b"Hello"))[0] == 400
+            assert (await request(port, "POST", "/inspect",
+                                  carrier.getvalue()))[0] == 422
+            assert (await request(port, "POST", "/extract?level=1",
+                                  steganograph))[0] == 400
+            assert (await request(port, "POST", "/extract",
+                                  bytes(1 << 17)))[0] == 413
+            assert (await request(port, "GET", "/extract"))[0] == 405
+            assert (await request(port, "GET", "/create/"))[0] == 404
+
+            # Assert 4: Health and metrics
+            status, body = await request(port, "GET", "/health")
+            assert (status, loads(body)["status"]) == (200, "ok")
+            status, body = await request(port, "GET", "/metrics")
+            counts = {(entry["endpoint"], entry["status"]): entry["count"]
+                      for entry in loads(body)["responses"]}
+            assert counts[("/extract", 200)] == 1
+            assert counts[("/extract", 403)] == 1
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            server.close()
+
+    asyncio.run(exercise())
+
+
+def test_daemon(tmpdir, monkeypatch):
+    socket_path = str(tmpdir / "steg.sock")
+    carrier = str(tmpdir / "carrier.png")
+    make_image(64, 64).save(carrier)
+    with open(carrier, "rb") as file:
+        carrier_data = file.read()
+    payload = str(tmpdir / "payload")
+    with open(payload, "wb") as file:
+        file.write(b"Hello" * 20)
+
+    def use_daemon() -> None:
+        # Assert 1: Round trip, over a single connection
+        with connect_daemon(socket_path) as client:
+            steganograph = client.create(b"Hello", carrier_data,
+                                         auth_key="abc", png_optimize=None)
+            assert b"".join(client.iter_extract(
+                steganograph, auth_key="abc", buffer_size=2)) == b"Hello"
+            output = BytesIO()
+            client.extract(steganograph, [output], auth_key="abc",
+                           close_on_exit=False)
+            assert output.getvalue() == b"Hello"
+
+            # Assert 2: Errors are raised as in process
+            with raises(AuthenticationError):
+                client.extract(steganograph, [BytesIO()])
+            with raises(ValueError):
+                client.create(b"Hello", carrier_data, compression=12)
+            with raises(TypeError):
+                client.create(b"Hello", carrier_data, engine="loop")
+            assert client.health()["status"] == "ok"
+
+        # Assert 3: The CLI runs on the daemon
+        runner = CliRunner(env={"STEG_SOCKET": socket_path})
+        output = str(tmpdir / "steg.png")
+        result = runner.invoke(steg, ["create", "-i", carrier, "-k", "abc",
+                                      "-o", output, payload])
+        assert result.exit_code == 0
+        result = runner.invoke(steg, ["extract", "-k", "abc", "-o",
+                                      payload + ".out", output])
+        assert result.exit_code == 0
+        with open(payload + ".out", "rb") as file:
+            assert file.read() == b"Hello" * 20
+
+        # Assert 4: A steganograph without extension is not overwritten
+        extensionless = str(tmpdir / "steg")
+        with open(output, "rb") as file, open(extensionless, "wb") as copy:
+            copy.write(file.read())
+        for daemon in ("true", "false"):
+            with raises(OutputFileError):
+                runner.invoke(steg, ["extract", "-k", "abc", "--daemon",
+                                     daemon, extensionless])
+            assert stat(extensionless).st_size == stat(output).st_size
+
+    async def exercise() -> None:
+        assert connect_daemon(socket_path) is None
+        server = StegServer(workers=1)
+        listener = await server.start(unix_path=socket_path)
+        # The socket is private from the moment it is bound
+        assert stat(socket_path).st_mode & 0o777 == 0o600
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, use_daemon)
+            assert server.responses[("/create", 200)] == 2
+            assert server.responses[("/extract", 200)] == 3
+
+            # Assert 5: A socket others may connect to is not used
+            chmod(socket_path, 0o666)
+            assert connect_daemon(socket_path) is None
+            chmod(socket_path, 0o600)
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            server.close()
+
+    asyncio.run(exercise())
+    # Assert 6: A socket left behind is not mistaken for a daemon
+    assert connect_daemon(socket_path) is None
+
+    # Assert 7: A listener that never answers is given up on
+    silent_path = str(tmpdir / "silent.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(silent_path)
+        listener.listen()
+        chmod(silent_path, 0o600)
+        start = perf_counter()
+        assert connect_daemon(silent_path, connect_timeout=0.2) is None
+        assert perf_counter() - start < 5
+
+    # Assert 8: The default socket is kept in a directory of the user
+    monkeypatch.delenv("STEG_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    directory = path.dirname(daemon_socket_path())
+    assert path.basename(directory) == f"steg-{getuser()}"
+    shared = tmpdir.mkdir("shared")
+    shared.chmod(0o755)
+    with raises(DaemonError):
+        check_private(str(shared))
+    shared.chmod(0o700)
+    check_private(str(shared))
+
+
+def test_timings():
+    data = b"Hello, world! " * 200
+
+    # Assert 1: Every stage of write_steg is measured, with byte counts
+    for stream in (False, True):
+        timings = Timings()
+        image = BytesIO()
+        write_steg(BytesIO(data), make_image(100, 100), image, stream=stream,
+                   buffer_size=1024, close_on_exit=False, timings=timings)
+        assert set(timings.stages) == {"load", "read", "compress", "kdf",
+                                       "encrypt", "header", "embed",
+                                       "encode", "write"}
+        assert timings.stages["read"].bytes_out == len(data)
+        assert timings.stages["compress"].bytes_in == len(data)
+        assert timings.stages["write"].bytes_out == len(image.getvalue())
+        # Chunks, then the end of the file, are read in stream format
+        assert timings.stages["read"].calls == (4 if stream else 1)
+
+        # Assert 2: Every stage of extract_steg is measured, in order
+        timings = Timings()
+        image.seek(0)
+        output = BytesIO()
+        extract_steg(image, [output], close_on_exit=False, timings=timings)
+        assert output.getvalue() == data
+        assert list(timings.stages) == ["open", "load", "header", "kdf",
+                                        "extract", "decrypt", "decompress",
+                                        "write"]
+        assert timings.stages["decompress"].bytes_out == len(data)
+        assert timings.stages["write"].bytes_in == len(data)
+        assert all(timing.wall >= 0 for timing in timings.stages.values())
+
+    # Assert 3: Inner stages are left out of the time of outer stages
+    timings = Timings()
+    with timings.measure("outer"):
+        with timings.measure("inner"):
+            sum(range(100000))
+    assert timings.stages["outer"].wall < timings.stages["inner"].wall
+    assert "total" in str(timings)
+    assert timings.as_dict()["inner"]["calls"] == 1
+
+
+def test_bench(tmpdir):
+    # Assert 1: Carriers and payloads are the same for a given seed
+    assert (make_carrier(0.01, 3) == make_carrier(0.01, 3)).all()
+    assert make_carrier(0.01, 3).shape == (86, 115, 3)
+    for entropy in ("low", "medium", "high"):
+        assert make_payload(1000, entropy) == make_payload(1000, entropy)
+        assert make_payload(1000, entropy) != make_payload(1000, entropy, 1)
+    # Lower entropy compresses better
+    bz2 = codecs[find_codec("bz2")]
+    sizes = [len(bz2.compress(make_payload(1 << 16, entropy), 9))
+             for entropy in ("low", "medium", "high")]
+    assert sizes == sorted(sizes)
+    with raises(ValueError):
+        make_payload(1000, "none")
+
+    # Assert 2: The codec is only varied when compressing
+    profile = Profile((0.01,), (1, 3), ("bz2", "zlib"), (0, 9), ("low",), 2)
+    scenarios = plan_scenarios(profile)
+    assert [scenario.name for scenario in scenarios] == [
+        "0.01MP/d1/raw/low", "0.01MP/d1/bz2-9/low", "0.01MP/d1/zlib-9/low",
+        "0.01MP/d3/raw/low", "0.01MP/d3/bz2-9/low", "0.01MP/d3/zlib-9/low",
+    ]
+    assert percentile([4, 1, 3, 2], 50) == 2.5
+    assert percentile([1, 2, 3], 100) == 3
+
+    # Assert 3: Each scenario reports throughput and latency of both
+    # operations
+    progress = []
+    results = run_bench(scenarios[:2], 2, isolate=False,
+                        on_progress=lambda *args: progress.append(args))
+    # Each round runs every scenario once
+    assert [done for done, _, _ in progress] == [1, 2, 3, 4]
+    assert sorted(scenario for _, _, scenario in progress[:2]) == \
+        sorted(scenarios[:2])
+    assert results["settings"]["repeat"] == 2
+    assert [result["name"] for result in results["scenarios"]] == \
+        ["0.01MP/d1/raw/low", "0.01MP/d1/bz2-9/low"]
+    for result in results["scenarios"]:
+        assert result["payload_bytes"] == 115 * 86 * 3 // 8 // 4
+        for operation in ("create", "extract"):
+            summary = result[operation]
+            assert len(summary["samples"]) == 2
+            assert summary["p50"] <= summary["p90"] <= summary["p99"]
+            assert summary["mb_per_s"] > 0 and summary["pixels_per_s"] > 0
+            assert "kdf" in summary["stages"]
+    with raises(ValueError):
+        run_bench(scenarios, 0)
+
+    # Assert 4: The command writes the results as JSON
+    output = str(tmpdir.join("bench.json"))
+    result = CliRunner().invoke(steg, [
+        "bench", "run", "-s", "0.01", "-p", "2", "-c", "1", "-e", "high",
+        "--codec", "zlib", "-r", "1", "--isolate", "false", "-o", output])
+    assert result.exit_code == 0, result.output
+    with open(output) as file:
+        results = loads(file.read())
+    assert results["settings"]["profile"] == "quick"
+    assert [scenario["name"] for scenario in results["scenarios"]] == \
+        ["0.01MP/d2/zlib-1/high"]
+
+
+def test_compare_bench(tmpdir):
+    def results(slowdowns: dict, speed: float = 1.0, noise: float = 0.01,
+                memory: float = 1.0) -> dict:
+        samples = [1 + noise * deviation for deviation in (0, 1, -1, 2, -2)]
+        return {
+            "version": 1,
+            "settings": {"isolate": True},
+            "calibration": {"p50": speed},
+            "scenarios": [{
+                "name": name,
+                "peak_rss_bytes": int(memory * (50 << 20)),
+                "create": {"p50": speed * slowdown,
+                           "samples": [speed * slowdown * sample
+                                       for sample in samples]},
+                "extract": {"p50": speed,
+                            "samples": [speed * sample
+                                        for sample in samples]},
+            } for name, slowdown in slowdowns.items()],
+        }
+
+    def verdicts(comparison) -> dict:
+        return {(change.name, change.operation): change.verdict
+                for change in comparison.comparisons
+                if change.verdict != "unchanged"}
+
+    names = ["a", "b", "c", "d"]
+    baseline = results(dict.fromkeys(names, 1.0))
+
+    # Assert 1: Identical runs, or runs on a slower machine, are unchanged
+    assert verdicts(compare_bench(baseline, baseline)) == {}
+    slower = results(dict.fromkeys(names, 1.0), speed=1.3)
+    assert compare_bench(baseline, slower).speed == 1.3
+    assert verdicts(compare_bench(baseline, slower)) == {}
+    assert len(verdicts(compare_bench(baseline, slower,
+                                      normalise=False))) == 10
+
+    # Assert 2: A slower scenario is a regression, not the overall change
+    current = results({"a": 1.5, "b": 1.0, "c": 1.0, "d": 1.0})
+    assert verdicts(compare_bench(baseline, current)) == \
+        {("a", "create"): "regression"}
+
+    # Assert 3: Small changes of every scenario are told overall
+    current = results({"a": 1.11, "b": 1.12, "c": 1.12, "d": 1.11},
+                      noise=0.02)
+    assert verdicts(compare_bench(results(dict.fromkeys(names, 1.0),
+                                          noise=0.02), current)) == \
+        {("overall", "create"): "regression"}
+    current = results(dict.fromkeys(names, 0.8))
+    assert set(verdicts(compare_bench(baseline, current)).values()) == \
+        {"improvement"}
+
+    # Assert 4: Noisy changes are not reported
+    current = results(dict.fromkeys(names, 1.2), noise=0.2)
+    assert verdicts(compare_bench(results(dict.fromkeys(names, 1.0),
+                                          noise=0.2), current)) == {}
+
+    # Assert 5: Memory, and scenarios of only one run
+    current = results({"a": 1.0, "b": 1.0, "e": 1.0}, memory=1.5)
+    comparison = compare_bench(baseline, current)
+    assert verdicts(comparison) == {("a", "memory"): "regression",
+                                    ("b", "memory"): "regression"}
+    assert comparison.missing == ["c", "d"]
+    assert comparison.added == ["e"]
+    with raises(ValueError):
+        compare_bench(baseline, dict(baseline, version=0))
+
+    # Assert 6: Rank test, exact for small samples
+    assert slower_p_value([1, 2, 3], [4, 5, 6]) == 1 / 20
+    assert slower_p_value([4, 5, 6], [1, 2, 3]) == 1
+    assert slower_p_value([1, 2], [1, 2]) == 4 / 6
+
+    # Assert 7: The command fails on regressions only
+    files = []
+    for name, content in (("base", baseline),
+                          ("same", baseline),
+                          ("slow", results({"a": 1.5, "b": 1.0,
+                                            "c": 1.0, "d": 1.0}))):
+        files.append(str(tmpdir.join(f"{name}.json")))
+        with open(files[-1], "w") as file:
+            file.write(dumps(content))
+    result = CliRunner().invoke(steg, ["bench", "compare", *files[:2]])
+    assert result.exit_code == 0, result.output
+    assert "0 regressions" in result.output
+    result = CliRunner().invoke(steg, ["bench", "compare", files[0],
+                                       files[2]])
+    assert result.exit_code == 1
+    assert "1 regressions" in result.output
+    result = CliRunner().invoke(steg, ["bench", "compare", files[0],
+                                       files[0].replace("base", "none")])
+    assert result.exit_code == 2
+
+
+def test_write_steg_stream():
+    # Assert 1: Round trip, with many frames
+    for engine in ("loop", "numpy"):
+        for compression in (0, 9):
+            data = b"Hello, world! " * 200
+            image = BytesIO()
+            write_steg(BytesIO(data), make_image(100, 100), image,
+                       compression=compression, engine=engine, stream=True,
+                       buffer_size=64, close_on_exit=False)
+            image.seek(0)
+            header = peek_header(image)
+            assert header.stream
+            assert header.length == Header.binary_header_length
+            output = BytesIO()
+            image.seek(0)
+            extract_steg(image, [output], close_on_exit=False)
+            assert output.getvalue() == data
+
+    # Assert 2: Every codec, with output in small chunks
+    data = bytes(range(256)) * 50 + urandom(3000)
+    for codec in Config.available_codec:
+        for stream in (False, True):
+            image = BytesIO()
+            write_steg(BytesIO(data), make_image(150, 150), image,
+                       codec=codec, stream=stream, buffer_size=100,
+                       close_on_exit=False)
+            image.seek(0)
+            assert peek_header(image).codec == find_codec(codec)
+            image.seek(0)
+            chunks = list(iter_steg(image, buffer_size=64))
+            assert all(len(chunk) <= 64 for chunk in chunks)
+            assert b"".join(chunks) == data
+
+    # Assert 3: Text header, as written by older versions
+    for stream in (False, True):
+        image = BytesIO()
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), image,
+                   stream=stream, header_version=1, close_on_exit=False)
+        image.seek(0)
+        header = peek_header(image)
+        assert header.version == 1 and header.stream == stream
+        output = BytesIO()
+        image.seek(0)
+        extract_steg(image, [output], engine="loop", close_on_exit=False)
+        assert output.getvalue() == b"Hello"
+
+    # Assert 4: Error handling
+    with raises(InsufficientStorageError):
+        write_steg(BytesIO(urandom(5000)), make_image(64, 64), BytesIO(),
+                   stream=True, buffer_size=256)
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), BytesIO(),
+                   codec="zlib", header_version=1)
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), BytesIO(),
+                   codec="zstd")
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), BytesIO(),
+                   header_version=3)
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), BytesIO(),
+                   stream=True, buffer_size=0)
+
+
+def test_iter_steg():
+    data = "Héllo, wörld! ".join(str(i) for i in range(1000))
+    image = BytesIO()
+    write_steg(BytesIO(bytes(data, "utf-8")), make_image(150, 150), image,
+               stream=True, buffer_size=100, close_on_exit=False)
+
+    # Assert 1: Output comes in bounded chunks
+    image.seek(0)
+    chunks = list(iter_steg(image, buffer_size=100))
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert b"".join(chunks) == bytes(data, "utf-8")
+
+    # Assert 2: Text output is decoded across chunks
+    image.seek(0)
+    text, binary = StringIO(), BytesIO()
+    extract_steg(image, [text, binary], buffer_size=7, close_on_exit=False)
+    assert text.getvalue() == data
+    assert binary.getvalue() == bytes(data, "utf-8")
+
+    # Assert 3: Key is derived once when extracting again
+    cache = KeyCache()
+    for _ in range(3):
+        image.seek(0)
+        output = BytesIO()
+        extract_steg(image, [output], key_cache=cache, close_on_exit=False)
+        assert output.getvalue() == bytes(data, "utf-8")
+    assert cache.info()[:2] == (2, 1)
+
+    # Assert 4: Error handling
+    image.seek(0)
+    with raises(AuthenticationError):
+        extract_steg(image, [BytesIO()], auth_key="Wrong key",
+                     key_cache=cache)
+
+
+def test_plan_capacity(tmpdir):
+    # Assert 1: Usable bytes are exact, for every format
+    for stream, version in ((False, 2), (True, 2), (True, 1)):
+        image = make_image(40, 30)
+        plan = plan_capacity(image, 0, density=2, compression=0,
+                             stream=stream, buffer_size=100,
+                             header_version=version)
+        assert plan.storable_bytes == 40 * 30 * 3 * 2 // 8
+        for length, fits in ((plan.usable_bytes, True),
+                             (plan.usable_bytes + 1, False)):
+            def write():
+                return write_steg(
+                    BytesIO(urandom(length)), image.copy(), BytesIO(),
+                    density=2, compression=0, stream=stream,
+                    buffer_size=100, header_version=version)
+            if fits:
+                assert write()
+            else:
+                with raises(InsufficientStorageError):
+                    write()
+
+    # Assert 2: Compressed payloads are bounded, from the file alone
+    path = str(tmpdir.join("carrier.png"))
+    make_image(64, 64).save(path)
+    plan = plan_capacity(path, 200, density=1)
+    assert plan.size == (64, 64)
+    assert plan.fits_best_case and plan.fits_worst_case
+    plan = plan_capacity(open(path, "rb"), 5000, density=1)
+    assert plan.fits_best_case and not plan.fits_worst_case
+
+    # Assert 3: Error handling
+    with raises(ValueError):
+        plan_capacity(path, 10, density=4)
+    with raises(ValueError):
+        plan_capacity(path, -1)
+
+
+def test_parallel(monkeypatch):
+    # Use several workers even for small data
+    monkeypatch.setattr(pa, "min_bytes_per_worker", 100)
+
+    # Assert 1: Same pixels and bytes as a single process
+    for density in (1, 2, 3):
+        data = urandom(1000)
+        expected = make_image(40, 40)
+        en.embed_numpy(expected, data, density, 13)
+        actual = make_image(40, 40)
+        pa.embed_parallel(actual, data, density, 13, workers=3)
+        assert actual.tobytes() == expected.tobytes()
+        assert pa.extract_parallel(actual, density, 1000, 13,
+                                   workers=3) == data
+
+    # Assert 2: Round trip through write_steg and extract_steg
+    data = b"Hello, world! " * 200
+    image = BytesIO()
+    write_steg(BytesIO(data), make_image(150, 150), image, compression=0,
+               workers=2, close_on_exit=False)
+    output = BytesIO()
+    image.seek(0)
+    extract_steg(image, [output], workers=2, close_on_exit=False)
+    assert output.getvalue() == data
+
+    # Assert 3: Error handling
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), BytesIO(),
+                   engine="loop", workers=2)
+    with raises(ValueError):
+        write_steg(BytesIO(b"Hello"), make_image(64, 64), BytesIO(),
+                   workers=0)
+
+
+def test_write_steg_batch(tmpdir, monkeypatch):
+    # Setup carrier file
+    carrier = str(tmpdir.join("carrier.png"))
+    make_image(64, 64).save(carrier)
+    jobs = [
+        (b"Hello", carrier, None, {"density": 2}),
+        (urandom(5000), carrier, None, None),
+        (b"World", carrier, str(tmpdir.join("output.png")), None),
+    ]
+
+    # Assert 1: Results in order, errors reported per job
+    for workers in (1, 2):
+        results = list(write_steg_batch(jobs, workers=workers))
+        assert [result.index for result in results] == [0, 1, 2]
+        assert [result.success for result in results] == [True, False, True]
+        assert isinstance(results[1].error, InsufficientStorageError)
+        output = BytesIO()
+        extract_steg(BytesIO(results[0].value), [output], close_on_exit=False)
+        assert output.getvalue() == b"Hello"
+        assert is_steganograph(open(tmpdir.join("output.png"), "rb"))
+
+    # Assert 2: Results as they complete
+    results = write_steg_batch(jobs, workers=2, ordered=False)
+    assert sorted(result.index for result in results) == [0, 1, 2]
+
+    # Assert 3: A failed job leaves its output as it was
+    kept = str(tmpdir.join("kept.png"))
+    with open(kept, "wb") as file:
+        file.write(b"Kept")
+    results = list(write_steg_batch([
+        (urandom(5000), carrier, kept, None),
+        (urandom(5000), carrier, str(tmpdir.join("failed.png")), None),
+    ], workers=1))
+    assert not any(result.success for result in results)
+    with open(kept, "rb") as file:
+        assert file.read() == b"Kept"
+    assert not tmpdir.join("failed.png").exists()
+
+    # Assert 4: Decoded carriers are kept within the pixel bound
+    monkeypatch.setattr(ba, "carrier_cache_pixels", 64 * 64)
+    ba._carriers.clear()
+    other = str(tmpdir.join("other.png"))
+    make_image(32, 32).save(other)
+    results = write_steg_batch([(b"Hello", carrier, None, None),
+                                (b"Hello", other, None, None)], workers=1)
+    assert all(result.success for result in results)
+    assert [key[0] for key in ba._carriers] == [other]
+    monkeypatch.setattr(ba, "carrier_cache_pixels", 64 * 64 - 1)
+    ba._carriers.clear()
+    assert next(write_steg_batch([(b"Hello", carrier, None, None)],
+                                 workers=1)).success
+    assert not ba._carriers
+
+
+def test_extract_steg_batch(tmpdir):
+    # Setup steganographs, and an image which is not one
+    for i in range(3):
+        write_steg(BytesIO(b"Hello %d" % i), make_image(64, 64),
+                   open(tmpdir.join(f"steg{i}.png"), "wb"))
+    make_image(64, 64).save(str(tmpdir.join("plain.png")))
+    steganographs = list(collect_steganographs(directory=str(tmpdir)))
+    assert len(steganographs) == 4
+
+    # Assert 1: Every steganograph is reported, with its own outcome
+    for workers in (1, 2):
+        results = list(extract_steg_batch(steganographs, workers=workers))
+        assert [result.success for _, _, result in results] == \
+            [False, True, True, True]
+        assert [result.value for _, _, result in results[1:]] == [7, 7, 7]
+        assert open(results[1][1], "rb").read() == b"Hello 0"
+        # No partial output is left behind
+        assert not tmpdir.join("plain").exists()
+
+    # Assert 2: A steganograph without extension is never overwritten
+    noext = tmpdir.join("noext")
+    noext.write_binary(open(steganographs[1], "rb").read())
+    (_, output, result), = extract_steg_batch([str(noext)])
+    assert output == str(noext)
+    assert not result.success
+    assert isinstance(result.error, OutputFileError)
+    assert noext.read_binary() == open(steganographs[1], "rb").read()
+
+    # Assert 3: Steganographs of the same name are not written to the
+    # same output file, and a failed job removes no file it did not make
+    for name in ("a", "b"):
+        tmpdir.mkdir(name)
+        write_steg(BytesIO(name.encode()), make_image(64, 64),
+                   open(tmpdir.join(name, "x.png"), "wb"))
+    tmpdir.mkdir("out").join("plain").write_binary(b"kept")
+    results = list(extract_steg_batch(
+        [str(tmpdir.join("a", "x.png")), str(tmpdir.join("b", "x.png")),
+         steganographs[0]], output_dir=str(tmpdir.join("out")), workers=2))
+    assert [result.success for _, _, result in results] == \
+        [True, False, False]
+    assert isinstance(results[1][2].error, OutputFileError)
+    assert tmpdir.join("out", "x").read_binary() == b"a"
+    assert tmpdir.join("out", "plain").exists()
+
+
+def test_import_time():
+    # Dependencies that no command loads before it runs
+    heavy = ("numpy", "PIL", "cryptography", "PyQt5")
+    # Generous, so that only eager imports of the above can exceed it
+    budget = 0.15
+
+    def import_times(*args: str) -> dict:
+        result = run([executable, "-X", "importtime", *args],
+                     capture_output=True, text=True, check=True,
+                     cwd=path.dirname(path.dirname(path.abspath(__file__))))
+        times = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, name = line[12:].split("|")
+                if cumulative.strip().isdigit():
+                    times[name.strip()] = int(cumulative) / 1e6
+        return times
+
+    # Assert 1: The CLI and the package start without heavy dependencies
+    for module, args in (
+        ("StegLibrary.core.main", ("-m", "StegLibrary", "--help")),
+        ("StegLibrary", ("-c", "import StegLibrary, StegLibrary.core")),
+    ):
+        times = import_times(*args)
+        assert not [name for name in times if name.split(".")[0] in heavy]
+        assert times[module] < budget
+
+    # Assert 2: Names are still exposed, importing their module on access
+    import StegLibrary
+    assert StegLibrary.write_steg is write_steg
+    assert "embed_bytes" in dir(StegLibrary)
+    with raises(AttributeError):
+        StegLibrary.missing
@@ -0,0 +1,86 @@
+# Builtin modules
+from os import urandom
+from time import sleep
+
+# Internal modules
+from StegLibrary.helper import err_imp
+from StegLibrary.crypto import KeyCache
+from StegLibrary.core import SteganographyConfig as Config
+from StegLibrary.crypto.kdf import create_kdf, find_kdf, kdf_profiles
+
+# Non-builtin modules
+try:
+    from pytest import raises
+except ImportError:
+    err_imp("pytest")
+    exit(1)
+
+
+def test_key_cache():
+    salt = urandom(16)
+    cache = KeyCache(maxsize=2)
+
+    # Assert 1: Same key as the KDF, derived only once
+    key = cache.derive(salt, b"Key")
+    assert key == create_kdf(salt).derive(b"Key")
+    assert cache.derive(salt, b"Key") == key
+    assert cache.info()[:2] == (1, 1)
+
+    # Assert 2: Different salt or authentication key, different entry
+    assert cache.derive(salt, b"Other key") != key
+    assert cache.derive(urandom(16), b"Key") != key
+    info = cache.info()
+    assert (info.misses, info.evictions, info.currsize) == (3, 1, 2)
+
+    # Assert 3: Evicted and cleared keys are zeroed
+    entries = [entry for entry, _ in cache._entries.values()]
+    cache.clear()
+    assert cache.info()[2:] == (3, 2, 0)
+    assert all(not any(entry) for entry in entries)
+
+    # Assert 4: Expired keys are derived again
+    cache = KeyCache(ttl=0.1)
+    cache.derive(salt, b"Key")
+    sleep(0.2)
+    cache.derive(salt, b"Key")
+    assert cache.info()[:3] == (0, 2, 1)
+
+    # Assert 5: Expired keys are zeroed without being looked up again
+    entries = [entry for entry, _ in cache._entries.values()]
+    sleep(0.2)
+    assert cache.info()[2:] == (2, 128, 0)
+    assert all(not any(entry) for entry in entries)
+    cache.derive(salt, b"Key")
+    entries = [entry for entry, _ in cache._entries.values()]
+    sleep(0.2)
+    cache.derive(salt, b"Other key")
+    assert cache.info()[2:] == (3, 128, 1)
+    assert all(not any(entry) for entry in entries)
+
+    # Assert 6: Error handling
+    with raises(ValueError):
+        KeyCache(maxsize=0)
+    with raises(ValueError):
+        KeyCache(ttl=-1)
+
+
+def test_create_kdf():
+    salt = urandom(16)
+
+    # Assert 1: Every profile is available, in the order of identifiers
+    assert Config.available_kdf == [profile.name for profile in kdf_profiles]
+    assert find_kdf(Config.default_kdf) == 0
+
+    # Assert 2: Profiles derive different keys
+    keys = {create_kdf(salt, kdf).derive(b"Key") for kdf in (0, 1, 4)}
+    assert len(keys) == 3
+    assert create_kdf(salt).derive(b"Key") == \
+        create_kdf(salt, 0).derive(b"Key")
+
+    # Assert 3: Error handling
+    with raises(ValueError):
+        create_kdf(salt, len(kdf_profiles))
+    with raises(TypeError):
+        create_kdf(salt, "scrypt-16k")
+    with raises(ValueError):
+        find_kdf("md5")